@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+asyncio front end for HailoDetector
+
+Device calls run on one dedicated executor thread, so an aiohttp or MQTT
+service can await detections without blocking its event loop. A semaphore
+caps the frames in flight: once max_pending are queued, further callers wait
+instead of piling work onto the device.
+
+    async with AsyncHailoDetector(HailoDetector(model_path)) as detector:
+        detections = await detector.detect(frame)
+
+        async for frame_id, detections in detector.stream(camera.read):
+            ...
+"""
+
+import asyncio
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncHailoDetector:
+    """Awaitable wrapper around a (blocking) HailoDetector"""
+
+    def __init__(self, detector, max_pending=4):
+        self.detector = detector
+        self.max_pending = max(1, max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hailo")
+        self._capture_executor = None
+        self._semaphore = None
+        self._in_flight = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+        return False
+
+    @property
+    def busy(self):
+        """True when max_pending frames are already queued for the device"""
+        return self._in_flight >= self.max_pending
+
+    def _slots(self):
+        # Created lazily so it binds to the loop the caller is running in
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+        return self._semaphore
+
+    async def detect(self, frame, display_shape=None):
+        """Run detection on the device thread and await the result"""
+        async with self._slots():
+            self._in_flight += 1
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    self._executor, self.detector.detect, frame, display_shape
+                )
+            finally:
+                self._in_flight -= 1
+
+    async def stream(self, source):
+        """Yield (frame_id, detections) for every frame from source
+
+        source is an async iterable, a sync iterable, or a blocking callable
+        returning the next frame (None ends the stream) such as
+        PicameraSource.read. Items may be a frame or a (display_frame,
+        model_frame) pair. Up to max_pending frames are in flight at once;
+        results come back in capture order.
+        """
+        pending = collections.deque()
+        frame_id = 0
+        async for item in self._frames(source):
+            if isinstance(item, tuple):
+                display_frame, model_frame = item
+                if model_frame is None:
+                    model_frame = display_frame
+                task = asyncio.ensure_future(self.detect(model_frame, display_frame.shape))
+            else:
+                task = asyncio.ensure_future(self.detect(item))
+            pending.append((frame_id, task))
+            frame_id += 1
+
+            while pending and (len(pending) >= self.max_pending or pending[0][1].done()):
+                done_id, done_task = pending.popleft()
+                yield done_id, await done_task
+
+        while pending:
+            done_id, done_task = pending.popleft()
+            yield done_id, await done_task
+
+    async def _frames(self, source):
+        """Adapt any supported source into an async iterator of frames"""
+        if hasattr(source, "__aiter__"):
+            async for item in source:
+                yield item
+            return
+
+        # Blocking capture runs on its own thread, never the event loop
+        if self._capture_executor is None:
+            self._capture_executor = ThreadPoolExecutor(max_workers=1,
+                                                        thread_name_prefix="capture")
+        loop = asyncio.get_running_loop()
+        if callable(source):
+            read = source
+        else:
+            iterator = iter(source)
+
+            def read():
+                return next(iterator, None)
+
+        while True:
+            item = await loop.run_in_executor(self._capture_executor, read)
+            if item is None:
+                return
+            yield item
+
+    async def close(self, cleanup_detector=True):
+        """Wait for in-flight work, stop the threads and release the device"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._executor.shutdown, True)
+        if self._capture_executor is not None:
+            self._capture_executor.shutdown(wait=False)
+        if cleanup_detector:
+            self.detector.cleanup()
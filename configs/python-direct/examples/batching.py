@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Dynamic micro-batching in front of a HailoDetector
+
+Frames submitted from any number of sources are gathered until either
+max_batch_size frames are waiting or max_wait_ms has passed since the first
+one arrived. They are letterboxed straight into one preallocated
+[N, H, W, 3] buffer, sent to the device as a single batch, and the results
+are scattered back to each caller's Future.
+
+Batching is how the Hailo-8 reaches its rated throughput. The detector
+should be configured with the same batch_size:
+
+    detector = HailoDetector(model_path, batch_size=4)
+    batcher = MicroBatcher(detector, max_batch_size=4, max_wait_ms=8)
+    batcher.start()
+    detections = batcher.submit(frame).result()
+
+Latency-sensitive deployments keep max_batch_size=1, which sends every
+frame immediately.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from pipeline import StageQueue, DROP_OLDEST, _STOP
+
+
+class MicroBatcher:
+    """Gathers frames into batches for one detector"""
+
+    def __init__(self, detector, max_batch_size=4, max_wait_ms=8.0,
+                 queue_size=None, drop_policy=DROP_OLDEST):
+        if detector.preprocess_mode != "letterbox":
+            raise ValueError("Micro-batching needs the detector in letterbox mode")
+        self.detector = detector
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.queue = StageQueue("batcher", queue_size or 4 * self.max_batch_size,
+                                drop_policy, on_drop=lambda item: item[2].cancel())
+        self.batches = 0
+        self.frames = 0
+        self.errors = 0
+        self._batch = np.empty((self.max_batch_size, detector.input_height,
+                                detector.input_width, 3), dtype=np.uint8)
+        self._thread = None
+
+    @property
+    def mean_batch_size(self):
+        return self.frames / self.batches if self.batches else 0.0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._worker, name="batcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self.queue.put_stop()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, frame, display_shape=None):
+        """Queue a frame; returns a Future resolving to its detections"""
+        future = Future()
+        self.queue.put((frame, display_shape, future))
+        return future
+
+    def _gather(self):
+        """Block for one frame, then collect more until full or timed out
+
+        Returns (items, stopping).
+        """
+        first = self.queue.get()
+        if first is _STOP:
+            return [], True
+
+        items = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(items) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return items, True
+            items.append(item)
+        return items, False
+
+    def _worker(self):
+        stopping = False
+        while not stopping:
+            items, stopping = self._gather()
+            items = [item for item in items if item[2].set_running_or_notify_cancel()]
+            if items:
+                self._run_batch(items)
+
+    def _run_batch(self, items):
+        detector = self.detector
+        try:
+            metas = []
+            for slot, (frame, display_shape, _) in enumerate(items):
+                _, meta = detector.preprocess(frame, display_shape,
+                                              out=self._batch[slot:slot + 1])
+                metas.append(meta)
+
+            outputs = detector.infer(self._batch[:len(items)])
+            output_data = outputs[detector.output_name]
+
+            for slot, ((_, _, future), meta) in enumerate(zip(items, metas)):
+                future.set_result(detector.postprocess(output_data[slot:slot + 1], meta))
+        except Exception as e:
+            self.errors += 1
+            for _, _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.frames += len(items)
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Per-stage latency benchmark for the detection hot path
+
+Runs each CPU stage between the camera and the screen on fixed inputs and
+reports p50/p95/p99 latency, throughput and allocations per call:
+
+    preprocess   HailoDetector.preprocess at each frame resolution
+    postprocess  HailoDetector.postprocess on tensors holding N detections
+    nms          nms_boxes on N overlapping candidates
+    overlay      OverlayRenderer.draw of N detections at each resolution
+    encode       JpegStream.encode at each resolution
+
+    HAILO_FAKE=1 python benchmark_pipeline.py --model yolov8s.hef --json base.json
+    HAILO_FAKE=1 python benchmark_pipeline.py --model yolov8s.hef --compare base.json
+
+The device is never timed, so the fake backend gives the same numbers as a
+Hailo-8. HAILO_FAKE_NMS=1 benchmarks the on-device NMS output path.
+--outputs replays tensors recorded with live_detection.py --dump-outputs
+instead of synthetic ones. The JSON holds the Python, NumPy, OpenCV and OS
+versions next to the results; --compare flags every case whose p50 or p95
+got more than --tolerance slower and exits non-zero.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from live_detection import HailoDetector, HAS_CV2, nms_boxes, overlay_renderer
+from fake_hailo_platform import make_output, make_nms_output
+from model_registry import ModelRegistry
+import pipeline_config
+from streaming import JpegStream
+
+if HAS_CV2:
+    import cv2
+
+STAGES = ("preprocess", "postprocess", "nms", "overlay", "encode")
+
+DEFAULT_RESOLUTIONS = ("640x480", "1280x720", "1920x1080")
+
+
+def summarize(seconds):
+    """Latency percentiles (ms) and throughput for one case"""
+    ms = np.asarray(seconds) * 1000
+    return {
+        'iterations': len(ms),
+        'mean_ms': float(ms.mean()),
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p95_ms': float(np.percentile(ms, 95)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'max_ms': float(ms.max()),
+        'per_second': float(1000 / ms.mean()) if ms.mean() > 0 else None,
+    }
+
+
+def measure_allocations(fn, calls):
+    """Peak transient and retained traced memory per call, in bytes
+
+    tracemalloc slows everything down, so this runs separately from the timed loop.
+    """
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        peak = 0
+        for _ in range(calls):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            fn()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+        retained = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+    return {'alloc_peak_bytes': int(peak), 'retained_bytes_per_call': retained / calls}
+
+
+def run_case(stage, case, fn, iterations, warmup, allocations):
+    for _ in range(warmup):
+        fn()
+    seconds = np.empty(iterations)
+    for i in range(iterations):
+        started = time.perf_counter()
+        fn()
+        seconds[i] = time.perf_counter() - started
+    result = {'stage': stage, 'case': case, **summarize(seconds)}
+    if allocations:
+        result.update(measure_allocations(fn, min(iterations, 50)))
+    return result
+
+
+def parse_resolution(text):
+    width, height = (int(v) for v in text.lower().split("x"))
+    return width, height
+
+
+def synthetic_frame(width, height, seed=0):
+    """Smooth gradient with a few blocks: encodes like a camera frame, not like noise"""
+    rng = np.random.default_rng(seed)
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    frame[..., 0] = np.linspace(30, 200, width, dtype=np.uint8)[None, :]
+    frame[..., 1] = np.linspace(60, 160, height, dtype=np.uint8)[:, None]
+    frame[..., 2] = 90
+    for _ in range(8):
+        x, y = rng.integers(0, width - 64), rng.integers(0, height - 64)
+        frame[y:y + 64, x:x + 64] = rng.integers(0, 255, 3)
+    return frame
+
+
+def random_boxes(count, width, height, size=(40, 160), seed=0):
+    """[count, 4] boxes of random size scattered over a width x height image"""
+    rng = np.random.default_rng(seed)
+    w = rng.uniform(*size, count)
+    h = rng.uniform(*size, count)
+    x1 = rng.uniform(0, width - w)
+    y1 = rng.uniform(0, height - h)
+    return np.stack([x1, y1, x1 + w, y1 + h], axis=1)
+
+
+def fake_detections(count, width, height, class_names, seed=0):
+    rng = np.random.default_rng(seed)
+    class_ids = rng.integers(0, len(class_names), count)
+    return [{'bbox': tuple(int(v) for v in box), 'class_id': int(c),
+             'class_name': class_names[c], 'confidence': float(s)}
+            for box, c, s in zip(random_boxes(count, width, height, seed=seed),
+                                 class_ids, rng.uniform(0.5, 1.0, count))]
+
+
+def output_fixture(detector, count, seed=0):
+    """One output tensor with count well-separated detections above threshold
+
+    Raw head or on-device NMS, whichever the detector's HEF reports.
+    """
+    rng = np.random.default_rng(seed)
+    shape = detector.hef.get_output_vstream_infos()[0].shape
+    boxes = random_boxes(count, detector.input_width, detector.input_height,
+                         size=(12, 48), seed=seed)
+    class_ids = rng.integers(0, len(detector.class_names), count)
+    scores = rng.uniform(max(detector.threshold, 0.5) + 0.01, 1.0, count)
+    if detector.nms_output:
+        return make_nms_output(boxes, class_ids, scores, detector.nms_output['classes'],
+                               detector.nms_output['max_boxes'],
+                               (detector.input_height, detector.input_width))[None]
+    return make_output(boxes, class_ids, scores, len(detector.class_names), shape)[None]
+
+
+def benchmark(detector, stages, resolutions, detection_counts, recorded, iterations,
+              warmup, allocations, quality):
+    results = []
+
+    def case(stage, name, fn):
+        result = run_case(stage, name, fn, iterations, warmup, allocations)
+        results.append(result)
+        print(f"   {stage:<12}{name:<22}p50 {result['p50_ms']:7.2f} ms"
+              f"   p99 {result['p99_ms']:7.2f} ms")
+
+    frames = {res: synthetic_frame(*res) for res in resolutions}
+    display_shape = frames[resolutions[-1]].shape
+
+    if "preprocess" in stages:
+        for (width, height), frame in frames.items():
+            case("preprocess", f"{width}x{height}",
+                 lambda frame=frame: detector.preprocess(frame, display_shape=frame.shape))
+
+    if "postprocess" in stages:
+        _, meta = detector.preprocess(frames[resolutions[-1]], display_shape=display_shape)
+        tensors = {f"{n} detections": output_fixture(detector, n) for n in detection_counts}
+        if recorded is not None:
+            tensors = {f"recorded[{len(recorded)}]": recorded}
+        for name, outputs in tensors.items():
+            index = iter(range(sys.maxsize))
+            case("postprocess", name,
+                 lambda outputs=outputs, index=index:
+                     detector.postprocess(outputs[next(index) % len(outputs)][None], meta))
+
+    if "nms" in stages:
+        rng = np.random.default_rng(0)
+        for count in detection_counts:
+            if not count:
+                continue
+            # Clustered candidates, as a detection head produces them
+            centers = random_boxes(max(count // 5, 1), 1280, 720)
+            boxes = (centers[rng.integers(0, len(centers), count)]
+                     + rng.normal(0, 4, (count, 4))).astype(np.float32)
+            scores = rng.uniform(0.3, 1.0, count).astype(np.float32)
+            class_ids = rng.integers(0, 3, count)
+            case("nms", f"{count} candidates",
+                 lambda boxes=boxes, scores=scores, class_ids=class_ids:
+                     nms_boxes(boxes, scores, class_ids, max_detections=100))
+
+    if "overlay" in stages:
+        for (width, height), frame in frames.items():
+            canvas = frame.copy()
+            for count in detection_counts:
+                detections = fake_detections(count, width, height, detector.class_names)
+                case("overlay", f"{width}x{height} / {count}",
+                     lambda canvas=canvas, detections=detections:
+                         overlay_renderer.draw(canvas, detections))
+
+    if "encode" in stages:
+        stream = JpegStream(quality=quality)
+        for (width, height), frame in frames.items():
+            case("encode", f"{width}x{height} q{quality}",
+                 lambda frame=frame: stream.encode(frame))
+
+    return results
+
+
+def environment():
+    """What the numbers depend on, stored next to them"""
+    info = {
+        'timestamp': datetime.now().isoformat(timespec="seconds"),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__ if HAS_CV2 else None,
+        'machine': platform.machine(),
+        'kernel': platform.release(),
+        'os': None,
+        'commit': None,
+        'fake_device': bool(os.environ.get("HAILO_FAKE")),
+    }
+    try:
+        for line in Path("/etc/os-release").read_text().splitlines():
+            if line.startswith("PRETTY_NAME="):
+                info['os'] = line.split("=", 1)[1].strip('"')
+    except OSError:
+        pass
+    try:
+        info['commit'] = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=Path(__file__).parent, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.TimeoutExpired):
+        pass
+    return info
+
+
+def compare(results, baseline_path, tolerance):
+    """Print the change against a baseline run; returns the regressed cases"""
+    runs = json.loads(Path(baseline_path).read_text())['results']
+    baseline = {(r['stage'], r['case']): r for r in runs}
+    regressions = []
+    print()
+    print(f"{'stage':<12}{'case':<22}{'p50 ms':>9}{'base':>9}{'change':>9}{'p95 change':>12}")
+    for r in results:
+        base = baseline.get((r['stage'], r['case']))
+        if base is None:
+            continue
+        p50 = r['p50_ms'] / base['p50_ms'] - 1 if base['p50_ms'] else 0.0
+        p95 = r['p95_ms'] / base['p95_ms'] - 1 if base['p95_ms'] else 0.0
+        slower = p50 > tolerance or p95 > tolerance
+        if slower:
+            regressions.append(r)
+        print(f"{r['stage']:<12}{r['case']:<22}{r['p50_ms']:>9.2f}{base['p50_ms']:>9.2f}"
+              f"{p50:>+9.0%}{p95:>+12.0%}{'  ⚠️' if slower else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the detection hot path per stage")
+    parser.add_argument("--model", help="Model name (looked up in models/) or path to a HEF")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES),
+                       help="Stages to run (default: all)")
+    parser.add_argument("--resolutions", nargs="+", default=list(DEFAULT_RESOLUTIONS),
+                       help="Frame sizes, WIDTHxHEIGHT (default: 640x480 1280x720 1920x1080)")
+    parser.add_argument("--detections", type=int, nargs="+", default=[0, 5, 20, 100],
+                       help="Detection counts for postprocess, NMS and overlays "
+                            "(default: 0 5 20 100)")
+    parser.add_argument("--outputs", type=str,
+                       help="Recorded output tensors (.npz from --dump-outputs) for postprocess")
+    parser.add_argument("--preprocess", choices=("letterbox", "resize"), default="letterbox",
+                       help="HailoDetector preprocess mode (default: letterbox)")
+    parser.add_argument("--quality", type=int, default=80,
+                       help="JPEG quality for the encode stage (default: 80)")
+    parser.add_argument("--iterations", type=int, default=200,
+                       help="Timed calls per case (default: 200)")
+    parser.add_argument("--warmup", dest="warmup_calls", type=int, default=20,
+                       help="Untimed calls before each case (default: 20)")
+    parser.add_argument("--no-allocations", action="store_true",
+                       help="Skip the tracemalloc pass")
+    parser.add_argument("--json", type=str, metavar="PATH",
+                       help="Write results and environment to this JSON file")
+    parser.add_argument("--compare", type=str, metavar="PATH",
+                       help="Baseline JSON to compare against; exits 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                       help="Slowdown of p50 or p95 counted as a regression (default: 0.10)")
+    args = pipeline_config.parse_args(parser)
+    if not args.model:
+        parser.error("--model is required (or model in --config)")
+
+    resolutions = [parse_resolution(r) for r in args.resolutions]
+    recorded = None
+    if args.outputs:
+        loaded = np.load(args.outputs)
+        recorded = loaded[loaded.files[0]] if hasattr(loaded, "files") else loaded
+
+    detector = HailoDetector(ModelRegistry().find(args.model), threshold=0.5,
+                             max_detections=max(args.detections + [1]),
+                             preprocess_mode=args.preprocess)
+    try:
+        print(f"⏱️  {args.iterations} iterations per case "
+              f"after {args.warmup_calls} warm-up calls")
+        results = benchmark(detector, args.stages, resolutions, args.detections, recorded,
+                            args.iterations, args.warmup_calls, not args.no_allocations,
+                            args.quality)
+    finally:
+        detector.cleanup()
+
+    print()
+    print(f"{'stage':<12}{'case':<22}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+          f"{'per s':>10}{'alloc KB':>10}")
+    for r in results:
+        alloc = f"{r['alloc_peak_bytes'] / 1024:.1f}" if 'alloc_peak_bytes' in r else "n/a"
+        print(f"{r['stage']:<12}{r['case']:<22}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}"
+              f"{r['p99_ms']:>9.2f}{r['per_second']:>10.0f}{alloc:>10}")
+
+    report = {'environment': environment(), 'settings': vars(args), 'results': results}
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+        print(f"\n💾 Results written to {args.json}")
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} case(s) more than {args.tolerance:.0%} slower")
+            sys.exit(1)
+        print("\n✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
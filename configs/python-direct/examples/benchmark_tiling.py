@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Compare tiled inference against a single full-frame pass
+
+For every configuration (full frame, then each tile size / overlap) this
+reports the regions sent per frame, per-frame latency and, when ground
+truth is available, recall at IoU 0.5.
+
+    python benchmark_tiling.py --model yolov8s.hef --frames recorded/
+    HAILO_FAKE=1 python benchmark_tiling.py --model yolov8s.hef --fake-frames 30
+
+--frames is a directory of recorded .jpg/.png frames. A YOLO-format label
+file next to an image (same name, .txt, one "class cx cy w h" line per object,
+normalized) provides its ground truth. --fake-frames renders synthetic
+1920x1080 frames with small objects at known positions instead.
+
+Each configuration gets its own detector whose device batch is the number
+of regions it sends per frame (1 for the full frame, tiles + 1 otherwise),
+the same sizing live_detection.py uses.
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+
+from live_detection import HailoDetector, HAS_CV2
+from tiling import TiledDetector, tile_grid
+from tracker import iou_matrix
+
+if HAS_CV2:
+    import cv2
+else:
+    from PIL import Image
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def load_labels(label_path, frame_shape):
+    """YOLO-format labels -> ([N, 4] pixel boxes, [N] class ids)"""
+    frame_h, frame_w = frame_shape[:2]
+    rows = np.loadtxt(label_path, ndmin=2) if label_path.stat().st_size else np.empty((0, 5))
+    class_ids = rows[:, 0].astype(int)
+    cx, cy, w, h = (rows[:, 1:5] * [frame_w, frame_h, frame_w, frame_h]).T
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+    return boxes, class_ids
+
+
+def recorded_frames(directory):
+    """Yield (frame, ground_truth or None) for every image in directory"""
+    for path in sorted(Path(directory).iterdir()):
+        if path.suffix.lower() not in IMAGE_SUFFIXES:
+            continue
+        if HAS_CV2:
+            frame = cv2.imread(str(path))
+        else:
+            frame = np.asarray(Image.open(path).convert("RGB"))[..., ::-1].copy()
+        label_path = path.with_suffix(".txt")
+        truth = load_labels(label_path, frame.shape) if label_path.exists() else None
+        yield frame, truth
+
+
+def synthetic_frames(count, size=(1920, 1080), objects=6, object_size=32, seed=0):
+    """Yield (frame, ground_truth) with small bright squares on a dark frame"""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    for _ in range(count):
+        frame = np.full((height, width, 3), 40, dtype=np.uint8)
+        x1 = rng.integers(0, width - object_size, objects)
+        y1 = rng.integers(0, height - object_size, objects)
+        boxes = np.stack([x1, y1, x1 + object_size, y1 + object_size], axis=1)
+        for bx1, by1, bx2, by2 in boxes:
+            frame[by1:by2, bx1:bx2] = 230
+        yield frame, (boxes.astype(np.float64), np.zeros(objects, dtype=int))
+
+
+def matched(detections, truth, iou_threshold=0.5):
+    """Number of ground-truth boxes found by a same-class detection"""
+    boxes, class_ids = truth
+    if not len(boxes) or not detections:
+        return 0
+    det_boxes = np.array([d['bbox'] for d in detections], dtype=np.float64)
+    det_classes = np.array([d['class_id'] for d in detections])
+    hits = ((iou_matrix(boxes, det_boxes) >= iou_threshold)
+            & (class_ids[:, None] == det_classes[None, :]))
+    return int(hits.any(axis=1).sum())
+
+
+def run_config(name, detect, regions, frames, iou_threshold):
+    latencies = []
+    found = total = detections_seen = 0
+    for frame, truth in frames:
+        started = time.perf_counter()
+        detections = detect(frame)
+        latencies.append(time.perf_counter() - started)
+        detections_seen += len(detections)
+        if truth is not None:
+            found += matched(detections, truth, iou_threshold)
+            total += len(truth[0])
+
+    latencies = np.array(latencies) * 1000
+    return {
+        'name': name,
+        'regions': regions,
+        'mean_ms': float(latencies.mean()),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'detections': detections_seen / len(latencies),
+        'recall': found / total if total else None,
+    }
+
+
+def timed_config(args, name, batch_size, frames, tiling=None):
+    """Benchmark one configuration on a detector sized to its batch"""
+    detector = HailoDetector(args.model, threshold=args.threshold, max_detections=100,
+                             batch_size=batch_size)
+    try:
+        detect = detector.detect
+        if tiling is not None:
+            detect = TiledDetector(detector, **tiling).detect
+        # Warm up the device before timing anything
+        detect(frames[0][0])
+        return run_config(name, detect, batch_size, frames, args.iou)
+    finally:
+        detector.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tiled vs full-frame inference")
+    parser.add_argument("--model", required=True, help="Path to HEF model")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--frames", help="Directory of recorded frames (+ optional YOLO labels)")
+    source.add_argument("--fake-frames", type=int, help="Render N synthetic 1920x1080 frames")
+    parser.add_argument("--tile-sizes", type=int, nargs="+", default=[640],
+                       help="Square tile sizes in frame pixels (default: 640)")
+    parser.add_argument("--overlaps", type=float, nargs="+", default=[0.1, 0.2],
+                       help="Tile overlaps to compare (default: 0.1 0.2)")
+    parser.add_argument("--threshold", type=float, default=0.3,
+                       help="Detection confidence threshold (default: 0.3)")
+    parser.add_argument("--iou", type=float, default=0.5,
+                       help="IoU counted as a hit for recall (default: 0.5)")
+    args = parser.parse_args()
+
+    if args.frames:
+        frames = list(recorded_frames(args.frames))
+    else:
+        frames = list(synthetic_frames(args.fake_frames))
+    if not frames:
+        print(f"❌ No frames found in {args.frames}")
+        return
+    frame_shape = frames[0][0].shape
+    print(f"🎞️  {len(frames)} frames at {frame_shape[1]}x{frame_shape[0]}")
+
+    results = [timed_config(args, "full frame", 1, frames)]
+    for size in args.tile_sizes:
+        for overlap in args.overlaps:
+            # One batch row per tile plus the full-frame pass
+            regions = len(tile_grid(frame_shape, (size, size), overlap)) + 1
+            results.append(timed_config(args, f"tiles {size}px / {overlap:.0%}", regions,
+                                        frames, {'tile_size': (size, size), 'overlap': overlap}))
+
+    print()
+    print(f"{'config':<22}{'regions':>8}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}"
+          f"{'dets':>8}{'recall':>9}")
+    for r in results:
+        recall = f"{r['recall']:.2f}" if r['recall'] is not None else "n/a"
+        print(f"{r['name']:<22}{r['regions']:>8}{r['mean_ms']:>10.1f}{r['p50_ms']:>10.1f}"
+              f"{r['p95_ms']:>10.1f}{r['detections']:>8.1f}{recall:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Live control of a running detector: thresholds, class filter, model swaps
+
+Sites are tuned remotely, and every restart loses several seconds of
+coverage, so settings change without stopping the camera or the Hailo
+context:
+
+    switcher = ModelSwitcher(detector, build=load_detector)
+    controller = Controller(switcher, registry=ModelRegistry())
+    ControlServer(controller, port=8081).start()     # HTTP, localhost only
+    ConfigWatcher(controller, "site.json").start()    # re-applied on every save
+
+Both accept the same JSON keys:
+
+    {"threshold": 0.4,
+     "class_thresholds": {"person": 0.3, "car": 0.6},
+     "classes": ["person", "car"],          # null: every class
+     "model": "yolov8m"}                    # name or .hef path
+
+    curl -s localhost:8081/config
+    curl -s -X POST localhost:8081/config -d '{"threshold": 0.35}'
+
+Threshold and class changes apply to the next frame postprocessed. A new
+model is built on a background thread, on the same scheduled VDevice
+(create_shared_vdevice), while the old one keeps running. The switch
+happens between frames: every frame finishes on the model that
+preprocessed it. The old network group is released once its last frame
+is through.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from hailo_platform import VDevice, HailoSchedulingAlgorithm
+
+SETTINGS = ("threshold", "class_thresholds", "classes", "model")
+
+
+def create_shared_vdevice():
+    """A VDevice running the scheduler, so two network groups can coexist during a swap"""
+    params = VDevice.create_params()
+    params.scheduling_algorithm = HailoSchedulingAlgorithm.ROUND_ROBIN
+    return VDevice(params)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _hailo(model):
+    """The HailoDetector inside a model (TiledDetector wraps one)"""
+    return getattr(model, "detector", model)
+
+
+class ModelSwitcher:
+    """Holds the active detector and swaps it between frames
+
+    detector_stages() calls select() once per frame and uses the returned
+    model for that frame's preprocess, infer and postprocess, then
+    release(). Frames dropped on the way release it too (see
+    live_detection.release_model). Other attributes pass through to the
+    active detector.
+    """
+
+    def __init__(self, detector, build=None, drain_timeout=5.0):
+        self.current = detector
+        self.build = build              # callable(model_path) -> detector
+        self.drain_timeout = drain_timeout
+        self.loading = None             # model path being loaded
+        self.last_error = None
+        self.swaps = 0
+        self._in_flight = {}
+        self._retired = set()
+        self._lock = threading.Lock()
+        self._loader = None
+
+    def __getattr__(self, name):
+        return getattr(self.current, name)
+
+    def select(self):
+        with self._lock:
+            model = self.current
+            self._in_flight[model] = self._in_flight.get(model, 0) + 1
+            return model
+
+    def release(self, model):
+        with self._lock:
+            # A retired model is no longer counted
+            if model in self._in_flight:
+                self._in_flight[model] -= 1
+
+    def usable(self, model):
+        """False once a model has been retired (a frame that outlived its drain timeout)"""
+        return model not in self._retired
+
+    def load(self, model_path):
+        """Build model_path in the background and switch to it; False if a load is running"""
+        return self.configure(model_path=model_path)
+
+    def configure(self, filters=None, model_path=None):
+        """Change the filter and/or start a model load as one step
+
+        Nothing changes if either part is rejected: a ValueError from the
+        filter, or False when a load is already running. Holding the lock
+        keeps a swap from copying the filter halfway through.
+        """
+        if model_path is not None and self.build is None:
+            raise RuntimeError("Model switching needs a build function")
+        with self._lock:
+            if model_path is not None and self.loading is not None:
+                return False
+            if filters:
+                _hailo(self.current).set_filter(**filters)
+            if model_path is not None:
+                self.loading = str(model_path)
+                self._loader = threading.Thread(target=self._load, args=(model_path,),
+                                                name="model-loader", daemon=True)
+                self._loader.start()
+        return True
+
+    def _load(self, model_path):
+        started = time.perf_counter()
+        try:
+            replacement = self.build(model_path)
+        except Exception as e:
+            self.last_error = f"{model_path}: {e}"
+            print(f"❌ Could not load {model_path}: {e}")
+            with self._lock:
+                self.loading = None
+            return
+
+        with self._lock:
+            # The new model keeps the live thresholds and class filter
+            settings = _hailo(self.current).filter_settings()
+            try:
+                _hailo(replacement).set_filter(**settings, all_classes=settings['classes'] is None)
+            except ValueError as e:
+                print(f"⚠️  Filter not carried over to the new model: {e}")
+            previous, self.current = self.current, replacement
+            self.loading = None
+            self.last_error = None
+            self.swaps += 1
+        print(f"🔁 Switched to {Path(str(model_path)).name} "
+              f"(loaded in {time.perf_counter() - started:.1f}s)")
+        self._retire(previous)
+
+    def _retire(self, model):
+        """Wait for the model's frames to finish, then release its network group"""
+        deadline = time.monotonic() + self.drain_timeout
+        while self._in_flight.get(model, 0) > 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        with self._lock:
+            # A frame that never came back (e.g. lost at shutdown) stops counting
+            self._retired.add(model)
+            self._in_flight.pop(model, None)
+        model.cleanup()
+
+    def cleanup(self):
+        if self._loader is not None:
+            self._loader.join(self.drain_timeout + 30)
+        self.current.cleanup()
+
+
+class Controller:
+    """Validates and applies settings changes to a ModelSwitcher"""
+
+    def __init__(self, switcher, registry=None):
+        self.switcher = switcher
+        self.registry = registry
+        self._lock = threading.Lock()
+
+    def status(self):
+        detector = _hailo(self.switcher.current)
+        return {**detector.filter_settings(),
+                'model': str(detector.model_path),
+                'loading': self.switcher.loading,
+                'swaps': self.switcher.swaps,
+                'last_error': self.switcher.last_error}
+
+    def apply(self, changes):
+        """Apply a dict of settings; raises ValueError on bad input"""
+        if not isinstance(changes, dict):
+            raise ValueError("Expected a JSON object")
+        unknown = set(changes) - set(SETTINGS)
+        if unknown:
+            raise ValueError(f"Unknown settings: {', '.join(sorted(unknown))}")
+
+        if "threshold" in changes and not _is_number(changes['threshold']):
+            raise ValueError("threshold must be a number")
+        class_thresholds = changes.get("class_thresholds", {})
+        if not isinstance(class_thresholds, dict) or not all(
+                isinstance(name, str) and _is_number(value)
+                for name, value in class_thresholds.items()):
+            raise ValueError("class_thresholds must map class names to thresholds")
+        classes = changes.get("classes", [])
+        if classes is not None and (not isinstance(classes, list) or
+                                    not all(isinstance(name, str) for name in classes)):
+            raise ValueError("classes must be a list of class names or null")
+        if changes.get("model") and not isinstance(changes['model'], str):
+            raise ValueError("model must be a model name or .hef path")
+
+        filters = {k: changes[k] for k in ("threshold", "class_thresholds") if k in changes}
+        if "classes" in changes:
+            if changes['classes'] is None:
+                filters['all_classes'] = True
+            else:
+                filters['classes'] = list(changes['classes'])
+
+        with self._lock:
+            # Everything that can fail is checked before anything changes
+            path = self._resolve(changes['model']) if changes.get("model") else None
+            current = Path(_hailo(self.switcher.current).model_path)
+            if path is not None and path.resolve() == current.resolve():
+                path = None
+            if not self.switcher.configure(filters, path):
+                raise ValueError(f"Still loading {self.switcher.loading}")
+            if filters:
+                print(f"🎚️  Detection filter: {_hailo(self.switcher.current).filter_settings()}")
+            if path is not None:
+                print(f"⏳ Loading {path} in the background")
+        return self.status()
+
+    def _resolve(self, model):
+        if self.registry is not None:
+            try:
+                return self.registry.find(model)
+            except FileNotFoundError as e:
+                raise ValueError(str(e))
+        path = Path(model)
+        if not path.exists():
+            raise ValueError(f"Model not found: {model}")
+        return path
+
+
+class _ControlHandler(BaseHTTPRequestHandler):
+    """GET /config returns the settings; POST /config applies a JSON body"""
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/config":
+            self._send(404, {'error': "not found"})
+            return
+        self._send(200, self.server.controller.status())
+
+    def do_POST(self):
+        if self.path.split("?", 1)[0] != "/config":
+            self._send(404, {'error': "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            changes = json.loads(self.rfile.read(length) or b"{}")
+            self._send(200, self.server.controller.apply(changes))
+        except ValueError as e:
+            self._send(400, {'error': str(e)})
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ControlServer:
+    """HTTP control endpoint; binds to localhost unless told otherwise"""
+
+    def __init__(self, controller, host="127.0.0.1", port=8081):
+        self.controller = controller
+        self.host = host
+        self.port = port
+        self._httpd = None
+        self._thread = None
+
+    def start(self):
+        self._httpd = ThreadingHTTPServer((self.host, self.port), _ControlHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.controller = self.controller
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        name="control-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+        if self._thread:
+            self._thread.join(2.0)
+            self._thread = None
+
+
+class ConfigWatcher:
+    """Applies a JSON settings file at start and whenever it changes"""
+
+    def __init__(self, controller, path, interval=1.0):
+        self.controller = controller
+        self.path = Path(path)
+        self.interval = interval
+        self._mtime = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def check(self):
+        """Apply the file if it changed since the last check"""
+        try:
+            mtime = self.path.stat().st_mtime
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        try:
+            self.controller.apply(json.loads(self.path.read_text()))
+            print(f"📝 Applied {self.path}")
+            return True
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Ignoring {self.path}: {e}")
+            return False
+
+    def start(self):
+        self.check()
+        self._thread = threading.Thread(target=self._run, name="config-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.check()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(2.0)
+            self._thread = None
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Multi-stream Hailo detection service on one shared VDevice
+
+Several camera streams, or several HEFs (e.g. detection plus
+classification), share a single VDevice running the Hailo round-robin
+scheduler. Each stream configures its own network group with its own
+priority and batch size and is fed from its own bounded queue by a
+dedicated worker thread, so the scheduler always has work queued from
+some stream and the accelerator is not idle between one camera's frames.
+
+    service = DetectorService()
+    service.add_stream("front", "yolov8s.hef", priority=18)
+    service.add_stream("back", "yolov8s.hef", priority=10)
+    service.start()
+    future = service.submit("front", frame)
+    detections = future.result()
+
+Run directly for a multi-camera demo (HAILO_FAKE=1 and --fake-camera work
+off-device). --micro-batch instead sends every camera through one network
+group behind a MicroBatcher (see batching.py):
+
+    python detector_service.py --model yolov8s.hef --cameras 2 --fake-camera
+    python detector_service.py --model yolov8s.hef --cameras 4 --micro-batch --batch-size 4
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+
+from batching import MicroBatcher
+from pipeline import StageQueue, DROP_OLDEST, DROP_POLICIES, _STOP
+from live_detection import HailoDetector
+from hailo_platform import VDevice, HailoSchedulingAlgorithm
+
+# HailoRT scheduler priority range (higher runs first)
+SCHEDULER_PRIORITY_MIN = 0
+SCHEDULER_PRIORITY_MAX = 31
+SCHEDULER_PRIORITY_NORMAL = 16
+
+
+class DetectorStream:
+    """One stream's detector, queue and worker inside a DetectorService"""
+
+    def __init__(self, name, detector, queue_size, drop_policy):
+        self.name = name
+        self.detector = detector
+        self.queue = StageQueue(name, queue_size, drop_policy,
+                                on_drop=self._cancel)
+        self.processed = 0
+        self.errors = 0
+        self._thread = None
+
+    @staticmethod
+    def _cancel(item):
+        item[2].cancel()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._worker, name=f"stream-{self.name}",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self.queue.put_stop()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _worker(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                return
+            frame, display_shape, future = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self.detector.detect(frame, display_shape))
+                self.processed += 1
+            except Exception as e:
+                self.errors += 1
+                future.set_exception(e)
+
+
+class DetectorService:
+    """Detectors for several streams sharing one scheduled VDevice"""
+
+    def __init__(self, queue_size=2, drop_policy=DROP_OLDEST,
+                 scheduling_algorithm=None):
+        self.queue_size = queue_size
+        self.drop_policy = drop_policy
+        self.streams = {}
+        self._started = False
+
+        params = VDevice.create_params()
+        params.scheduling_algorithm = (scheduling_algorithm or
+                                       HailoSchedulingAlgorithm.ROUND_ROBIN)
+        self.vdevice = VDevice(params)
+
+    def add_stream(self, name, model_path, priority=SCHEDULER_PRIORITY_NORMAL,
+                   batch_size=1, scheduler_timeout_ms=None, queue_size=None,
+                   detector_cls=HailoDetector, **detector_kwargs):
+        """Configure a network group for a new stream on the shared device
+
+        detector_cls lets a stream use a different model head (e.g. a
+        classifier subclass of HailoDetector) on the same device.
+        """
+        if name in self.streams:
+            raise ValueError(f"Stream already exists: {name}")
+        if not SCHEDULER_PRIORITY_MIN <= priority <= SCHEDULER_PRIORITY_MAX:
+            raise ValueError(f"Scheduler priority must be {SCHEDULER_PRIORITY_MIN}-"
+                             f"{SCHEDULER_PRIORITY_MAX}, got {priority}")
+
+        detector = detector_cls(
+            model_path, vdevice=self.vdevice, batch_size=batch_size,
+            priority=priority, scheduler_timeout_ms=scheduler_timeout_ms,
+            **detector_kwargs
+        )
+        stream = DetectorStream(name, detector, queue_size or self.queue_size,
+                                self.drop_policy)
+        self.streams[name] = stream
+        if self._started:
+            stream.start()
+        return stream
+
+    def remove_stream(self, name):
+        """Stop a stream and release its network group"""
+        stream = self.streams.pop(name)
+        stream.stop()
+        stream.detector.cleanup()
+
+    def start(self):
+        self._started = True
+        for stream in self.streams.values():
+            stream.start()
+
+    def submit(self, name, frame, display_shape=None):
+        """Queue a frame for a stream; returns a Future with its detections
+
+        If the stream's queue is full the drop policy applies and the
+        dropped frame's future is cancelled.
+        """
+        future = Future()
+        self.streams[name].queue.put((frame, display_shape, future))
+        return future
+
+    def stats(self):
+        return {name: {'processed': s.processed, 'dropped': s.queue.dropped,
+                       'errors': s.errors, 'queued': s.queue.qsize()}
+                for name, s in self.streams.items()}
+
+    def close(self):
+        """Stop every stream and release the shared device"""
+        for name in list(self.streams):
+            self.remove_stream(name)
+        self._started = False
+        if self.vdevice is not None:
+            self.vdevice.release()
+            self.vdevice = None
+
+
+def main():
+    """Run several cameras through one DetectorService"""
+    import argparse
+    from frame_sources import PicameraSource, FakeCamera, lores_size_for, HAS_PICAMERA2
+    if HAS_PICAMERA2:
+        from picamera2 import Picamera2
+    from model_registry import ModelRegistry
+    import pipeline_config
+
+    parser = argparse.ArgumentParser(description="Multi-stream Hailo detection service")
+    parser.add_argument("--model",
+                       help="Model name (looked up in models/) or path to a HEF")
+    parser.add_argument("--cameras", type=int, default=1,
+                       help="Number of camera streams, one per attached camera (default: 1)")
+    parser.add_argument("--batch-size", type=int, default=1,
+                       help="Batch size per network group (default: 1)")
+    parser.add_argument("--micro-batch", action="store_true",
+                       help="Batch frames from all cameras on one network group")
+    parser.add_argument("--max-wait-ms", type=float, default=8.0,
+                       help="Longest a micro-batch waits to fill (default: 8)")
+    parser.add_argument("--queue-size", type=int, default=2,
+                       help="Frames queued per stream (default: 2)")
+    parser.add_argument("--drop-policy", choices=DROP_POLICIES, default=DROP_OLDEST)
+    parser.add_argument("--fake-camera", action="store_true",
+                       help="Use synthetic cameras instead of Picamera2")
+    parser.add_argument("--duration", type=int, default=10,
+                       help="Run for N seconds (default: 10)")
+    args = pipeline_config.parse_args(parser)
+    if not args.model:
+        parser.error("--model is required (or model in --config)")
+    if not args.fake_camera and HAS_PICAMERA2:
+        attached = len(Picamera2.global_camera_info())
+        if args.cameras > attached:
+            parser.error(f"--cameras {args.cameras}, but only {attached} camera(s) attached")
+
+    registry = ModelRegistry()
+    model_path = registry.find(args.model)
+    model_info = registry.info(model_path)
+
+    service = DetectorService(queue_size=args.queue_size, drop_policy=args.drop_policy)
+    batcher = None
+    if args.micro_batch:
+        stream = service.add_stream("batched", model_path, batch_size=args.batch_size,
+                                    model_info=model_info)
+        stream.detector.warmup()
+        batcher = MicroBatcher(stream.detector, max_batch_size=args.batch_size,
+                               max_wait_ms=args.max_wait_ms,
+                               queue_size=args.queue_size * args.cameras,
+                               drop_policy=args.drop_policy)
+
+    main_size = (1280, 720)
+    cameras = []
+    for index in range(args.cameras):
+        name = f"camera{index}"
+        if batcher is None:
+            stream = service.add_stream(name, model_path, batch_size=args.batch_size,
+                                        model_info=model_info)
+            stream.detector.warmup()
+        model_size = (stream.detector.input_width, stream.detector.input_height)
+        # One physical camera per stream
+        camera = PicameraSource(
+            FakeCamera() if args.fake_camera else None,
+            main_size=main_size,
+            lores_size=lores_size_for(main_size, model_size),
+            camera_num=index
+        )
+        cameras.append((name, camera))
+
+    running = True
+
+    def feed(name, camera):
+        camera.start()
+        while running:
+            frame, model_frame = camera.read()
+            if batcher is not None:
+                batcher.submit(model_frame, display_shape=frame.shape)
+            else:
+                service.submit(name, model_frame, display_shape=frame.shape)
+        camera.stop()
+
+    if batcher is not None:
+        batcher.start()
+    else:
+        service.start()
+    feeders = [threading.Thread(target=feed, args=cam, daemon=True) for cam in cameras]
+    for thread in feeders:
+        thread.start()
+
+    start_time = time.time()
+    try:
+        while time.time() - start_time < args.duration:
+            time.sleep(1)
+            elapsed = time.time() - start_time
+            if batcher is not None:
+                print(f"📊 {batcher.frames / elapsed:.1f} FPS across {args.cameras} cameras | "
+                      f"Mean batch: {batcher.mean_batch_size:.1f} | "
+                      f"Dropped: {batcher.queue.dropped}")
+                continue
+            for name, stat in service.stats().items():
+                print(f"📊 {name}: {stat['processed'] / elapsed:.1f} FPS | "
+                      f"Dropped: {stat['dropped']} | Errors: {stat['errors']}")
+    except KeyboardInterrupt:
+        print("\n⏹️  Stopping...")
+    finally:
+        running = False
+        for thread in feeders:
+            thread.join(2.0)
+        if batcher is not None:
+            batcher.stop()
+        service.close()
+        print("✅ Cleanup complete")
+
+
+if __name__ == "__main__":
+    main()
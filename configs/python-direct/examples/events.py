@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Structured detection events with batched, off-thread sinks
+
+EventBus turns every frame's detections into flat event records:
+
+    {"timestamp": 1718000000.123, "camera": "front", "frame_id": 42,
+     "class_id": 0, "class_name": "person", "confidence": 0.91,
+     "track_id": 7, "bbox": [x1, y1, x2, y2]}
+
+and fans them out to pluggable sinks. publish() only appends to one bounded
+queue per sink, so it never touches the disk or network. Each sink has its
+own worker thread that writes in batches. A slow sink drops its oldest
+frames (counted in stats()) instead of slowing the camera loop or the other
+sinks.
+
+    bus = EventBus([JsonlSink("events.jsonl"), SqliteSink("events.db")],
+                   camera="front")
+    bus.start()
+    bus.publish(frame_id, detections)       # every frame, from the hot path
+    bus.close()
+
+Sinks:
+    JsonlSink  - append-only JSON lines, fsync batched to once per interval
+    SqliteSink - WAL-mode SQLite, one transaction per batch, indexed on
+                 (camera, class_name, timestamp)
+    MqttSink   - one JSON message per frame via paho-mqtt; tests and demos
+                 can use fake_mqtt.LocalBroker instead of a real broker
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from pipeline import StageQueue, DROP_OLDEST, _STOP
+
+try:
+    import paho.mqtt.client as mqtt
+    HAS_PAHO = True
+except ImportError:
+    HAS_PAHO = False
+
+
+def frame_events(camera, frame_id, timestamp, detections):
+    """Flatten one frame's detections into event records"""
+    return [{
+        'timestamp': timestamp,
+        'camera': camera,
+        'frame_id': frame_id,
+        'class_id': int(d['class_id']),
+        'class_name': d['class_name'],
+        'confidence': round(float(d['confidence']), 4),
+        'track_id': d.get('track_id'),
+        'bbox': [int(v) for v in d['bbox']],
+    } for d in detections]
+
+
+class JsonlSink:
+    """Append-only JSON lines file with batched fsync"""
+
+    name = "jsonl"
+
+    def __init__(self, path, fsync_interval=1.0):
+        self.path = str(path)
+        self.fsync_interval = fsync_interval
+        self._file = None
+        self._last_sync = 0.0
+
+    def open(self):
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def write(self, events):
+        self._file.write("".join(json.dumps(e, separators=(",", ":")) + "\n" for e in events))
+        if time.monotonic() - self._last_sync >= self.fsync_interval:
+            self.flush()
+
+    def flush(self):
+        if self._file is None:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+
+class SqliteSink:
+    """SQLite in WAL mode with one transaction per batch"""
+
+    name = "sqlite"
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS detections (
+            id INTEGER PRIMARY KEY,
+            timestamp REAL NOT NULL,
+            camera TEXT NOT NULL,
+            frame_id INTEGER,
+            class_id INTEGER,
+            class_name TEXT NOT NULL,
+            confidence REAL,
+            track_id INTEGER,
+            x1 INTEGER, y1 INTEGER, x2 INTEGER, y2 INTEGER
+        );
+        CREATE INDEX IF NOT EXISTS idx_detections_camera_class_time
+            ON detections (camera, class_name, timestamp);
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._db = None
+
+    def open(self):
+        # Opened on the sink's worker thread, which is the only one using it
+        self._db = sqlite3.connect(self.path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(self.SCHEMA)
+
+    def write(self, events):
+        with self._db:
+            self._db.executemany(
+                "INSERT INTO detections (timestamp, camera, frame_id, class_id, class_name, "
+                "confidence, track_id, x1, y1, x2, y2) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(e['timestamp'], e['camera'], e['frame_id'], e['class_id'], e['class_name'],
+                  e['confidence'], e['track_id'], *e['bbox']) for e in events]
+            )
+
+    def flush(self):
+        pass  # Every batch is already its own transaction
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+class MqttSink:
+    """Publishes each frame's events as one JSON message
+
+    topic may contain {camera}. client is any paho-compatible client
+    (e.g. fake_mqtt.LocalBroker().client()); by default a paho client
+    connects to host:port.
+    """
+
+    name = "mqtt"
+
+    def __init__(self, host="localhost", port=1883, topic="hailo/{camera}/detections",
+                 qos=0, client=None):
+        if client is None and not HAS_PAHO:
+            raise RuntimeError("paho-mqtt is not installed (pip install paho-mqtt)")
+        self.host = host
+        self.port = port
+        self.topic = topic
+        self.qos = qos
+        self.client = client
+        self._owns_client = client is None
+
+    def open(self):
+        if self.client is None:
+            self.client = mqtt.Client()
+        if self._owns_client:
+            self.client.connect(self.host, self.port)
+            self.client.loop_start()
+
+    def write(self, events):
+        frames = {}
+        for e in events:
+            frames.setdefault((e['camera'], e['frame_id']), []).append(e)
+        for (camera, _), frame in frames.items():
+            self.client.publish(self.topic.format(camera=camera),
+                                json.dumps(frame, separators=(",", ":")), qos=self.qos)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        if self._owns_client and self.client is not None:
+            self.client.loop_stop()
+            self.client.disconnect()
+
+
+class SinkWorker:
+    """Bounded queue and writer thread in front of one sink"""
+
+    def __init__(self, sink, queue_size=1024, batch_size=256, flush_interval=1.0):
+        self.sink = sink
+        self.queue = StageQueue(getattr(sink, "name", "sink"), queue_size, DROP_OLDEST)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.errors = 0
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name=f"events-{self.queue.name}")
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self.queue.put_stop()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _gather(self):
+        """Wait for one frame, then take whatever else is queued; (events, stopping)"""
+        item = self.queue.get(timeout=self.flush_interval)
+        if item is _STOP:
+            return [], True
+        events = frame_events(*item)
+        while len(events) < self.batch_size:
+            try:
+                item = self.queue.get(timeout=0)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return events, True
+            events.extend(frame_events(*item))
+        return events, False
+
+    def _run(self):
+        try:
+            self.sink.open()
+        except Exception as e:
+            print(f"⚠️  Event sink {self.queue.name} failed to open: {e}")
+            return
+        stopping = False
+        while not stopping:
+            try:
+                events, stopping = self._gather()
+            except queue.Empty:
+                events = []
+            try:
+                if events:
+                    self.sink.write(events)
+                    self.written += len(events)
+                else:
+                    self.sink.flush()
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️  Event sink {self.queue.name} write failed: {e}")
+        try:
+            self.sink.close()
+        except Exception as e:
+            print(f"⚠️  Event sink {self.queue.name} failed to close: {e}")
+
+
+class EventBus:
+    """Fans detection events out to sinks without blocking the caller"""
+
+    def __init__(self, sinks, camera="camera0", queue_size=1024, batch_size=256,
+                 flush_interval=1.0, skip_empty=True):
+        self.camera = camera
+        self.skip_empty = skip_empty
+        self.workers = [SinkWorker(sink, queue_size, batch_size, flush_interval)
+                        for sink in sinks]
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+        return self
+
+    def publish(self, frame_id, detections, timestamp=None, camera=None):
+        """Queue one frame's detections for every sink; never blocks"""
+        if self.skip_empty and not detections:
+            return
+        item = (camera or self.camera, frame_id,
+                time.time() if timestamp is None else timestamp, list(detections))
+        for worker in self.workers:
+            worker.queue.put(item)
+
+    def stats(self):
+        return {w.queue.name: {'written': w.written, 'dropped': w.queue.dropped,
+                               'errors': w.errors, 'queued': w.queue.qsize()}
+                for w in self.workers}
+
+    def close(self):
+        """Drain every queue and close the sinks"""
+        for worker in self.workers:
+            worker.stop()
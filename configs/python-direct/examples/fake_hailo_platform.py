@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+Off-device stand-in for the hailo_platform module
+
+⚠️  NOT A DEVICE DRIVER - no inference happens here!
+
+Implements the small part of the HailoRT Python API used by
+live_detection.py (HEF, VDevice, configured network groups, InferVStreams)
+so the detector lifecycle can be exercised on any Linux box:
+
+    HAILO_FAKE=1 python configs/python-direct/examples/live_detection.py
+
+or from Python:
+
+    import fake_hailo_platform
+    fake_hailo_platform.install()   # before importing live_detection
+
+Every object records what happened to it in STATS, and fail_next() injects
+device errors so the reconnect path can be driven on demand.
+
+By default infer() returns zero-filled outputs of a raw YOLOv8 head
+immediately; use_nms_output() (or HAILO_FAKE_NMS=1) makes every HEF look
+compiled with on-device NMS instead. To benchmark
+the whole pipeline (preprocess, postprocess, tracking, ...) on realistic
+data, replay() feeds back output tensors recorded on a real device (see
+HailoDetector.record_outputs) with a simulated device latency:
+
+    HAILO_FAKE=1 HAILO_FAKE_OUTPUTS=outputs.npz HAILO_FAKE_LATENCY_MS=12 \
+        python configs/python-direct/examples/live_detection.py --source clip.mp4
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+# Shapes reported by every fake HEF (YOLOv8 640x640, raw 84-channel head)
+INPUT_SHAPE = (640, 640, 3)
+RAW_OUTPUT_SHAPE = (84, 8400)
+OUTPUT_SHAPE = RAW_OUTPUT_SHAPE
+
+# Output of a HEF compiled with on-device NMS, in the TF NMS format:
+# [classes, (y_min, x_min, y_max, x_max, score), max boxes per class]
+NMS_OUTPUT_SHAPE = (80, 5, 100)
+
+# Lifecycle counters: vstreams_created, vstreams_closed, activations, ...
+STATS = Counter()
+
+_lock = threading.Lock()
+_pending_failures = 0
+
+# Recorded [N, ...] output tensors replayed in order by infer(), if any
+_replay_outputs = None
+_replay_index = 0
+
+# Simulated device time for each infer() call
+LATENCY = {"per_call_ms": 0.0, "per_frame_ms": 0.0}
+
+
+class HailoRTException(Exception):
+    """Raised where HailoRT would report a device error"""
+
+
+class FormatType:
+    AUTO = "AUTO"
+    UINT8 = "UINT8"
+    UINT16 = "UINT16"
+    FLOAT32 = "FLOAT32"
+
+
+class HailoStreamInterface:
+    PCIe = "PCIe"
+    ETH = "ETH"
+
+
+class HailoSchedulingAlgorithm:
+    NONE = "NONE"
+    ROUND_ROBIN = "ROUND_ROBIN"
+
+
+class ConfigureParams:
+    """Per-network-group configure parameters (only batch_size is honoured)"""
+
+    def __init__(self):
+        self.batch_size = 1
+
+    @staticmethod
+    def create_from_hef(hef, interface=None):
+        return {name: ConfigureParams() for name in hef.get_network_group_names()}
+
+
+class VDeviceParams:
+    """Parameters returned by VDevice.create_params()"""
+
+    def __init__(self):
+        self.scheduling_algorithm = HailoSchedulingAlgorithm.NONE
+        self.group_id = None
+
+
+class VStreamInfo:
+    """Name and shape of one input or output vstream"""
+
+    def __init__(self, name, shape):
+        self.name = name
+        self.shape = tuple(shape)
+
+    def __repr__(self):
+        return f"VStreamInfo(name={self.name!r}, shape={self.shape})"
+
+
+class NmsShape:
+    """Class and box counts of an NMS output (VStreamInfo.nms_shape)"""
+
+    def __init__(self, number_of_classes, max_bboxes_per_class):
+        self.number_of_classes = number_of_classes
+        self.max_bboxes_per_class = max_bboxes_per_class
+
+
+class VStreamParams:
+    """Format requested for one vstream"""
+
+    def __init__(self, name, format_type, quantized):
+        self.name = name
+        self.format_type = format_type
+        self.quantized = quantized
+
+
+def reset():
+    """Clear the counters and any pending injected failures"""
+    global _pending_failures
+    with _lock:
+        STATS.clear()
+        _pending_failures = 0
+
+
+def fail_next(count=1):
+    """Make the next `count` infer() calls raise HailoRTException"""
+    global _pending_failures
+    with _lock:
+        _pending_failures += count
+
+
+def replay(outputs, latency_ms=None, per_frame_ms=None):
+    """Make infer() return recorded output tensors, cycling through them
+
+    outputs is an [N, ...] array, a list of per-frame arrays, or the path
+    of a .npy/.npz file (as written by HailoDetector.save_recorded_outputs).
+    Passing None goes back to zero-filled outputs. The fake HEF reports the
+    recorded per-frame shape as its output shape.
+    """
+    global _replay_outputs, _replay_index, OUTPUT_SHAPE
+    if isinstance(outputs, (str, os.PathLike)):
+        loaded = np.load(outputs)
+        outputs = loaded[loaded.files[0]] if hasattr(loaded, "files") else loaded
+    with _lock:
+        _replay_index = 0
+        if outputs is None:
+            _replay_outputs = None
+        else:
+            _replay_outputs = np.ascontiguousarray(np.stack(list(outputs)), dtype=np.float32)
+            OUTPUT_SHAPE = _replay_outputs.shape[1:]
+    if latency_ms is not None or per_frame_ms is not None:
+        set_latency(latency_ms or 0.0, per_frame_ms or 0.0)
+
+
+def use_nms_output(enabled=True, shape=NMS_OUTPUT_SHAPE):
+    """Make every HEF end in on-device NMS (or, with enabled=False, the raw head)"""
+    global OUTPUT_SHAPE
+    OUTPUT_SHAPE = tuple(shape) if enabled else RAW_OUTPUT_SHAPE
+
+
+def is_nms_shape(shape):
+    return len(shape) == 3 and shape[1] == 5
+
+
+def set_latency(per_call_ms=0.0, per_frame_ms=0.0):
+    """Simulated device time: per_call_ms + per_frame_ms * batch per infer()"""
+    LATENCY["per_call_ms"] = float(per_call_ms)
+    LATENCY["per_frame_ms"] = float(per_frame_ms)
+
+
+def make_output(boxes, class_ids, scores, num_classes=80, shape=None):
+    """Build one raw YOLOv8 output tensor holding the given detections
+
+    boxes are (x1, y1, x2, y2) in model input pixels. Useful for replay()
+    fixtures with known answers.
+    """
+    shape = tuple(shape or OUTPUT_SHAPE)
+    channels_first = shape[0] == 4 + num_classes
+    output = np.zeros((4 + num_classes, shape[1] if channels_first else shape[0]),
+                      dtype=np.float32)
+    for i, ((x1, y1, x2, y2), class_id, score) in enumerate(zip(boxes, class_ids, scores)):
+        output[:4, i] = ((x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1)
+        output[4 + class_id, i] = score
+    return output if channels_first else output.T
+
+
+def make_nms_output(boxes, class_ids, scores, num_classes=80, max_boxes=100,
+                    input_shape=INPUT_SHAPE):
+    """Build one on-device NMS output (TF NMS format) holding the given detections
+
+    boxes are (x1, y1, x2, y2) in model input pixels, as for make_output();
+    they are stored normalized as (y_min, x_min, y_max, x_max, score).
+    """
+    height, width = input_shape[:2]
+    output = np.zeros((num_classes, 5, max_boxes), dtype=np.float32)
+    filled = Counter()
+    for (x1, y1, x2, y2), class_id, score in zip(boxes, class_ids, scores):
+        slot = filled[class_id]
+        if slot == max_boxes:
+            continue
+        output[class_id, :, slot] = (y1 / height, x1 / width, y2 / height, x2 / width, score)
+        filled[class_id] += 1
+    return output
+
+
+def _next_outputs(batch):
+    """Replayed tensors for one batch, or None when not replaying"""
+    global _replay_index
+    with _lock:
+        if _replay_outputs is None:
+            return None
+        rows = (_replay_index + np.arange(batch)) % len(_replay_outputs)
+        _replay_index += batch
+        return _replay_outputs[rows]
+
+
+def _take_failure():
+    global _pending_failures
+    with _lock:
+        if _pending_failures:
+            _pending_failures -= 1
+            return True
+    return False
+
+
+class HEF:
+    """Fake HEF exposing fixed vstream infos"""
+
+    def __init__(self, hef_path):
+        self.path = str(hef_path)
+        self._network_name = "yolov8"
+
+    def get_network_group_names(self):
+        return [self._network_name]
+
+    def get_input_vstream_infos(self, network_name=None):
+        return [VStreamInfo(f"{self._network_name}/input_layer1", INPUT_SHAPE)]
+
+    def get_output_vstream_infos(self, network_name=None):
+        # OUTPUT_SHAPE is read at call time so replay() can change it
+        if is_nms_shape(OUTPUT_SHAPE):
+            info = VStreamInfo(f"{self._network_name}/yolov8_nms_postprocess", OUTPUT_SHAPE)
+            info.nms_shape = NmsShape(OUTPUT_SHAPE[0], OUTPUT_SHAPE[2])
+            return [info]
+        return [VStreamInfo(f"{self._network_name}/yolov8_output", OUTPUT_SHAPE)]
+
+
+class _Activation:
+    """Context manager returned by ConfiguredNetwork.activate()"""
+
+    def __init__(self, network_group):
+        self.network_group = network_group
+
+    def __enter__(self):
+        if self.network_group.active:
+            raise HailoRTException("Network group is already active")
+        self.network_group.active = True
+        STATS["activations"] += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self.network_group.active = False
+        STATS["deactivations"] += 1
+        return False
+
+
+class ConfiguredNetwork:
+    """A network group configured on a fake VDevice"""
+
+    def __init__(self, device, hef, batch_size=1):
+        self.device = device
+        self.hef = hef
+        self.batch_size = batch_size
+        self.active = False
+        self.released = False
+        self.scheduler_priority = None
+        self.scheduler_timeout_ms = None
+        self.scheduler_threshold = None
+
+    @property
+    def scheduled(self):
+        return self.device.scheduling_algorithm != HailoSchedulingAlgorithm.NONE
+
+    def create_params(self):
+        return {}
+
+    def set_scheduler_priority(self, priority):
+        self._require_scheduler()
+        self.scheduler_priority = priority
+
+    def set_scheduler_timeout(self, timeout_ms):
+        self._require_scheduler()
+        self.scheduler_timeout_ms = timeout_ms
+
+    def set_scheduler_threshold(self, threshold):
+        self._require_scheduler()
+        self.scheduler_threshold = threshold
+
+    def _require_scheduler(self):
+        if not self.scheduled:
+            raise HailoRTException("Scheduler settings need a VDevice with a scheduler")
+
+    def activate(self, network_group_params=None):
+        if self.scheduled:
+            raise HailoRTException("Manual activation is not allowed with the scheduler")
+        return _Activation(self)
+
+    def get_input_vstream_infos(self):
+        return self.hef.get_input_vstream_infos()
+
+    def get_output_vstream_infos(self):
+        return self.hef.get_output_vstream_infos()
+
+    def make_input_vstream_params(self, format_type=FormatType.AUTO, quantized=True):
+        return {info.name: VStreamParams(info.name, format_type, quantized)
+                for info in self.get_input_vstream_infos()}
+
+    def make_output_vstream_params(self, format_type=FormatType.AUTO, quantized=True):
+        return {info.name: VStreamParams(info.name, format_type, quantized)
+                for info in self.get_output_vstream_infos()}
+
+
+class VDevice:
+    """Fake virtual device; configure() hands out ConfiguredNetwork objects"""
+
+    def __init__(self, params=None):
+        self.params = params
+        self.scheduling_algorithm = getattr(params, "scheduling_algorithm",
+                                            HailoSchedulingAlgorithm.NONE)
+        self.network_groups = []
+        self.released = False
+        STATS["vdevices_created"] += 1
+
+    @staticmethod
+    def create_params():
+        return VDeviceParams()
+
+    def get_physical_devices(self):
+        return ["fake-hailo8"]
+
+    def configure(self, hef, configure_params=None):
+        if self.released:
+            raise HailoRTException("VDevice has been released")
+        batch_size = 1
+        if configure_params:
+            batch_size = next(iter(configure_params.values())).batch_size
+        network_group = ConfiguredNetwork(self, hef, batch_size)
+        self.network_groups.append(network_group)
+        STATS["configures"] += 1
+        return [network_group]
+
+    def release(self):
+        for network_group in self.network_groups:
+            network_group.released = True
+        self.released = True
+        STATS["vdevices_released"] += 1
+
+
+class InferVStreams:
+    """Fake inference pipeline returning zero-filled output tensors"""
+
+    def __init__(self, network_group, input_vstreams_params, output_vstreams_params):
+        self.network_group = network_group
+        self.input_vstreams_params = input_vstreams_params
+        self.output_vstreams_params = output_vstreams_params
+        self.open = False
+
+    def __enter__(self):
+        self.open = True
+        STATS["vstreams_created"] += 1
+        return self
+
+    def __exit__(self, *exc_info):
+        self.open = False
+        STATS["vstreams_closed"] += 1
+        return False
+
+    def infer(self, input_data):
+        if not self.open:
+            raise HailoRTException("InferVStreams is not open")
+        if not (self.network_group.active or self.network_group.scheduled):
+            raise HailoRTException("Network group is not activated")
+        if _take_failure():
+            raise HailoRTException("HAILO_STREAM_ABORTED_BY_USER(injected)")
+
+        for name, data in input_data.items():
+            params = self.input_vstreams_params.get(name)
+            if params is None:
+                raise HailoRTException(f"Unknown input vstream: {name}")
+            if params.format_type == FormatType.UINT8 and data.dtype != np.uint8:
+                raise HailoRTException(f"{name} expects uint8 input, got {data.dtype}")
+
+        batch = len(next(iter(input_data.values())))
+        STATS["infers"] += 1
+        STATS["frames"] += batch
+        delay = LATENCY["per_call_ms"] + LATENCY["per_frame_ms"] * batch
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        replayed = _next_outputs(batch)
+        outputs = {}
+        for i, info in enumerate(self.network_group.get_output_vstream_infos()):
+            if replayed is not None and i == 0:
+                outputs[info.name] = replayed
+            else:
+                outputs[info.name] = np.zeros((batch,) + info.shape, dtype=np.float32)
+        return outputs
+
+
+def install():
+    """Register this module as hailo_platform for subsequent imports
+
+    HAILO_FAKE_OUTPUTS (a recorded .npz/.npy), HAILO_FAKE_LATENCY_MS and
+    HAILO_FAKE_FRAME_MS configure replay() from the environment;
+    HAILO_FAKE_NMS=1 switches to on-device NMS outputs.
+    """
+    sys.modules["hailo_platform"] = sys.modules[__name__]
+    if os.environ.get("HAILO_FAKE_NMS"):
+        use_nms_output()
+    if os.environ.get("HAILO_FAKE_OUTPUTS"):
+        replay(os.environ["HAILO_FAKE_OUTPUTS"])
+    set_latency(float(os.environ.get("HAILO_FAKE_LATENCY_MS", 0)),
+                float(os.environ.get("HAILO_FAKE_FRAME_MS", 0)))
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+In-process MQTT broker stand-in
+
+⚠️  NOT A NETWORK BROKER - messages never leave the process!
+
+Lets events.MqttSink be exercised without mosquitto or paho-mqtt. Clients
+implement the subset of the paho Client API the sink uses, and the broker
+keeps every message and hands it to matching subscribers (MQTT + and #
+wildcards are supported):
+
+    broker = LocalBroker()
+    broker.subscribe("hailo/+/detections", lambda topic, payload: ...)
+    sink = MqttSink(client=broker.client())
+"""
+
+import threading
+from collections import namedtuple
+
+Message = namedtuple("Message", "topic payload qos")
+
+
+def topic_matches(topic_filter, topic):
+    """MQTT topic filter match with + (one level) and # (the rest)"""
+    filter_parts = topic_filter.split("/")
+    topic_parts = topic.split("/")
+    for i, part in enumerate(filter_parts):
+        if part == "#":
+            return True
+        if i >= len(topic_parts) or (part != "+" and part != topic_parts[i]):
+            return False
+    return len(filter_parts) == len(topic_parts)
+
+
+class PublishResult:
+    """What paho's publish() returns, already complete"""
+
+    rc = 0
+
+    def wait_for_publish(self, timeout=None):
+        return True
+
+    def is_published(self):
+        return True
+
+
+class LocalBroker:
+    """Keeps published messages and forwards them to subscribers"""
+
+    def __init__(self):
+        self.messages = []
+        self._subscriptions = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, topic_filter, callback):
+        """callback(topic, payload) for every matching message"""
+        with self._lock:
+            self._subscriptions.append((topic_filter, callback))
+
+    def publish(self, topic, payload, qos=0):
+        if isinstance(payload, str):
+            payload = payload.encode()
+        with self._lock:
+            self.messages.append(Message(topic, payload, qos))
+            callbacks = [cb for f, cb in self._subscriptions if topic_matches(f, topic)]
+        for callback in callbacks:
+            callback(topic, payload)
+
+    def client(self):
+        return Client(self)
+
+
+class Client:
+    """paho-mqtt Client stand-in bound to a LocalBroker"""
+
+    def __init__(self, broker):
+        self.broker = broker
+        self.connected = False
+
+    def connect(self, host="localhost", port=1883, keepalive=60):
+        self.connected = True
+        return 0
+
+    def loop_start(self):
+        pass
+
+    def loop_stop(self):
+        pass
+
+    def disconnect(self):
+        self.connected = False
+        return 0
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        self.broker.publish(topic, payload, qos)
+        return PublishResult()
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Frame sources for the Python detection pipeline
+
+Every source implements FrameSource: start(), stop() and read(), which
+returns (display_frame, model_frame) - model_frame may be None, in which
+case the detector resizes the display frame itself - or None once the
+source is exhausted.
+
+PicameraSource captures the full-resolution `main` stream for display and
+recording together with the ISP-scaled `lores` stream for inference, both
+from the same capture request, so every detection maps onto the main frame
+with a known scale and the resize never touches the CPU. lores keeps main's
+aspect ratio by default (see lores_size_for); the detector letterboxes it.
+
+VideoFileSource and ImageDirectorySource replay recordings, so the pipeline
+can be profiled and regression-tested off a Pi; unpaced, they run as fast
+as the pipeline accepts frames.
+
+FakeCamera mimics the parts of the Picamera2 API used here and renders a
+moving box whose position is known, so request pairing and coordinate
+mapping can be checked without a camera.
+
+open_source() picks one from a command-line style spec.
+"""
+
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+try:
+    from picamera2 import Picamera2
+    HAS_PICAMERA2 = True
+except ImportError:
+    HAS_PICAMERA2 = False
+
+try:
+    import cv2
+    HAS_CV2 = True
+except ImportError:
+    HAS_CV2 = False
+    from PIL import Image
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".bmp")
+
+# Model input size assumed when no lores size is given (YOLOv8 640x640)
+MODEL_SIZE = (640, 640)
+
+
+def lores_size_for(main_size, model_size=MODEL_SIZE):
+    """lores (width, height) with main's aspect ratio, fitting the model input
+
+    The long side matches the model input. Scaling straight to a square
+    model size would squash a 16:9 frame in the ISP, and the letterbox
+    could no longer undo it.
+    """
+    main_w, main_h = main_size
+    model_w, model_h = model_size
+    scale = min(model_w / main_w, model_h / main_h)
+    # Even sizes, as the ISP expects
+    return (max(2, int(round(main_w * scale / 2)) * 2),
+            max(2, int(round(main_h * scale / 2)) * 2))
+
+
+class FrameSource:
+    """Base for frame sources; optionally paced to fps"""
+
+    def __init__(self, fps=None):
+        self.fps = fps
+        self._next_due = None
+
+    def start(self, warmup=0.0):
+        pass
+
+    def stop(self):
+        pass
+
+    def read(self):
+        raise NotImplementedError
+
+    def __iter__(self):
+        while True:
+            item = self.read()
+            if item is None:
+                return
+            yield item
+
+    def _pace(self):
+        """Sleep until the next frame is due (no-op when unpaced)"""
+        if not self.fps:
+            return
+        now = time.monotonic()
+        if self._next_due is None or self._next_due < now - 1.0:
+            self._next_due = now
+        elif self._next_due > now:
+            time.sleep(self._next_due - now)
+        self._next_due += 1.0 / self.fps
+
+
+class PicameraSource(FrameSource):
+    """Paired main/lores capture from a Picamera2 (or FakeCamera)
+
+    read() returns (main, lores); lores is None when use_lores is False, in
+    which case the caller resizes main itself. Without a camera object,
+    Picamera2 opens camera number camera_num (0 is the first).
+    """
+
+    def __init__(self, camera=None, main_size=(1280, 720), lores_size=None,
+                 use_lores=True, camera_num=0):
+        if camera is None:
+            if not HAS_PICAMERA2:
+                raise RuntimeError("picamera2 is not installed")
+            camera = Picamera2(camera_num=camera_num)
+        super().__init__()
+        self.camera = camera
+        self.main_size = tuple(main_size)
+        self.lores_size = tuple(lores_size or lores_size_for(self.main_size))
+        self.use_lores = use_lores
+
+        config = camera.create_preview_configuration(
+            main={"size": self.main_size, "format": "RGB888"},
+            lores={"size": self.lores_size, "format": "RGB888"},
+            display="lores"
+        )
+        camera.configure(config)
+
+    def start(self, warmup=2.0):
+        self.camera.start()
+        time.sleep(warmup)  # Let camera warm up
+
+    def stop(self):
+        self.camera.stop()
+
+    def read(self):
+        """Capture main and lores from one request so they show the same instant"""
+        if not self.use_lores:
+            return self.camera.capture_array("main"), None
+
+        request = self.camera.capture_request()
+        try:
+            main = request.make_array("main")
+            lores = request.make_array("lores")
+        finally:
+            request.release()
+        return main, lores
+
+
+class VideoFileSource(FrameSource):
+    """Frames from a video file via OpenCV; loop to replay it forever"""
+
+    def __init__(self, path, fps=None, loop=False):
+        if not HAS_CV2:
+            raise RuntimeError("Reading video files needs OpenCV")
+        super().__init__(fps)
+        self.path = str(path)
+        self.loop = loop
+        self.capture = None
+        self.native_fps = None
+        self.frames_read = 0
+
+    def start(self, warmup=0.0):
+        self.capture = cv2.VideoCapture(self.path)
+        if not self.capture.isOpened():
+            raise RuntimeError(f"Cannot open video: {self.path}")
+        self.native_fps = self.capture.get(cv2.CAP_PROP_FPS) or None
+
+    def stop(self):
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+    def read(self):
+        self._pace()
+        ok, frame = self.capture.read()
+        if not ok and self.loop and self.frames_read:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.capture.read()
+        if not ok:
+            return None
+        self.frames_read += 1
+        return frame, None
+
+
+class ImageDirectorySource(FrameSource):
+    """Frames from the images in a directory, in name order
+
+    With preload (the default) every image is decoded once up front so
+    disk and decode time stay out of benchmarks; each read() returns a copy,
+    since overlays are drawn into the frame.
+    """
+
+    def __init__(self, directory, fps=None, loop=False, preload=True):
+        super().__init__(fps)
+        self.paths = sorted(p for p in Path(directory).iterdir()
+                            if p.suffix.lower() in IMAGE_SUFFIXES)
+        if not self.paths:
+            raise RuntimeError(f"No images found in {directory}")
+        self.loop = loop
+        self.images = [self._load(p) for p in self.paths] if preload else None
+        self.index = 0
+
+    @staticmethod
+    def _load(path):
+        if HAS_CV2:
+            return cv2.imread(str(path))
+        return np.asarray(Image.open(path).convert("RGB"))
+
+    def read(self):
+        if self.index >= len(self.paths):
+            if not self.loop:
+                return None
+            self.index = 0
+        self._pace()
+        i = self.index
+        self.index += 1
+        if self.images is not None:
+            return self.images[i].copy(), None
+        return self._load(self.paths[i]), None
+
+
+class FakeCamera:
+    """Picamera2 stand-in that renders a moving box at a known position"""
+
+    def __init__(self, fps=30.0, box_size=(160, 120)):
+        self.fps = fps
+        self.box_size = box_size
+        self.sizes = {"main": (1280, 720), "lores": (640, 360)}
+        self.frame_index = 0
+        self.requests_released = 0
+        self.started = False
+        self._last_capture = 0.0
+        self._lock = threading.Lock()
+
+    def create_preview_configuration(self, main=None, lores=None, display=None):
+        return {"main": main or {"size": (1280, 720)}, "lores": lores, "display": display}
+
+    def configure(self, config):
+        self.sizes["main"] = tuple(config["main"]["size"])
+        if config.get("lores"):
+            self.sizes["lores"] = tuple(config["lores"]["size"])
+
+    def start(self):
+        self.started = True
+
+    def stop(self):
+        self.started = False
+
+    def close(self):
+        self.stop()
+
+    def object_box(self, frame_index, stream="main"):
+        """Ground-truth (x1, y1, x2, y2) of the box in the given stream"""
+        mw, mh = self.sizes["main"]
+        bw, bh = self.box_size
+        x1 = (frame_index * 8) % (mw - bw)
+        y1 = (mh - bh) // 2
+        box = np.array([x1, y1, x1 + bw, y1 + bh], dtype=np.float64)
+        if stream != "main":
+            w, h = self.sizes[stream]
+            box *= [w / mw, h / mh, w / mw, h / mh]
+        return tuple(box.tolist())
+
+    def _render(self, frame_index):
+        mw, mh = self.sizes["main"]
+        frame = np.zeros((mh, mw, 3), dtype=np.uint8)
+        x1, y1, x2, y2 = (int(v) for v in self.object_box(frame_index))
+        frame[y1:y2, x1:x2] = 255
+        return frame
+
+    def _scale(self, frame, size):
+        """Nearest-neighbour resize standing in for the ISP scaler"""
+        w, h = size
+        rows = np.arange(h) * frame.shape[0] // h
+        cols = np.arange(w) * frame.shape[1] // w
+        return frame[rows[:, None], cols]
+
+    def _next_frame(self):
+        with self._lock:
+            # Pace like a real sensor (fps=0 renders as fast as possible)
+            delay = self._last_capture + 1.0 / self.fps - time.monotonic() if self.fps else 0
+            if delay > 0:
+                time.sleep(delay)
+            self._last_capture = time.monotonic()
+            index = self.frame_index
+            self.frame_index += 1
+        return index, self._render(index)
+
+    def capture_array(self, name="main"):
+        _, main = self._next_frame()
+        return main if name == "main" else self._scale(main, self.sizes[name])
+
+    def capture_request(self):
+        index, main = self._next_frame()
+        return FakeRequest(self, index, main)
+
+
+class FakeRequest:
+    """One completed capture holding every configured stream"""
+
+    def __init__(self, camera, frame_index, main):
+        self.camera = camera
+        self.frame_index = frame_index
+        self._main = main
+        self.released = False
+
+    def make_array(self, name):
+        if self.released:
+            raise RuntimeError("Request already released")
+        if name == "main":
+            return self._main.copy()
+        return self.camera._scale(self._main, self.camera.sizes[name])
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.camera.requests_released += 1
+
+
+SOURCE_HELP = ("picamera, synthetic, a video file or a directory of images")
+
+
+def open_source(spec="picamera", main_size=(1280, 720), lores_size=None,
+                use_lores=True, fps=None, loop=False):
+    """Build a FrameSource from a spec: picamera, synthetic, a video or a directory
+
+    fps paces file sources (None or 0: as fast as frames are taken) and sets
+    the synthetic camera's rate (default 30; 0: unpaced).
+    """
+    if spec == "picamera":
+        return PicameraSource(None, main_size, lores_size, use_lores)
+    if spec in ("synthetic", "fake"):
+        camera = FakeCamera(fps=30.0 if fps is None else fps)
+        return PicameraSource(camera, main_size, lores_size, use_lores)
+    path = Path(spec)
+    if path.is_dir():
+        return ImageDirectorySource(path, fps=fps, loop=loop)
+    if path.is_file():
+        return VideoFileSource(path, fps=fps, loop=loop)
+    raise ValueError(f"Unknown frame source {spec!r}: expected {SOURCE_HELP}")
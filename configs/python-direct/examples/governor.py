@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Adaptive inference-rate governor
+
+Decides which captured frames are worth sending to the Hailo. While
+something is happening (detections or motion within the last hold_seconds)
+inference runs at active_fps; on an empty scene it falls back to idle_fps.
+Either way the rate is capped so measured per-frame processing time stays
+inside budget (the fraction of wall time pre/postprocess and inference may
+use), which keeps a 24/7 node from running flat out on empty frames and
+thermal throttling.
+
+    governor = InferenceGovernor(active_fps=30, idle_fps=2, budget=0.5)
+    if governor.should_infer():
+        started = time.monotonic()
+        detections = detector.detect(frame)
+        governor.record(time.monotonic() - started, len(detections))
+"""
+
+import time
+
+
+class InferenceGovernor:
+    """Picks the inference rate from scene activity and measured latency"""
+
+    def __init__(self, active_fps=30.0, idle_fps=2.0, budget=0.8,
+                 hold_seconds=3.0, smoothing=0.1):
+        if idle_fps <= 0 or active_fps < idle_fps:
+            raise ValueError("Need 0 < idle_fps <= active_fps")
+        if not 0.0 < budget <= 1.0:
+            raise ValueError(f"budget must be in (0, 1], got {budget}")
+        self.active_fps = active_fps
+        self.idle_fps = idle_fps
+        self.budget = budget
+        self.hold_seconds = hold_seconds
+        self.smoothing = smoothing
+        self.latency = None  # smoothed seconds per inferred frame
+        self.inferred = 0
+        self.skipped = 0
+        self._last_activity = None
+        self._last_inference = None
+
+    @property
+    def active(self):
+        """Whether detections or motion were seen within hold_seconds"""
+        return (self._last_activity is not None and
+                time.monotonic() - self._last_activity < self.hold_seconds)
+
+    @property
+    def rate(self):
+        """Current target inference rate in frames per second"""
+        rate = self.active_fps if self.active else self.idle_fps
+        if self.latency:
+            rate = min(rate, self.budget / self.latency)
+        return rate
+
+    def should_infer(self, now=None):
+        """True if this frame should go to the device"""
+        now = time.monotonic() if now is None else now
+        if self._last_inference is None or now - self._last_inference >= 1.0 / self.rate:
+            self._last_inference = now
+            self.inferred += 1
+            return True
+        self.skipped += 1
+        return False
+
+    def record(self, latency, num_detections=0, motion=False):
+        """Report how long an inferred frame took and what it contained"""
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.smoothing * (latency - self.latency)
+        if num_detections or motion:
+            self.report_activity()
+
+    def report_activity(self):
+        """Mark the scene active (e.g. from a motion detector)"""
+        self._last_activity = time.monotonic()
+
+    def next_due(self):
+        """Seconds until the next frame should be inferred"""
+        if self._last_inference is None:
+            return 0.0
+        return max(0.0, self._last_inference + 1.0 / self.rate - time.monotonic())
@@ -11,13 +11,14 @@ module. Ensure HailoRT is properly installed with Python support.
 For camera testing without HailoRT, use hailo_preview_no_cv.py instead.
 """
 
+import itertools
+import os
 import sys
 import time
 import numpy as np
 from pathlib import Path
+from contextlib import ExitStack
 from datetime import datetime
-from threading import Thread, Lock
-import queue
 
 # Try OpenCV first, fall back to PIL
 try:
@@ -25,13 +26,32 @@ try:
     HAS_CV2 = True
 except ImportError:
     HAS_CV2 = False
-    from PIL import Image, ImageDraw, ImageFont
+    from PIL import Image
     print("OpenCV not found, using PIL for overlays")
 
-from picamera2 import Picamera2
+from frame_sources import open_source, lores_size_for, SOURCE_HELP
+from pipeline import FramePipeline, FramePacket, DROP_POLICIES, DROP_OLDEST
+from tracker import Tracker, DEFAULT_TEMPORAL_FILTER
+from governor import InferenceGovernor
+from motion import MotionGate
+from overlay import OverlayRenderer
+from streaming import JpegStream, MjpegServer, Mp4Writer
+from recorder import EventRecorder
+from events import EventBus, JsonlSink, SqliteSink, MqttSink
+from metrics import Metrics, MetricsServer, MetricsDumper
+from model_registry import ModelRegistry, nms_info
+import pipeline_config
+from pipeline_config import parse_size
+
+# HAILO_FAKE=1 swaps in the off-device stub so the detector lifecycle can be
+# exercised without a Hailo-8 (see fake_hailo_platform.py)
+if os.environ.get("HAILO_FAKE"):
+    import fake_hailo_platform
+    fake_hailo_platform.install()
+
 from hailo_platform import (
-    HEF, HailoStreamInterface, VDevice, InferVStreams, 
-    FormatType, HailoSchedulingAlgorithm
+    HEF, ConfigureParams, HailoStreamInterface, VDevice, InferVStreams,
+    FormatType
 )
 
 # YOLO class names for COCO dataset
@@ -48,71 +68,479 @@ COCO_NAMES = [
     "refrigerator", "book", "clock", "vase", "scissors", "teddy bear", "hair drier", "toothbrush"
 ]
 
-# Color palette for bounding boxes (BGR for OpenCV, RGB for PIL)
-COLORS = [
-    (255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0), (255, 0, 255),
-    (0, 255, 255), (128, 0, 255), (255, 128, 0), (128, 255, 0), (0, 128, 255)
-]
+# Fonts and label sprites are loaded once and cached across frames
+overlay_renderer = OverlayRenderer()
+
+# Supported HailoDetector.preprocess modes
+PREPROCESS_MODES = ("letterbox", "resize")
+
+# Gray used for letterbox padding (same as Ultralytics)
+LETTERBOX_PAD_VALUE = 114
+
+# Models tried, in order, when --model isn't given
+DEFAULT_MODELS = ("yolov8n", "yolov8s")
+
+# Candidates considered by NMS after thresholding (highest scores first)
+NMS_TOP_K = 300
+
+
+def nms_boxes(boxes, scores, class_ids, iou_threshold=0.45, max_detections=20,
+              metric="iou"):
+    """Class-aware non-maximum suppression
+    
+    boxes is an [N, 4] array of (x1, y1, x2, y2). Returns the indices of the
+    kept boxes, highest score first, capped at max_detections. metric "ios"
+    (intersection over the smaller box) also suppresses a box cut off at a
+    tile edge by the whole box it belongs to (see tiling.py).
+    """
+    if len(scores) == 0:
+        return np.empty(0, dtype=np.intp)
+    
+    order = np.argsort(scores)[::-1][:NMS_TOP_K]
+    
+    # Shift each class into its own coordinate range so boxes of different
+    # classes never overlap and a single NMS pass handles all classes
+    offsets = class_ids.astype(np.float32) * (float(boxes.max() - boxes.min()) + 1.0)
+    x1 = boxes[:, 0] + offsets
+    y1 = boxes[:, 1] + offsets
+    x2 = boxes[:, 2] + offsets
+    y2 = boxes[:, 3] + offsets
+    areas = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+    
+    keep = []
+    while order.size and len(keep) < max_detections:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        
+        inter_w = np.maximum(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0)
+        inter_h = np.maximum(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0)
+        inter = inter_w * inter_h
+        if metric == "ios":
+            overlap = inter / (np.minimum(areas[i], areas[rest]) + 1e-9)
+        else:
+            overlap = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        
+        order = rest[overlap <= iou_threshold]
+    
+    return np.array(keep, dtype=np.intp)
+
+
+def decode_nms_output(output, num_classes=None):
+    """Flatten an on-device NMS output into (boxes, scores, class_ids)
+    
+    HEFs compiled with Hailo NMS return boxes already decoded, thresholded
+    and suppressed, per class. HailoRT hands them over in one of three forms:
+    
+        list of per-class [k, 5] arrays     NMS by class (HailoRT 4.18+)
+        [num_classes, 5, max_boxes] array   TF NMS format, zero-padded
+        flat float buffer                   per class: box count, then
+                                            max_boxes slots of 5 values
+    
+    Each box is (y_min, x_min, y_max, x_max, score), normalized to the model
+    input. Returns [N, 4] boxes in that same order. A batch of one is
+    unwrapped; num_classes is only needed for the flat buffer.
+    """
+    # Unwrap the batch: a list of per-frame outputs or a leading axis
+    while (isinstance(output, (list, tuple)) and len(output) == 1
+           and not (isinstance(output[0], np.ndarray) and output[0].ndim == 2)):
+        output = output[0]
+    
+    if isinstance(output, (list, tuple)):
+        per_class = [np.asarray(boxes, dtype=np.float32).reshape(-1, 5) for boxes in output]
+        counts = [len(boxes) for boxes in per_class]
+        if not sum(counts):
+            return np.empty((0, 4), np.float32), np.empty(0, np.float32), np.empty(0, np.intp)
+        rows = np.concatenate(per_class)
+        class_ids = np.repeat(np.arange(len(per_class)), counts)
+        return rows[:, :4], rows[:, 4], class_ids
+    
+    output = np.asarray(output, dtype=np.float32)
+    if output.ndim in (2, 4):
+        output = output[0]
+    if output.ndim == 3:
+        # [classes, 5, max_boxes] -> [classes, max_boxes, 5]
+        slots = output.transpose(0, 2, 1) if output.shape[1] == 5 else output
+        valid = slots[..., 4] > 0
+    elif output.ndim == 1 and num_classes:
+        per_class = output.reshape(num_classes, -1)
+        slots = per_class[:, 1:].reshape(num_classes, -1, 5)
+        valid = np.arange(slots.shape[1]) < per_class[:, :1]
+    else:
+        raise ValueError(f"Unrecognized NMS output shape {output.shape}")
+    class_ids, index = np.nonzero(valid)
+    rows = slots[class_ids, index]
+    return rows[:, :4], rows[:, 4], class_ids
+
+
+def pack_nms_output(per_class, max_boxes):
+    """Per-class [k, 5] box lists as one zero-padded [num_classes, 5, max_boxes] array"""
+    packed = np.zeros((len(per_class), 5, max_boxes), dtype=np.float32)
+    for class_id, boxes in enumerate(per_class):
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 5)[:max_boxes]
+        packed[class_id, :, :len(boxes)] = boxes.T
+    return packed
+
+
+def model_input_hw(shape):
+    """Return (height, width) for an HWC/NHWC or CHW/NCHW input shape"""
+    dims = tuple(shape)[-3:]
+    if len(dims) == 3 and dims[0] in (1, 3) and dims[2] not in (1, 3):
+        return dims[1], dims[2]
+    return dims[0], dims[1]
 
 
 class HailoDetector:
     """Handles Hailo inference and detection processing"""
     
-    def __init__(self, model_path, threshold=0.5):
+    def __init__(self, model_path, threshold=0.5, iou_threshold=0.45,
+                 max_detections=20, class_names=None, preprocess_mode="letterbox",
+                 input_buffers=4, vdevice=None, batch_size=1, priority=None,
+                 scheduler_timeout_ms=None, metrics=None, model_info=None,
+                 class_thresholds=None, classes=None, host_only=False):
         self.model_path = Path(model_path)
-        self.threshold = threshold
+        self.iou_threshold = iou_threshold
+        self.max_detections = max_detections
+        # Cached HEF metadata from model_registry.ModelRegistry.info()
+        self.model_info = model_info
+        self.class_names = class_names or (model_info or {}).get('classes') or COCO_NAMES
+        self._threshold = threshold
+        self.class_thresholds = {}
+        self.classes = None
+        self._score_filter = (threshold, None)
+        self.set_filter(threshold, class_thresholds or {}, classes)
+        if preprocess_mode not in PREPROCESS_MODES:
+            raise ValueError(f"Unknown preprocess mode: {preprocess_mode}")
+        self.preprocess_mode = preprocess_mode
+        self.num_input_buffers = max(1, input_buffers)
+        self._input_buffers = []
+        self._buffer_index = 0
+        self._letterbox_geometry = []
+        self._recorded_outputs = None
+        self._record_limit = 0
+        # Optional metrics.Metrics: per-stage timings (preprocess, device, postprocess)
+        self.metrics = metrics
+        self.batch_size = max(1, batch_size)
+        # A VDevice passed in is shared (see detector_service.py): it runs the
+        # Hailo scheduler, which activates network groups on its own, and it
+        # is not ours to release
+        self.shared_device = vdevice
+        self.priority = priority
+        self.scheduler_timeout_ms = scheduler_timeout_ms
         self.hef = None
         self.device = None
         self.network_group = None
         self.input_vstreams_params = None
         self.output_vstreams_params = None
+        self.input_name = None
+        self.output_name = None
+        self.output_shape = None
+        # {'classes', 'max_boxes'} when the HEF ends in on-device NMS
+        self.nms_output = None
+        self.infer_pipeline = None
+        self._pipeline_stack = None
         self.input_shape = None
+        self.input_height = None
+        self.input_width = None
         
         if not self.model_path.exists():
             raise FileNotFoundError(f"Model not found: {self.model_path}")
         
-        self._setup_hailo()
+        if host_only:
+            # Preprocess and postprocess only, no device (see process_pool.py)
+            self._read_io_info()
+        else:
+            self._setup_hailo()
+    
+    @property
+    def threshold(self):
+        return self._threshold
+    
+    @threshold.setter
+    def threshold(self, value):
+        self.set_filter(threshold=value)
+    
+    def set_filter(self, threshold=None, class_thresholds=None, classes=None, all_classes=False):
+        """Change the confidence thresholds and class filter; safe while running
+        
+        class_thresholds maps class names to their own threshold; classes
+        (names) keeps only those classes, and all_classes=True clears the
+        filter. Arguments left as None keep their current value. The new
+        settings take effect atomically for the next postprocess call.
+        """
+        threshold = self._threshold if threshold is None else float(threshold)
+        if class_thresholds is None:
+            class_thresholds = self.class_thresholds
+        if all_classes:
+            classes = None
+        elif classes is None:
+            classes = self.classes
+        names = set(self.class_names)
+        unknown = (set(class_thresholds) | set(classes or ())) - names
+        if unknown:
+            raise ValueError(f"Unknown classes: {', '.join(sorted(unknown))}")
+        if not all(0.0 <= t <= 1.0 for t in [threshold, *class_thresholds.values()]):
+            raise ValueError("Thresholds must be between 0 and 1")
+        
+        vector = None
+        if class_thresholds or classes is not None:
+            # One threshold per class; classes filtered out can never pass
+            vector = np.array([
+                class_thresholds.get(name, threshold) if classes is None or name in classes
+                else np.inf for name in self.class_names
+            ], dtype=np.float32)
+        finite = vector[np.isfinite(vector)] if vector is not None else None
+        minimum = float(finite.min()) if finite is not None and finite.size else threshold
+        
+        self._threshold = threshold
+        self.class_thresholds = {name: float(t) for name, t in class_thresholds.items()}
+        self.classes = sorted(classes) if classes is not None else None
+        self._score_filter = (minimum, vector)
+    
+    def filter_settings(self):
+        """Current threshold, per-class thresholds and class filter"""
+        return {'threshold': self._threshold, 'class_thresholds': dict(self.class_thresholds),
+                'classes': self.classes}
     
     def _setup_hailo(self):
-        """Initialize Hailo device and model"""
+        """Initialize Hailo device, model and the long-lived inference pipeline"""
         print(f"Loading model: {self.model_path}")
         self.hef = HEF(str(self.model_path))
         
         # Setup device
-        self.device = VDevice()
-        self.network_group = self.device.configure(self.hef)
+        self.device = self.shared_device if self.shared_device is not None else VDevice()
+        configure_params = ConfigureParams.create_from_hef(
+            self.hef, interface=HailoStreamInterface.PCIe
+        )
+        for params in configure_params.values():
+            params.batch_size = self.batch_size
+        self.network_group = self.device.configure(self.hef, configure_params)[0]
         self.network_group_params = self.network_group.create_params()
         
-        # Get input/output info
-        self.input_vstreams_params = self.network_group.make_input_vstream_params(
-            FormatType.FLOAT32, quantized=False
-        )
+        if self.shared_device is not None:
+            if self.priority is not None:
+                self.network_group.set_scheduler_priority(self.priority)
+            if self.scheduler_timeout_ms is not None:
+                self.network_group.set_scheduler_timeout(self.scheduler_timeout_ms)
+        
+        # Get input/output info. Letterbox mode feeds raw uint8 pixels and
+        # lets the device do the input quantization on-chip.
+        if self.preprocess_mode == "letterbox":
+            self.input_vstreams_params = self.network_group.make_input_vstream_params(
+                FormatType.UINT8, quantized=True
+            )
+        else:
+            self.input_vstreams_params = self.network_group.make_input_vstream_params(
+                FormatType.FLOAT32, quantized=False
+            )
         self.output_vstreams_params = self.network_group.make_output_vstream_params(
             FormatType.FLOAT32, quantized=False
         )
         
-        # Get input shape (typically [1, 3, 640, 640] for YOLOv8)
-        input_vstream_info = self.hef.get_input_vstream_infos()[0]
-        self.input_shape = input_vstream_info.shape
+        self._read_io_info()
         print(f"Model input shape: {self.input_shape}")
+        if self.nms_output:
+            print("Output: on-device NMS (no host-side decoding)")
         
-        # Activate network
-        self.network_group.activate(self.network_group_params)
+        self._open_pipeline()
     
-    def preprocess(self, image):
-        """Preprocess image for YOLO inference"""
+    def _read_io_info(self):
+        """Vstream names and shapes, and the letterbox input buffers"""
+        # Input shape is typically [640, 640, 3] for YOLOv8; the registry's
+        # cached metadata saves parsing the HEF when available
+        if self.model_info is not None:
+            self.input_name = self.model_info['inputs'][0]['name']
+            self.output_name = self.model_info['outputs'][0]['name']
+            self.input_shape = tuple(self.model_info['inputs'][0]['shape'])
+            self.output_shape = tuple(self.model_info['outputs'][0]['shape'])
+            self.nms_output = self.model_info['outputs'][0].get('nms')
+        else:
+            if self.hef is None:
+                self.hef = HEF(str(self.model_path))
+            input_vstream_info = self.hef.get_input_vstream_infos()[0]
+            output_vstream_info = self.hef.get_output_vstream_infos()[0]
+            self.input_name = input_vstream_info.name
+            self.output_name = output_vstream_info.name
+            self.input_shape = tuple(input_vstream_info.shape)
+            self.output_shape = tuple(output_vstream_info.shape)
+            self.nms_output = nms_info(output_vstream_info)
+        self.input_height, self.input_width = model_input_hw(self.input_shape)
+        
+        if self.preprocess_mode == "letterbox":
+            self._input_buffers = [
+                np.full((1, self.input_height, self.input_width, 3),
+                        LETTERBOX_PAD_VALUE, dtype=np.uint8)
+                for _ in range(self.num_input_buffers)
+            ]
+            self._buffer_index = 0
+            self._letterbox_geometry = [None] * self.num_input_buffers
+    
+    def host_config(self):
+        """Keyword arguments for a host_only copy of this detector, e.g. in another process"""
+        return {'model_path': str(self.model_path), 'threshold': self._threshold,
+                'iou_threshold': self.iou_threshold, 'max_detections': self.max_detections,
+                'class_names': self.class_names, 'preprocess_mode': self.preprocess_mode,
+                'model_info': self.model_info, 'class_thresholds': self.class_thresholds,
+                'classes': self.classes, 'input_buffers': 1}
+    
+    def _open_pipeline(self):
+        """Create the vstreams and activate the network group once
+        
+        Entering InferVStreams per frame creates and destroys the vstreams
+        every time; keeping them open leaves only the transfer in the hot path.
+        """
+        self._pipeline_stack = ExitStack()
+        try:
+            self.infer_pipeline = self._pipeline_stack.enter_context(
+                InferVStreams(self.network_group, self.input_vstreams_params,
+                              self.output_vstreams_params)
+            )
+            # With the scheduler, activation is handled by the device
+            if self.shared_device is None:
+                self._pipeline_stack.enter_context(
+                    self.network_group.activate(self.network_group_params)
+                )
+        except Exception:
+            self._close_pipeline()
+            raise
+    
+    def _close_pipeline(self):
+        """Deactivate the network group and tear down the vstreams"""
+        stack, self._pipeline_stack = self._pipeline_stack, None
+        self.infer_pipeline = None
+        if stack is not None:
+            try:
+                stack.close()
+            except Exception as e:
+                print(f"⚠️  Error closing inference pipeline: {e}")
+    
+    def _reconnect(self):
+        """Drop every Hailo resource and set the device up again"""
+        print("🔄 Reconnecting to Hailo device...")
+        self.cleanup()
+        self._setup_hailo()
+    
+    def preprocess(self, image, display_shape=None, out=None, roi=None):
+        """Preprocess image for YOLO inference
+        
+        Returns the model input and the letterbox metadata postprocess needs
+        to map boxes back: {'shape': (h, w), 'scale': (sx, sy), 'pad': (px, py)}.
+        When image is a scaled copy of a larger frame (the camera's lores
+        stream), display_shape is that frame's shape and boxes map onto it.
+        out is an optional [1, H, W, 3] uint8 slot (e.g. one row of a batch
+        buffer) to letterbox into instead of the detector's own buffers.
+        roi (x1, y1, x2, y2, in display pixels) restricts inference to that
+        region, e.g. where motion was seen.
+        """
+        started = time.perf_counter()
+        batch, meta = self._preprocess(image, display_shape, out, roi)
+        if self.metrics is not None:
+            self.metrics.stage("preprocess").since(started)
+        return batch, meta
+    
+    def _preprocess(self, image, display_shape=None, out=None, roi=None):
+        if roi is not None:
+            return self._preprocess_region(image, roi, display_shape, out)
+        
+        if self.preprocess_mode == "letterbox":
+            batch, meta = self._preprocess_letterbox(image, out)
+        else:
+            batch, meta = self._preprocess_resize(image)
+            if out is not None:
+                out[...] = batch
+                batch = out
+        
+        if display_shape is not None:
+            meta = self._map_to_display(meta, display_shape)
+        return batch, meta
+    
+    def _preprocess_region(self, image, roi, display_shape=None, out=None):
+        """Preprocess only roi (display pixels); boxes still map onto the full frame"""
+        display_h, display_w = (display_shape or image.shape)[:2]
+        image_h, image_w = image.shape[:2]
+        sx, sy = image_w / display_w, image_h / display_h
+        
+        x1, y1, x2, y2 = roi
+        cx1, cy1 = max(int(x1 * sx), 0), max(int(y1 * sy), 0)
+        cx2, cy2 = min(int(np.ceil(x2 * sx)), image_w), min(int(np.ceil(y2 * sy)), image_h)
+        crop = image[cy1:cy2, cx1:cx2]
+        
+        batch, meta = self._preprocess(crop, ((cy2 - cy1) / sy, (cx2 - cx1) / sx), out=out)
+        meta['shape'] = (display_h, display_w)
+        meta['offset'] = (cx1 / sx, cy1 / sy)
+        return batch, meta
+    
+    def _map_to_display(self, meta, display_shape):
+        """Fold the source→display scale into the letterbox metadata"""
+        h, w = meta['shape']
+        display_h, display_w = display_shape[:2]
+        scale_x, scale_y = meta['scale']
+        return {'shape': (display_h, display_w),
+                'scale': (scale_x * w / display_w, scale_y * h / display_h),
+                'pad': meta['pad']}
+    
+    def _preprocess_letterbox(self, image, out=None):
+        """Letterbox into a reused NHWC uint8 buffer (no float work on the host)
+        
+        The resize and color conversion write straight into the buffer, so
+        the only full-size allocation per frame is gone. Buffers rotate
+        through a small ring so a frame still waiting for inference in the
+        pipeline is never overwritten.
+        """
+        h, w = image.shape[:2]
+        scale = min(self.input_width / w, self.input_height / h)
+        new_w, new_h = int(round(w * scale)), int(round(h * scale))
+        pad_x = (self.input_width - new_w) // 2
+        pad_y = (self.input_height - new_h) // 2
+        
+        geometry = (pad_x, pad_y, new_w, new_h)
+        if out is not None:
+            # Caller-owned slot: always repaint the padding bands
+            batch = out
+            self._paint_padding(batch, geometry)
+        else:
+            # Ring buffers only need repainting when their geometry changes
+            index = self._buffer_index
+            self._buffer_index = (index + 1) % len(self._input_buffers)
+            batch = self._input_buffers[index]
+            if self._letterbox_geometry[index] != geometry:
+                self._paint_padding(batch, geometry)
+                self._letterbox_geometry[index] = geometry
+        region = batch[0, pad_y:pad_y + new_h, pad_x:pad_x + new_w]
+        
+        if HAS_CV2:
+            cv2.resize(image, (new_w, new_h), dst=region, interpolation=cv2.INTER_LINEAR)
+            # Convert BGR to RGB in place
+            cv2.cvtColor(region, cv2.COLOR_BGR2RGB, dst=region)
+        else:
+            region[...] = np.asarray(Image.fromarray(image).resize((new_w, new_h)))
+        
+        meta = {'shape': (h, w), 'scale': (scale, scale), 'pad': (pad_x, pad_y)}
+        return batch, meta
+    
+    @staticmethod
+    def _paint_padding(batch, geometry):
+        """Fill everything outside the letterbox region with the pad color"""
+        pad_x, pad_y, new_w, new_h = geometry
+        batch[0, :pad_y] = LETTERBOX_PAD_VALUE
+        batch[0, pad_y + new_h:] = LETTERBOX_PAD_VALUE
+        batch[0, :, :pad_x] = LETTERBOX_PAD_VALUE
+        batch[0, :, pad_x + new_w:] = LETTERBOX_PAD_VALUE
+    
+    def _preprocess_resize(self, image):
+        """Stretch to the model size and normalize to float32 NCHW (legacy)"""
         h, w = image.shape[:2]
         
         # Resize to model input size (typically 640x640)
-        target_size = self.input_shape[2]  # Assuming square input
+        target_size = (self.input_width, self.input_height)
         
         if HAS_CV2:
-            resized = cv2.resize(image, (target_size, target_size))
+            resized = cv2.resize(image, target_size)
             # Convert BGR to RGB
             rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
         else:
             pil_img = Image.fromarray(image)
-            resized = pil_img.resize((target_size, target_size))
+            resized = pil_img.resize(target_size)
             rgb = np.array(resized)
         
         # Normalize to [0, 1]
@@ -122,249 +550,864 @@ class HailoDetector:
         batch = np.expand_dims(normalized, axis=0)
         batch = np.transpose(batch, (0, 3, 1, 2))
         
-        return batch, (h, w)
+        meta = {'shape': (h, w),
+                'scale': (self.input_width / w, self.input_height / h),
+                'pad': (0, 0)}
+        return batch, meta
     
-    def postprocess(self, outputs, original_shape):
-        """Process YOLO outputs to get detections"""
-        detections = []
+    def postprocess(self, outputs, meta):
+        """Decode YOLOv8 outputs into detections (vectorized, with class-aware NMS)"""
+        started = time.perf_counter()
+        detections = self._postprocess(outputs, meta)
+        if self.metrics is not None:
+            self.metrics.stage("postprocess").since(started)
+        return detections
+    
+    def _postprocess(self, outputs, meta):
+        if self.nms_output:
+            return self._postprocess_nms(outputs, meta)
+        predictions = self._prediction_rows(outputs)
+        if predictions is None or len(predictions) == 0:
+            return []
         
-        # YOLOv8 output format processing
-        # This is simplified - actual format depends on model export
-        # Typically: [batch, num_predictions, (x, y, w, h, confidence, class_probs...)]
+        num_classes = len(self.class_names)
+        if predictions.shape[1] == 5 + num_classes:
+            # Legacy head: (cx, cy, w, h, obj_conf, class_probs...)
+            class_scores = predictions[:, 5:] * predictions[:, 4:5]
+        else:
+            # YOLOv8 anchor-free head: (cx, cy, w, h, class_scores...)
+            class_scores = predictions[:, 4:]
         
-        predictions = outputs[0][0]  # Get first batch
+        # Threshold on the best class score before doing any per-box work
+        min_threshold, class_threshold = self._score_filter
+        best_scores = class_scores.max(axis=1)
+        rows = np.flatnonzero(best_scores > min_threshold)
+        if not rows.size:
+            return []
         
-        for pred in predictions:
-            if len(pred) < 85:  # 4 bbox + 1 obj_conf + 80 classes
-                continue
-                
-            x, y, w, h = pred[:4]
-            obj_conf = pred[4]
-            class_probs = pred[5:85]
-            
-            # Get best class
-            class_id = np.argmax(class_probs)
-            class_conf = class_probs[class_id]
-            
-            # Combined confidence
-            confidence = obj_conf * class_conf
-            
-            if confidence > self.threshold:
-                # Scale coordinates to original image
-                oh, ow = original_shape
-                scale_y = oh / self.input_shape[2]
-                scale_x = ow / self.input_shape[3]
-                
-                # Convert from center to corner coordinates
-                x1 = int((x - w/2) * scale_x)
-                y1 = int((y - h/2) * scale_y)
-                x2 = int((x + w/2) * scale_x)
-                y2 = int((y + h/2) * scale_y)
-                
-                detections.append({
-                    'bbox': (x1, y1, x2, y2),
-                    'class_id': int(class_id),
-                    'class_name': COCO_NAMES[class_id] if class_id < len(COCO_NAMES) else f"class_{class_id}",
-                    'confidence': float(confidence)
-                })
+        if class_threshold is None:
+            scores = best_scores[rows]
+            class_ids = class_scores[rows].argmax(axis=1)
+        else:
+            # Per-class thresholds and the class filter, on the few candidates only
+            candidates = class_scores[rows]
+            candidates = np.where(candidates > class_threshold, candidates, 0)
+            class_ids = candidates.argmax(axis=1)
+            scores = candidates[np.arange(len(rows)), class_ids]
+            passed = scores > 0
+            rows, scores, class_ids = rows[passed], scores[passed], class_ids[passed]
+            if not rows.size:
+                return []
+        cx, cy, w, h = predictions[rows, :4].T
+        
+        # Center to corner coordinates, undoing the letterbox
+        boxes = self._map_boxes(cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2, meta)
+        
+        kept = nms_boxes(boxes, scores, class_ids,
+                         iou_threshold=self.iou_threshold,
+                         max_detections=self.max_detections)
         
+        return self._to_detections(boxes[kept], scores[kept], class_ids[kept])
+    
+    def _postprocess_nms(self, outputs, meta):
+        """Detections from an on-device NMS output: filter, cap, map back; no decoding or NMS"""
+        boxes, scores, class_ids = decode_nms_output(outputs, self.nms_output['classes'])
+        min_threshold, class_threshold = self._score_filter
+        if class_threshold is None:
+            passed = scores > min_threshold
+        else:
+            passed = scores > np.take(class_threshold, class_ids, mode="clip")
+        if not passed.any():
+            return []
+        boxes, scores, class_ids = boxes[passed], scores[passed], class_ids[passed]
+        order = np.argsort(scores)[::-1][:self.max_detections]
+        
+        # Normalized (y_min, x_min, y_max, x_max) to input pixels, then undo the letterbox
+        y1, x1, y2, x2 = boxes[order].T
+        boxes = self._map_boxes(x1 * self.input_width, y1 * self.input_height,
+                                x2 * self.input_width, y2 * self.input_height, meta)
+        return self._to_detections(boxes, scores[order], class_ids[order])
+    
+    def _map_boxes(self, x1, y1, x2, y2, meta):
+        """Corners in model input pixels to [N, 4] display boxes, clipped to the frame"""
+        (oh, ow), (scale_x, scale_y), (pad_x, pad_y), (off_x, off_y) = self._box_transform(meta)
+        boxes = np.stack([
+            (x1 - pad_x) / scale_x + off_x,
+            (y1 - pad_y) / scale_y + off_y,
+            (x2 - pad_x) / scale_x + off_x,
+            (y2 - pad_y) / scale_y + off_y,
+        ], axis=1)
+        np.clip(boxes[:, 0::2], 0, ow - 1, out=boxes[:, 0::2])
+        np.clip(boxes[:, 1::2], 0, oh - 1, out=boxes[:, 1::2])
+        return boxes
+    
+    def _box_transform(self, meta):
+        """Return ((h, w), scale, pad, offset) from preprocess metadata
+        
+        A bare (h, w) tuple is accepted and treated as a plain stretch.
+        """
+        if isinstance(meta, dict):
+            return meta['shape'], meta['scale'], meta['pad'], meta.get('offset', (0, 0))
+        oh, ow = meta
+        return (oh, ow), (self.input_width / ow, self.input_height / oh), (0, 0), (0, 0)
+    
+    def _prediction_rows(self, outputs):
+        """Return predictions as a [num_predictions, channels] array
+        
+        Handles both YOLOv8 layouts: [batch, 84, N] (channels first, as
+        exported by Ultralytics) and the transposed [batch, N, 84].
+        """
+        predictions = np.asarray(outputs[0] if isinstance(outputs, (list, tuple)) else outputs)
+        while predictions.ndim > 2:
+            predictions = predictions[0]  # Get first batch
+        if predictions.ndim != 2:
+            return None
+        
+        num_classes = len(self.class_names)
+        channel_counts = (4 + num_classes, 5 + num_classes)
+        rows, cols = predictions.shape
+        if cols not in channel_counts and (rows in channel_counts or rows < cols):
+            predictions = predictions.T
+        if predictions.shape[1] < 5:
+            return None
+        return predictions
+    
+    def _to_detections(self, boxes, scores, class_ids):
+        """Convert decoded arrays into the detection dicts used by the overlays"""
+        detections = []
+        for (x1, y1, x2, y2), confidence, class_id in zip(
+                boxes.astype(np.int32).tolist(), scores.tolist(), class_ids.tolist()):
+            if class_id < len(self.class_names):
+                class_name = self.class_names[class_id]
+            else:
+                class_name = f"class_{class_id}"
+            detections.append({
+                'bbox': (x1, y1, x2, y2),
+                'class_id': class_id,
+                'class_name': class_name,
+                'confidence': confidence
+            })
         return detections
     
-    def detect(self, image):
-        """Run detection on image"""
+    def infer(self, input_data):
+        """Run inference on the persistent pipeline
+        
+        A device error triggers one reconnect and retry before giving up.
+        """
+        started = time.perf_counter()
+        try:
+            if self.infer_pipeline is None:
+                raise RuntimeError("Inference pipeline is not open")
+            outputs = self.infer_pipeline.infer({self.input_name: input_data})
+        except Exception as e:
+            print(f"⚠️  Inference failed: {e}")
+            if self.metrics is not None:
+                self.metrics.device_errors.inc()
+            self._reconnect()
+            outputs = self.infer_pipeline.infer({self.input_name: input_data})
+        if self.metrics is not None:
+            self.metrics.stage("device").since(started)
+        if self._recorded_outputs is not None and len(self._recorded_outputs) < self._record_limit:
+            frames = outputs[self.output_name]
+            if self.nms_output and isinstance(frames, (list, tuple)):
+                # Ragged per-class lists are stored in the fixed TF NMS layout
+                frames = [pack_nms_output(frame, self.nms_output['max_boxes']) for frame in frames]
+            self._recorded_outputs.extend(np.array(frames))
+        return outputs
+    
+    def warmup(self, runs=1):
+        """Run inference on a blank frame so the first real frame isn't slowed by cold start
+        
+        Returns the seconds the warm-up calls took.
+        """
+        started = time.perf_counter()
+        frame = np.full((self.input_height, self.input_width, 3), LETTERBOX_PAD_VALUE,
+                        dtype=np.uint8)
+        for _ in range(runs):
+            input_data, _ = self.preprocess(frame)
+            self.infer(input_data)
+        if self.metrics is not None:
+            # Keep the cold-start call out of the steady-state histograms
+            for histogram in self.metrics.stage_seconds.values():
+                histogram.reset()
+        return time.perf_counter() - started
+    
+    def record_outputs(self, limit=300):
+        """Keep copies of the raw output tensors of the next `limit` frames
+        
+        Saved with save_recorded_outputs(), they can be replayed off-device
+        by fake_hailo_platform.replay() for benchmarks and regression runs.
+        """
+        self._recorded_outputs = []
+        self._record_limit = limit
+    
+    def save_recorded_outputs(self, path):
+        """Write the recorded output tensors to a .npz; returns the frame count"""
+        if not self._recorded_outputs:
+            return 0
+        outputs = np.stack(self._recorded_outputs[:self._record_limit])
+        np.savez_compressed(path, outputs=outputs)
+        return len(outputs)
+    
+    def detect(self, image, display_shape=None):
+        """Run detection on image (boxes map onto display_shape if given)"""
         # Preprocess
-        input_data, original_shape = self.preprocess(image)
+        input_data, meta = self.preprocess(image, display_shape)
         
         # Run inference
-        with InferVStreams(self.network_group, self.input_vstreams_params,
-                           self.output_vstreams_params) as infer_pipeline:
-            outputs = infer_pipeline.infer(
-                {self.input_vstreams_params[0].name: input_data}
-            )
+        outputs = self.infer(input_data)
         
         # Postprocess
-        output_data = outputs[self.output_vstreams_params[0].name]
-        detections = self.postprocess(output_data, original_shape)
+        output_data = outputs[self.output_name]
+        detections = self.postprocess(output_data, meta)
         
         return detections
     
     def cleanup(self):
-        """Clean up Hailo resources"""
-        if self.network_group:
-            self.network_group.deactivate()
+        """Release the inference pipeline, network group and device"""
+        self._close_pipeline()
+        self.network_group = None
+        if self.device is not None and self.device is not self.shared_device:
+            try:
+                self.device.release()
+            except Exception as e:
+                print(f"⚠️  Error releasing Hailo device: {e}")
+        self.device = None
 
 
 def draw_overlays_cv2(image, detections):
-    """Draw detection overlays using OpenCV"""
-    for det in detections:
-        x1, y1, x2, y2 = det['bbox']
-        class_name = det['class_name']
-        confidence = det['confidence']
-        
-        # Get color for this class
-        color = COLORS[det['class_id'] % len(COLORS)]
-        
-        # Draw bounding box
-        cv2.rectangle(image, (x1, y1), (x2, y2), color, 2)
-        
-        # Draw label background
-        label = f"{class_name}: {confidence:.2f}"
-        label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
-        cv2.rectangle(image, (x1, y1 - label_size[1] - 4), 
-                     (x1 + label_size[0], y1), color, -1)
-        
-        # Draw label text
-        cv2.putText(image, label, (x1, y1 - 2), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
-    
-    # Add FPS and detection count
-    fps_text = f"Detections: {len(detections)}"
-    cv2.putText(image, fps_text, (10, 30), 
-               cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-    
-    return image
+    """Draw detection overlays in place from cached label sprites"""
+    return overlay_renderer.draw(image, detections)
 
 
 def draw_overlays_pil(image, detections):
-    """Draw detection overlays using PIL"""
-    pil_img = Image.fromarray(image)
-    draw = ImageDraw.Draw(pil_img)
+    """Draw detection overlays in place (no PIL round trip per frame)"""
+    return overlay_renderer.draw(image, detections)
+
+
+def release_model(detector, packet):
+    """Hand a frame's model back to a control.ModelSwitcher, at most once
     
-    # Try to load a font, fall back to default
-    try:
-        font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 16)
-    except:
-        font = ImageFont.load_default()
+    Also called for frames dropped between preprocess and postprocess, so
+    a model swap doesn't wait out its drain timeout for them.
+    """
+    model, packet.model = packet.model, None
+    if model is not None and hasattr(detector, "select"):
+        detector.release(model)
+
+
+def detector_stages(detector, tracker=None, infer_every=1, governor=None,
+                    motion_gate=None, motion_roi=False):
+    """Split detection into (name, fn) stages for FramePipeline
     
-    for det in detections:
-        x1, y1, x2, y2 = det['bbox']
-        class_name = det['class_name']
-        confidence = det['confidence']
-        
-        # Get color for this class
-        color = COLORS[det['class_id'] % len(COLORS)]
+    With infer_every > 1 only every Nth frame goes to the device; with a
+    governor (see governor.py) the rate follows scene activity instead. A
+    motion gate (see motion.py) skips frames where nothing moved and, with
+    motion_roi, limits inference to the changed region. The frames in
+    between are filled from the tracker (or repeat the last detections when
+    there is no tracker).
+    """
+    frame_counter = itertools.count()
+    last_detections = []
+    # A control.ModelSwitcher can change the model between frames
+    select = getattr(detector, "select", None)
+    
+    def preprocess_stage(packet):
+        roi = None
+        if motion_gate is not None and not motion_gate.update(packet.image):
+            # Nothing moved: leave the device idle
+            packet.run_inference = False
+            return packet
+        if motion_gate is not None:
+            if governor is not None:
+                governor.report_activity()
+            if motion_roi:
+                roi = motion_gate.roi()
         
-        # Draw bounding box
-        draw.rectangle([x1, y1, x2, y2], outline=color, width=2)
+        if governor is not None:
+            packet.run_inference = governor.should_infer()
+        else:
+            packet.run_inference = next(frame_counter) % infer_every == 0
+        if packet.run_inference:
+            started = time.perf_counter()
+            # The whole frame runs on the model current now, even if a swap
+            # happens before it reaches postprocess
+            packet.model = select() if select else detector
+            packet.input_data, packet.meta = packet.model.preprocess(
+                packet.model_image, display_shape=packet.image.shape, roi=roi
+            )
+            packet.timings['preprocess'] = time.perf_counter() - started
+        return packet
+    
+    def infer_stage(packet):
+        if packet.run_inference and select and not detector.usable(packet.model):
+            # Its model was released while the frame waited in a queue
+            packet.run_inference = False
+            release_model(detector, packet)
+        if packet.run_inference:
+            started = time.perf_counter()
+            packet.outputs = packet.model.infer(packet.input_data)
+            packet.timings['infer'] = time.perf_counter() - started
+        return packet
+    
+    def postprocess_stage(packet):
+        if packet.run_inference:
+            started = time.perf_counter()
+            packet.detections = packet.model.postprocess(
+                packet.outputs[packet.model.output_name], packet.meta
+            )
+            packet.timings['postprocess'] = time.perf_counter() - started
+            release_model(detector, packet)
+            if governor is not None:
+                governor.record(sum(packet.timings.values()), len(packet.detections))
+        return packet
+    
+    def track_stage(packet):
+        nonlocal last_detections
+        if tracker is None:
+            if packet.run_inference:
+                last_detections = packet.detections
+            else:
+                packet.detections = last_detections
+        elif packet.run_inference:
+            packet.detections = tracker.update(packet.detections, packet.image.shape)
+        else:
+            packet.detections = tracker.predict()
+        return packet
+    
+    stages = [
+        ("preprocess", preprocess_stage),
+        ("infer", infer_stage),
+        ("postprocess", postprocess_stage),
+    ]
+    if tracker is not None or infer_every > 1 or governor is not None or motion_gate is not None:
+        stages.append(("track", track_stage))
+    return stages
+
+
+def render_frame(frame, detections, frame_count, stream=None, show=True, draw=True,
+                 owned=True):
+    """Draw overlays and display/stream/save the frame; returns False to quit
+    
+    With a stream (see streaming.py) frames are encoded and snapshots
+    written on its worker thread instead of blocking this one. draw=False
+    skips the overlays for frames that already have them (process_pool.py).
+    owned=False marks a frame reused once this returns (a shared-memory
+    slot), so the stream gets a copy.
+    """
+    snapshot = None
+    if HAS_CV2:
+        # Frames are not reused after rendering, so draw straight into them
+        frame_with_overlays = draw_overlays_cv2(frame, detections) if draw else frame
         
-        # Draw label
-        label = f"{class_name}: {confidence:.2f}"
-        draw.text((x1, y1 - 20), label, fill=color, font=font)
+        if show:
+            # Display
+            cv2.imshow('Hailo-8 Object Detection', frame_with_overlays)
+            
+            # Save snapshot on 's' key
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord('s'):
+                snapshot = f"detection_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
+            elif key == ord('q'):
+                return False
+    else:
+        frame_with_overlays = draw_overlays_pil(frame, detections) if draw else frame
+        # For PIL, just save periodic snapshots
+        if show and frame_count % 30 == 0:  # Every second at 30fps
+            snapshot = f"detection_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
     
-    # Add detection count
-    draw.text((10, 10), f"Detections: {len(detections)}", 
-             fill=(0, 255, 0), font=font)
+    if stream is not None:
+        if owned or snapshot or stream.has_consumers:
+            # The encoder reads the frame later; a borrowed one may be reused by then
+            if not owned:
+                frame_with_overlays = frame_with_overlays.copy()
+            # Printed by the encoder thread once the file is written
+            stream.submit(frame_with_overlays, save_as=snapshot,
+                          message=f"📸 Saved: {snapshot}")
+    elif snapshot:
+        try:
+            if HAS_CV2:
+                if not cv2.imwrite(snapshot, frame_with_overlays):
+                    raise OSError("cv2.imwrite failed")
+            else:
+                Image.fromarray(frame_with_overlays).save(snapshot)
+            print(f"📸 Saved: {snapshot}")
+        except OSError as e:
+            print(f"⚠️  Could not save {snapshot}: {e}")
+    return True
+
+
+def parse_args():
+    """Command line options"""
+    import argparse
     
-    return np.array(pil_img)
+    parser = argparse.ArgumentParser(description="Hailo-8 live detection with overlays")
+    parser.add_argument("--model", type=str,
+                       help="Model name (e.g. yolov8s, looked up in models/) or .hef path "
+                            "(default: first of yolov8n, yolov8s found)")
+    parser.add_argument("--warmup", type=int, default=1,
+                       help="Warm-up inferences before the camera starts (default: 1)")
+    parser.add_argument("--threshold", type=float, default=0.5,
+                       help="Minimum detection confidence (default: 0.5)")
+    parser.add_argument("--max-detections", type=int, default=20,
+                       help="Detections kept per frame (default: 20)")
+    parser.add_argument("--serial", action="store_true",
+                       help="Run capture, inference and rendering in one loop (no pipelining)")
+    parser.add_argument("--processes", type=int, default=0,
+                       help="Run preprocess, postprocess and overlays in this many worker "
+                            "processes with shared-memory frames, e.g. 3 (default: threads)")
+    parser.add_argument("--queue-size", type=int, default=2,
+                       help="Frames buffered between pipeline stages (default: 2)")
+    parser.add_argument("--drop-policy", choices=DROP_POLICIES, default=DROP_OLDEST,
+                       help="What a full stage queue does with new frames (default: drop_oldest)")
+    parser.add_argument("--capture", choices=("lores", "main"), default="lores",
+                       help="lores: infer on the ISP-scaled stream; main: resize the "
+                            "display stream on the CPU (default: lores)")
+    parser.add_argument("--main-size", type=parse_size, default="1280x720", metavar="WxH",
+                       help="Display (main) stream size (default: 1280x720)")
+    parser.add_argument("--lores-size", type=parse_size, metavar="WxH",
+                       help="ISP-scaled inference stream size (default: main's aspect "
+                            "ratio, fitted to the model input)")
+    parser.add_argument("--source", type=str, default="picamera",
+                       help=f"Frame source: {SOURCE_HELP} (default: picamera)")
+    parser.add_argument("--source-fps", type=float,
+                       help="Pace the source to this rate; 0 runs files and the synthetic "
+                            "camera as fast as the pipeline takes frames (default: files "
+                            "unpaced, synthetic 30)")
+    parser.add_argument("--loop", action="store_true",
+                       help="Restart a video or image directory source when it ends")
+    parser.add_argument("--fake-camera", action="store_true",
+                       help="Use a synthetic camera instead of Picamera2 (--source synthetic)")
+    parser.add_argument("--dump-outputs", type=str, metavar="PATH",
+                       help="Save raw output tensors to this .npz for replay with "
+                            "HAILO_FAKE_OUTPUTS")
+    parser.add_argument("--dump-frames", type=int, default=300,
+                       help="Frames of output tensors to save with --dump-outputs (default: 300)")
+    parser.add_argument("--track", action="store_true",
+                       help="Track objects across frames (stable ids, smoothed boxes)")
+    parser.add_argument("--tracker-config", type=str,
+                       help="JSON with a temporal_filter block, e.g. "
+                            "configs/rpicam/hailo_yolov8_inference.json (implies --track)")
+    parser.add_argument("--line-thickness", type=int, default=2,
+                       help="Overlay box line thickness (default: 2)")
+    parser.add_argument("--infer-every", type=int, default=1,
+                       help="Run inference on every Nth frame, fill the rest from "
+                            "the tracker (default: 1)")
+    parser.add_argument("--governor", action="store_true",
+                       help="Adapt the inference rate to scene activity (overrides --infer-every)")
+    parser.add_argument("--active-fps", type=float, default=30.0,
+                       help="Governor inference rate while objects are present (default: 30)")
+    parser.add_argument("--idle-fps", type=float, default=2.0,
+                       help="Governor inference rate on an empty scene (default: 2)")
+    parser.add_argument("--budget", type=float, default=0.8,
+                       help="Governor cap on processing time per second of wall time "
+                            "(default: 0.8)")
+    parser.add_argument("--motion", action="store_true",
+                       help="Skip inference on frames where nothing moved")
+    parser.add_argument("--motion-roi", action="store_true",
+                       help="Only run inference on the region that moved (implies --motion)")
+    parser.add_argument("--motion-threshold", type=int, default=25,
+                       help="Gray-level change that counts as motion (default: 25)")
+    parser.add_argument("--tiles", action="store_true",
+                       help="Infer on overlapping model-sized tiles of the full-resolution "
+                            "frame as one batch (better recall on small objects)")
+    parser.add_argument("--tile-overlap", type=float, default=0.2,
+                       help="Fraction of a tile shared with its neighbours (default: 0.2)")
+    parser.add_argument("--roi", action="append", default=[], metavar="X1,Y1,X2,Y2",
+                       help="Infer only on this region of the frame (repeatable; "
+                            "replaces the tile grid)")
+    parser.add_argument("--headless", action="store_true",
+                       help="No preview window or periodic snapshots (use with --stream-port)")
+    parser.add_argument("--stream-port", type=int, default=0,
+                       help="Serve an MJPEG stream on this port, e.g. 8080 (default: off)")
+    parser.add_argument("--stream-quality", type=int, default=80,
+                       help="JPEG quality for streaming and snapshots (default: 80)")
+    parser.add_argument("--mp4", type=str,
+                       help="Also record the stream to this fragmented MP4 (needs ffmpeg)")
+    parser.add_argument("--record", type=str, metavar="CLASSES",
+                       help="Record clips when these classes are seen, e.g. person,car")
+    parser.add_argument("--pre-roll", type=float, default=5.0,
+                       help="Seconds kept from before each event (default: 5)")
+    parser.add_argument("--post-roll", type=float, default=5.0,
+                       help="Seconds recorded after the last detection (default: 5)")
+    parser.add_argument("--record-dir", type=str, default="recordings",
+                       help="Where event clips are written (default: recordings)")
+    parser.add_argument("--events-jsonl", type=str, metavar="PATH",
+                       help="Append every detection to this JSON lines file")
+    parser.add_argument("--events-db", type=str, metavar="PATH",
+                       help="Store every detection in this SQLite database")
+    parser.add_argument("--mqtt", type=str, metavar="HOST[:PORT]",
+                       help="Publish detections to this MQTT broker (needs paho-mqtt)")
+    parser.add_argument("--camera-name", type=str, default="camera0",
+                       help="Camera name recorded with each event (default: camera0)")
+    parser.add_argument("--metrics-port", type=int, default=0,
+                       help="Serve Prometheus metrics at /metrics on this port, e.g. 9100 "
+                            "(default: off)")
+    parser.add_argument("--metrics-json", type=str, metavar="PATH",
+                       help="Periodically write a metrics snapshot to this JSON file")
+    parser.add_argument("--metrics-interval", type=float, default=10.0,
+                       help="Seconds between --metrics-json writes (default: 10)")
+    parser.add_argument("--control-port", type=int, default=0,
+                       help="Serve GET/POST /config on this port, e.g. 8081, to change "
+                            "thresholds, classes and the model while running (default: off)")
+    parser.add_argument("--control-host", type=str, default="127.0.0.1",
+                       help="Address the control endpoint binds to (default: 127.0.0.1)")
+    parser.add_argument("--control-file", type=str, metavar="PATH",
+                       help="JSON settings file applied at start and whenever it changes")
+    parser.add_argument("--preprocess", choices=PREPROCESS_MODES, default="letterbox",
+                       help="letterbox: uint8 into a reused buffer, quantized on-chip; "
+                            "resize: stretched float32 (default: letterbox)")
+    # Defaults from --config FILE, validated; flags still win
+    return pipeline_config.parse_args(parser)
 
 
 def main():
     """Main application loop"""
+    args = parse_args()
+    if args.processes and (args.serial or args.tiles or args.roi
+                           or args.control_port or args.control_file):
+        print("❌ --processes can't be combined with --serial, --tiles/--roi or live control")
+        return
+    
     print("╔════════════════════════════════════════════════════════════╗")
     print("║     Hailo-8 Live Detection with Overlays                   ║")
     print("╚════════════════════════════════════════════════════════════╝")
     print()
     
-    # Model path - adjust as needed
-    model_paths = [
-        Path.home() / "yolov8n.hef",
-        Path.home() / "yolov8s.hef",
-        Path("/usr/share/hailo-models/yolov8s.hef"),
-        Path("./yolov8s.hef")
-    ]
-    
-    model_path = None
-    for path in model_paths:
-        if path.exists():
-            model_path = path
-            break
+    # Models are looked up by name in models/ and the usual install locations
+    registry = ModelRegistry()
+    if args.model:
+        try:
+            model_path = registry.find(args.model)
+        except FileNotFoundError as e:
+            print(f"❌ {e}")
+            return
+    else:
+        model_path = registry.find_first(DEFAULT_MODELS)
     
     if not model_path:
         print("❌ No YOLO model found. Please download a .hef model.")
-        print("   Expected locations:")
-        for p in model_paths:
-            print(f"     - {p}")
+        print(f"   Looked for {', '.join(DEFAULT_MODELS)} in:")
+        for root in registry.roots:
+            print(f"     - {root}")
         return
     
     print(f"✅ Using model: {model_path}")
+    try:
+        model_info = registry.info(model_path)
+    except Exception as e:
+        print(f"⚠️  Could not read model metadata: {e}")
+        model_info = None
     
     # Initialize detector
+    main_size = args.main_size
+    overlay_renderer.box_thickness = args.line_thickness
+    rois = [tuple(int(v) for v in roi.split(",")) for roi in args.roi]
+    tiled = args.tiles or bool(rois)
+    batch_size = 1
+    # Stage timers, queue depths and drops; nothing is measured without a consumer
+    metrics = Metrics(COCO_NAMES) if args.metrics_port or args.metrics_json else None
+    if tiled:
+        from tiling import TiledDetector, tile_grid
+        # One batch row per tile (or ROI) plus the full-frame pass
+        batch_size = len(rois or tile_grid(main_size[::-1], overlap=args.tile_overlap)) + 1
+    live_control = bool(args.control_port or args.control_file)
+    shared_vdevice = None
+    if live_control:
+        from control import (ModelSwitcher, Controller, ControlServer, ConfigWatcher,
+                             create_shared_vdevice)
+        # Scheduled, so a second model can be configured while the first runs
+        try:
+            shared_vdevice = create_shared_vdevice()
+        except Exception as e:
+            print(f"❌ Failed to initialize Hailo: {e}")
+            return
+    
+    def build_detector(path, info):
+        return HailoDetector(path, threshold=args.threshold,
+                             max_detections=args.max_detections,
+                             preprocess_mode=args.preprocess,
+                             # Enough input buffers for every frame in flight
+                             input_buffers=args.queue_size + 2,
+                             vdevice=shared_vdevice,
+                             batch_size=batch_size,
+                             metrics=metrics,
+                             model_info=info)
+    
     try:
-        detector = HailoDetector(model_path, threshold=0.5)
+        detector = build_detector(model_path, model_info)
     except Exception as e:
         print(f"❌ Failed to initialize Hailo: {e}")
+        if shared_vdevice is not None:
+            shared_vdevice.release()
         return
+    if args.warmup:
+        # Pay the cold-start cost now rather than on the first camera frame
+        print(f"🔥 Warm-up inference: {detector.warmup(args.warmup) * 1000:.0f} ms")
+    if args.dump_outputs:
+        # Tiled runs record one tensor per region, in batch order
+        recording_detector = detector
+        detector.record_outputs(args.dump_frames * batch_size)
+    if tiled:
+        detector = TiledDetector(detector, overlap=args.tile_overlap, rois=rois or None)
+        print(f"🧩 Tiled inference: {batch_size} regions per frame")
     
-    # Initialize camera
-    picam2 = Picamera2()
-    config = picam2.create_preview_configuration(
-        main={"size": (1280, 720)},
-        lores={"size": (640, 640)},
-        display="lores"
-    )
-    picam2.configure(config)
+    # Initialize camera: main (1280x720 by default) for display, ISP-scaled
+    # lores with main's aspect ratio and the model input's long side for
+    # inference, both from the same request; the detector letterboxes lores.
+    # Video and image sources yield display frames only; the detector
+    # resizes them.
+    try:
+        camera = open_source(
+            "synthetic" if args.fake_camera else args.source,
+            main_size=main_size,
+            lores_size=args.lores_size or lores_size_for(
+                main_size, (detector.input_width, detector.input_height)),
+            # Tiles are cut from the full-resolution main stream
+            use_lores=(args.capture == "lores" and not tiled),
+            fps=args.source_fps,
+            loop=args.loop
+        )
+    except (ValueError, RuntimeError) as e:
+        print(f"❌ {e}")
+        detector.cleanup()
+        if shared_vdevice is not None:
+            shared_vdevice.release()
+        return
+    
+    control_server = None
+    config_watcher = None
+    if live_control:
+        def load_model(path):
+            # Runs on the switcher's loader thread while the old model keeps going
+            replacement = build_detector(path, registry.info(path))
+            if args.warmup:
+                # Unmetered: warmup() resets the histograms the running model fills
+                replacement.metrics = None
+                replacement.warmup(args.warmup)
+                replacement.metrics = metrics
+            if tiled:
+                replacement = TiledDetector(replacement, overlap=args.tile_overlap,
+                                            rois=rois or None)
+            return replacement
+        
+        detector = ModelSwitcher(detector, build=load_model)
+        controller = Controller(detector, registry)
+        if args.control_file:
+            config_watcher = ConfigWatcher(controller, args.control_file).start()
+            print(f"📝 Watching {args.control_file} for settings changes")
+        if args.control_port:
+            try:
+                control_server = ControlServer(controller, host=args.control_host,
+                                               port=args.control_port).start()
+                print(f"🎛️  Control at http://{args.control_host}:{control_server.port}/config")
+            except OSError as e:
+                print(f"⚠️  Control endpoint unavailable: {e}")
     
     print("Starting camera...")
-    picam2.start()
-    time.sleep(2)  # Let camera warm up
+    camera.start()
     
     print()
     print("🎯 Detection started!")
     print("   Press Ctrl+C to stop")
     print()
     
+    # Encoding and snapshot writes happen on the stream's worker thread
+    stream = JpegStream(quality=args.stream_quality).start()
+    server = None
+    mp4_writer = None
+    if args.stream_port:
+        server = MjpegServer(stream, port=args.stream_port).start()
+        print(f"📡 Streaming MJPEG at http://0.0.0.0:{server.port}/")
+    recorder = None
+    if args.record:
+        recorder = EventRecorder(classes=args.record.split(","), pre_roll=args.pre_roll,
+                                 post_roll=args.post_roll, output_dir=args.record_dir)
+        recorder.start(stream)
+        print(f"⏺️  Recording {args.record} events to {args.record_dir}/ "
+              f"({args.pre_roll:.0f}s pre-roll)")
+    if args.mp4:
+        try:
+            mp4_writer = Mp4Writer(args.mp4).start(stream)
+            print(f"🎞️  Recording fragmented MP4 to {args.mp4}")
+        except RuntimeError as e:
+            print(f"⚠️  {e}")
+    
+    # Detection events go to their sinks on background threads
+    sinks = []
+    if args.events_jsonl:
+        sinks.append(JsonlSink(args.events_jsonl))
+    if args.events_db:
+        sinks.append(SqliteSink(args.events_db))
+    if args.mqtt:
+        host, _, port = args.mqtt.partition(":")
+        try:
+            sinks.append(MqttSink(host, int(port or 1883)))
+        except RuntimeError as e:
+            print(f"⚠️  {e}")
+    event_bus = EventBus(sinks, camera=args.camera_name).start() if sinks else None
+    
+    metrics_server = None
+    metrics_dumper = None
+    if metrics:
+        metrics.gauge("encoder_dropped_total", "Frames the JPEG encoder skipped",
+                      lambda: stream.dropped, kind="counter")
+        if recorder:
+            metrics.gauge("recorder_dropped_total", "Clip frames dropped by a stalled writer",
+                          lambda: recorder.dropped, kind="counter")
+        if event_bus:
+            metrics.gauge("events_dropped_total", "Detection events dropped by slow sinks",
+                          lambda: sum(s['dropped'] for s in event_bus.stats().values()),
+                          kind="counter")
+        if args.metrics_port:
+            metrics_server = MetricsServer(metrics, port=args.metrics_port).start()
+            print(f"📈 Metrics at http://0.0.0.0:{metrics_server.port}/metrics")
+        if args.metrics_json:
+            metrics_dumper = MetricsDumper(metrics, args.metrics_json,
+                                           interval=args.metrics_interval).start()
+    
     frame_count = 0
     start_time = time.time()
+    pipeline = None
     
-    try:
-        while True:
-            # Capture frame
-            frame = picam2.capture_array("main")
-            
-            # Run detection
-            detections = detector.detect(frame)
+    def on_frame(frame, detections, seq, owned=True):
+        nonlocal frame_count
+        if event_bus:
+            event_bus.publish(seq, detections)
+        if metrics:
+            metrics.frames.inc()
+            metrics.count_detections(detections)
+        if not render_frame(frame, detections, frame_count, stream=stream,
+                            show=not args.headless, draw=pool is None, owned=owned):
+            return False
+        if recorder:
+            recorder.update(detections)
+        
+        # Calculate FPS
+        frame_count += 1
+        if frame_count % 30 == 0:
+            elapsed = time.time() - start_time
+            fps = frame_count / elapsed
+            dropped = f" | Dropped: {pipeline.dropped}" if pipeline else ""
+            rate = f" | Inference: {governor.rate:.1f}/s" if governor else ""
+            print(f"📊 FPS: {fps:.1f} | Detections: {len(detections)}{dropped}{rate}")
             
-            # Draw overlays
-            if HAS_CV2:
-                frame_with_overlays = draw_overlays_cv2(frame.copy(), detections)
+            # Print detected objects
+            if detections:
+                objects = [d['class_name'] for d in detections]
+                print(f"   Objects: {', '.join(objects)}")
+        return True
+    
+    tracker = None
+    if args.track or args.tracker_config:
+        tracker = Tracker.from_config(args.tracker_config or DEFAULT_TEMPORAL_FILTER)
+    governor = None
+    if args.governor:
+        governor = InferenceGovernor(active_fps=args.active_fps, idle_fps=args.idle_fps,
+                                     budget=args.budget)
+        if metrics:
+            metrics.gauge("inference_rate", "Governor inference rate (per second)",
+                          lambda: governor.rate)
+    motion_gate = None
+    if args.motion or args.motion_roi:
+        motion_gate = MotionGate(threshold=args.motion_threshold)
+    pool = None
+    if args.processes:
+        from process_pool import ProcessPool
+        # Enough slots for a frame in every queue and every stage
+        pool = ProcessPool(detector, processes=args.processes,
+                           slots=args.queue_size * 6 + 8)
+    stages = detector_stages(pool or detector, tracker, infer_every=max(1, args.infer_every),
+                             governor=governor, motion_gate=motion_gate,
+                             motion_roi=args.motion_roi)
+    if pool:
+        stages.append(("draw", pool.draw))
+    
+    def on_drop(packet):
+        release_model(detector, packet)
+        if pool:
+            pool.release(packet)
+    
+    def on_packet(packet):
+        if pool is None:
+            return on_frame(packet.image, packet.detections, packet.seq)
+        try:
+            if not pool.finish(packet):
+                return True
+            # The slot goes back to the ring right after rendering
+            return on_frame(packet.image, packet.detections, packet.seq, owned=False)
+        finally:
+            pool.release(packet)
+    
+    try:
+        if args.serial:
+            for seq in itertools.count():
+                # Capture frame
+                started = time.perf_counter()
+                captured = camera.read()
+                if captured is None:
+                    break
+                frame, model_frame = captured
+                if metrics:
+                    metrics.stage("capture").since(started)
                 
-                # Display
-                cv2.imshow('Hailo-8 Object Detection', frame_with_overlays)
+                # Run detection (same stages as the pipeline, one after another)
+                packet = FramePacket(seq, frame, model_frame)
+                for _, stage in stages:
+                    packet = stage(packet)
                 
-                # Save snapshot on 's' key
-                key = cv2.waitKey(1) & 0xFF
-                if key == ord('s'):
-                    filename = f"detection_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
-                    cv2.imwrite(filename, frame_with_overlays)
-                    print(f"📸 Saved: {filename}")
-                elif key == ord('q'):
+                started = time.perf_counter()
+                keep_going = on_frame(packet.image, packet.detections, packet.seq)
+                if metrics:
+                    metrics.stage("render").since(started)
+                    metrics.stage("latency").observe(time.monotonic() - packet.captured_at)
+                if not keep_going:
                     break
-            else:
-                frame_with_overlays = draw_overlays_pil(frame, detections)
-                # For PIL, just save periodic snapshots
-                if frame_count % 30 == 0:  # Every second at 30fps
-                    filename = f"detection_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
-                    Image.fromarray(frame_with_overlays).save(filename)
-                    print(f"📸 Saved: {filename}")
-            
-            # Calculate FPS
-            frame_count += 1
-            if frame_count % 30 == 0:
-                elapsed = time.time() - start_time
-                fps = frame_count / elapsed
-                print(f"📊 FPS: {fps:.1f} | Detections: {len(detections)}")
-                
-                # Print detected objects
-                if detections:
-                    objects = [d['class_name'] for d in detections]
-                    print(f"   Objects: {', '.join(objects)}")
+        else:
+            pipeline = FramePipeline(
+                pool.source(camera.read) if pool else camera.read,
+                stages,
+                queue_size=args.queue_size,
+                drop_policy=args.drop_policy,
+                metrics=metrics,
+                on_drop=on_drop
+            )
+            if metrics:
+                metrics.watch_pipeline(pipeline)
+            pipeline.run(on_packet)
     
     except KeyboardInterrupt:
         print("\n⏹️  Stopping...")
     finally:
-        picam2.stop()
+        if pipeline:
+            pipeline.stop()
+        if pool:
+            pool.close()
+        if server:
+            server.stop()
+        if mp4_writer:
+            mp4_writer.stop()
+        if recorder:
+            recorder.stop()
+        if event_bus:
+            event_bus.close()
+        if metrics_server:
+            metrics_server.stop()
+        if metrics_dumper:
+            metrics_dumper.stop()
+        if control_server:
+            control_server.stop()
+        if config_watcher:
+            config_watcher.stop()
+        stream.stop()
+        camera.stop()
+        if args.dump_outputs:
+            saved = recording_detector.save_recorded_outputs(args.dump_outputs)
+            print(f"💾 Saved {saved} output tensors to {args.dump_outputs}")
         detector.cleanup()
-        if HAS_CV2:
+        if shared_vdevice is not None:
+            shared_vdevice.release()
+        if HAS_CV2 and not args.headless:
             cv2.destroyAllWindows()
         
         print("✅ Cleanup complete")
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Low-overhead runtime metrics with a Prometheus-style endpoint
+
+Shows on a running node whether capture, preprocess, the device,
+postprocess or rendering is the bottleneck, without attaching a profiler.
+
+Stage timings go into histograms with fixed buckets whose counters are
+allocated up front: observe() is a bisect and two additions under a lock,
+and memory never grows with the number of samples. Queue depths and drop
+counters are not recorded at all on the hot path; gauges read them only
+when the metrics are scraped.
+
+    metrics = Metrics()
+    detector = HailoDetector(model, metrics=metrics)   # preprocess/device/postprocess
+    pipeline = FramePipeline(source, stages, metrics=metrics)  # capture/render/latency
+    metrics.watch_pipeline(pipeline)                   # queue depths and drops
+    MetricsServer(metrics, port=9100).start()          # GET /metrics, /metrics.json
+    MetricsDumper(metrics, "metrics.json", interval=10).start()
+
+Timers use time.perf_counter (monotonic).
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds; covers sub-millisecond NMS up to a stalled camera read
+LATENCY_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.0075, 0.01, 0.015, 0.02, 0.03, 0.04,
+                   0.05, 0.075, 0.1, 0.2, 0.5, 1.0, 2.5)
+
+PREFIX = "hailo_"
+
+
+def _labels(labels, extra=None):
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() allocates nothing that persists"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)   # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self.count += 1
+            self.sum += value
+
+    def since(self, started):
+        """Observe the time elapsed since a time.perf_counter() reading"""
+        self.observe(time.perf_counter() - started)
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._counts), self.count, self.sum
+
+    def reset(self):
+        with self._lock:
+            self._counts[:] = [0] * len(self._counts)
+            self.count = 0
+            self.sum = 0.0
+
+    def quantile(self, q, counts=None, count=None):
+        """Estimate by interpolating within buckets, like Prometheus histogram_quantile"""
+        if counts is None:
+            counts, count, _ = self.snapshot()
+        if not count:
+            return None
+        rank = q * count
+        seen = 0
+        lower = 0.0
+        for bound, n in zip(self.buckets, counts):
+            if n and seen + n >= rank:
+                return lower + (bound - lower) * (rank - seen) / n
+            seen += n
+            lower = bound
+        return self.buckets[-1]   # in the +Inf bucket: report the largest bound
+
+
+class Counter:
+    """Monotonic counter"""
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class ClassCounter:
+    """One preallocated counter per class id"""
+
+    def __init__(self, class_names):
+        self.class_names = list(class_names)
+        self._counts = [0] * len(self.class_names)
+        self._lock = threading.Lock()
+
+    def add(self, detections):
+        with self._lock:
+            for det in detections:
+                class_id = det['class_id']
+                if 0 <= class_id < len(self._counts):
+                    self._counts[class_id] += 1
+
+    def items(self):
+        with self._lock:
+            counts = list(self._counts)
+        return [(name, n) for name, n in zip(self.class_names, counts) if n]
+
+
+class Metrics:
+    """Registry of every metric a node exports"""
+
+    def __init__(self, class_names=None):
+        self.started = time.time()
+        self._families = {}     # name -> (kind, help, {labels: metric or callable})
+        self._lock = threading.Lock()
+        self.stage_seconds = {}
+        self.detections = None
+        if class_names is not None:
+            self.detections = ClassCounter(class_names)
+        self.frames = self.counter("frames_total", "Frames rendered")
+        self.device_errors = self.counter("device_errors_total", "Failed inference calls")
+
+    def _register(self, name, kind, help_text, labels, metric):
+        with self._lock:
+            family = self._families.setdefault(PREFIX + name, (kind, help_text, {}))
+            family[2][tuple(sorted(labels.items()))] = metric
+        return metric
+
+    def histogram(self, name, help_text, labels=None, buckets=LATENCY_BUCKETS):
+        return self._register(name, "histogram", help_text, labels or {}, Histogram(buckets))
+
+    def counter(self, name, help_text, labels=None):
+        return self._register(name, "counter", help_text, labels or {}, Counter())
+
+    def gauge(self, name, help_text, read, labels=None, kind="gauge"):
+        """Register a value read by calling read() at scrape time"""
+        return self._register(name, kind, help_text, labels or {}, read)
+
+    def stage(self, name):
+        """Histogram of seconds spent in one pipeline stage"""
+        histogram = self.stage_seconds.get(name)
+        if histogram is None:
+            histogram = self.stage_seconds[name] = self.histogram(
+                "stage_seconds", "Time spent in each stage", {'stage': name})
+        return histogram
+
+    def count_detections(self, detections):
+        if self.detections is not None:
+            self.detections.add(detections)
+
+    def watch_pipeline(self, pipeline):
+        """Export a FramePipeline's queue depths and drops (read at scrape time)"""
+        for q in list(pipeline.queues) + [pipeline.output]:
+            self.gauge("queue_depth", "Frames waiting in each stage queue",
+                       q.qsize, {'queue': q.name})
+            self.gauge("dropped_frames_total", "Frames dropped by each stage queue",
+                       lambda q=q: q.dropped, {'queue': q.name}, kind="counter")
+        self.gauge("captured_frames_total", "Frames captured",
+                   lambda: pipeline.captured, kind="counter")
+        self.gauge("pipeline_errors_total", "Capture and stage failures",
+                   lambda: pipeline.errors, kind="counter")
+
+    # Export
+
+    def render(self):
+        """Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            families = [(name, kind, help_text, list(series.items()))
+                        for name, (kind, help_text, series) in self._families.items()]
+        for name, kind, help_text, series in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, metric in series:
+                if isinstance(metric, Histogram):
+                    counts, count, total = metric.snapshot()
+                    cumulative = 0
+                    for bound, n in zip(metric.buckets, counts):
+                        cumulative += n
+                        lines.append(f"{name}_bucket{_labels(labels, ('le', bound))} {cumulative}")
+                    lines.append(f"{name}_bucket{_labels(labels, ('le', '+Inf'))} {count}")
+                    lines.append(f"{name}_sum{_labels(labels)} {total:.6f}")
+                    lines.append(f"{name}_count{_labels(labels)} {count}")
+                elif isinstance(metric, Counter):
+                    lines.append(f"{name}{_labels(labels)} {metric.value}")
+                else:
+                    lines.append(f"{name}{_labels(labels)} {metric()}")
+        if self.detections is not None:
+            name = PREFIX + "detections_total"
+            lines.append(f"# HELP {name} Detections rendered, by class")
+            lines.append(f"# TYPE {name} counter")
+            for class_name, n in self.detections.items():
+                lines.append(f"{name}{_labels([('class', class_name)])} {n}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """Plain dict for JSON: stage timings with estimated percentiles, counters, gauges"""
+        data = {'timestamp': time.time(), 'uptime': time.time() - self.started,
+                'stages': {}, 'values': {}}
+        with self._lock:
+            families = [(name, list(series.items()))
+                        for name, (_, _, series) in self._families.items()]
+        for name, series in families:
+            for labels, metric in series:
+                key = name[len(PREFIX):] + "".join(f"[{v}]" for _, v in labels)
+                if isinstance(metric, Histogram):
+                    counts, count, total = metric.snapshot()
+                    data['stages'][dict(labels).get('stage', key)] = {
+                        'count': count,
+                        'mean_ms': total / count * 1000 if count else None,
+                        **{f"p{int(q * 100)}_ms": (metric.quantile(q, counts, count) or 0) * 1000
+                           for q in (0.5, 0.95, 0.99)},
+                    }
+                elif isinstance(metric, Counter):
+                    data['values'][key] = metric.value
+                else:
+                    data['values'][key] = metric()
+        if self.detections is not None:
+            data['detections'] = dict(self.detections.items())
+        return data
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        metrics = self.server.metrics
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            self._send("text/plain; version=0.0.4", metrics.render().encode())
+        elif path == "/metrics.json":
+            self._send("application/json", json.dumps(metrics.snapshot()).encode())
+        else:
+            self.send_error(404)
+
+    def _send(self, content_type, body):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer:
+    """Local HTTP endpoint serving /metrics (Prometheus) and /metrics.json"""
+
+    def __init__(self, metrics, host="0.0.0.0", port=9100):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._httpd = None
+        self._thread = None
+
+    def start(self):
+        self._httpd = ThreadingHTTPServer((self.host, self.port), _MetricsHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.metrics = self.metrics
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        name="metrics-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+        if self._thread:
+            self._thread.join(2.0)
+            self._thread = None
+
+
+class MetricsDumper:
+    """Writes Metrics.snapshot() to a JSON file every interval seconds
+
+    The file is replaced atomically, so readers never see a partial write.
+    """
+
+    def __init__(self, metrics, path, interval=10.0):
+        self.metrics = metrics
+        self.path = str(path)
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="metrics-dump", daemon=True)
+        self._thread.start()
+        return self
+
+    def dump(self):
+        temporary = f"{self.path}.tmp"
+        try:
+            with open(temporary, "w") as f:
+                json.dump(self.metrics.snapshot(), f, indent=2)
+            os.replace(temporary, self.path)
+        except OSError as e:
+            print(f"⚠️  Could not write metrics to {self.path}: {e}")
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.dump()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(2.0)
+            self._thread = None
+        self.dump()
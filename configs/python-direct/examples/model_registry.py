@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Model registry: find HEFs by name and cache what's inside them
+
+The registry scans the repository's models/ directory (pi5-compatible
+first, since x86 builds fail on the Pi 5 Python API, then
+rpicam-compatible, then x86-models), plus the usual install locations. It
+resolves a model by name:
+
+    registry = ModelRegistry()
+    path = registry.find("yolov8s")        # or a path, returned as-is
+    info = registry.info(path)             # cached metadata
+    detector = HailoDetector(path, model_info=info)
+
+Each HEF's metadata is parsed once: input and output vstreams, the output
+layout (raw head or on-device NMS), quantization parameters, class list. It is stored in an
+on-disk JSON index keyed by the file's SHA-256, and a size/mtime check
+means an unchanged file isn't even re-hashed. Renaming or copying a model
+keeps its entry, and replacing it under the same name invalidates it.
+
+Class lists come from a sidecar next to the HEF (model.labels or
+model.txt, one name per line) when present, and default to COCO for
+80-class heads.
+
+    python model_registry.py list
+    python model_registry.py path yolov8s
+    python model_registry.py rpicam-config yolov8s -o hailo_yolov8_inference.json
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+MODELS_DIR = Path(__file__).resolve().parents[3] / "models"
+
+# Preference order when the same name exists in several places
+MODEL_SUBDIRS = ("pi5-compatible", "rpicam-compatible")
+FALLBACK_SUBDIRS = ("x86-models",)
+INSTALL_LOCATIONS = (Path.home(), Path("/usr/share/hailo-models"), Path("."))
+
+INDEX_PATH = Path(os.environ.get("HAILO_MODEL_INDEX",
+                                 Path.home() / ".cache" / "open-hailo" / "hef_index.json"))
+INDEX_VERSION = 2
+
+RPICAM_CONFIG = Path(__file__).resolve().parents[2] / "rpicam" / "hailo_yolov8_inference.json"
+
+
+def default_roots():
+    """Directories searched for .hef files, most preferred first"""
+    return ([MODELS_DIR / d for d in MODEL_SUBDIRS] + list(INSTALL_LOCATIONS)
+            + [MODELS_DIR / d for d in FALLBACK_SUBDIRS])
+
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def output_layout(name, shape):
+    """How postprocess should read an output: nms, channels_first or channels_last"""
+    if "nms" in name.lower():
+        return "nms"
+    if len(shape) >= 2 and shape[-2] < shape[-1]:
+        return "channels_first"
+    return "channels_last"
+
+
+def nms_info(info):
+    """{'classes', 'max_boxes'} for an output compiled with on-device NMS, else None"""
+    order = getattr(getattr(info, "format", None), "order", None)
+    if "nms" not in info.name.lower() and "NMS" not in str(order or ""):
+        return None
+    try:
+        shape = info.nms_shape
+        return {'classes': int(shape.number_of_classes),
+                'max_boxes': int(shape.max_bboxes_per_class)}
+    except Exception:
+        pass
+    # [classes, 5, max_boxes] as reported for the TF NMS format
+    dims = [int(v) for v in info.shape]
+    if len(dims) == 3:
+        return {'classes': dims[0], 'max_boxes': dims[2] if dims[1] == 5 else dims[1]}
+    return {'classes': None, 'max_boxes': None}
+
+
+def _quantization(info):
+    quant = getattr(info, "quant_info", None)
+    if quant is None:
+        return None
+    return {'scale': float(quant.qp_scale), 'zero_point': float(quant.qp_zp)}
+
+
+def _vstream(info):
+    return {'name': info.name, 'shape': [int(v) for v in info.shape],
+            'quantization': _quantization(info)}
+
+
+def read_class_names(hef_path):
+    """Class names from a sidecar file next to the HEF, or None"""
+    for suffix in (".labels", ".txt"):
+        sidecar = Path(hef_path).with_suffix(suffix)
+        if sidecar.exists():
+            return [line.strip() for line in sidecar.read_text().splitlines() if line.strip()]
+    return None
+
+
+def read_hef_metadata(path):
+    """Parse one HEF's vstream infos (needs hailo_platform, or HAILO_FAKE)"""
+    from hailo_platform import HEF
+
+    hef = HEF(str(path))
+    inputs = [_vstream(info) for info in hef.get_input_vstream_infos()]
+    outputs = []
+    for info in hef.get_output_vstream_infos():
+        output = _vstream(info)
+        output['nms'] = nms_info(info)
+        output['layout'] = "nms" if output['nms'] else output_layout(info.name, output['shape'])
+        outputs.append(output)
+    first = outputs[0]
+    head_classes = None
+    if first['nms']:
+        head_classes = first['nms']['classes']
+    elif len(first['shape']) >= 2:
+        head_classes = min(first['shape'][-2:]) - 4
+    classes = read_class_names(path)
+    return {
+        'network_groups': list(hef.get_network_group_names()),
+        'inputs': inputs,
+        'outputs': outputs,
+        'num_classes': len(classes) if classes else head_classes,
+        'classes': classes,
+    }
+
+
+class ModelRegistry:
+    """Finds models by name and keeps an on-disk index of their metadata"""
+
+    def __init__(self, roots=None, index_path=INDEX_PATH):
+        self.roots = [Path(r) for r in (roots or default_roots())]
+        self.index_path = Path(index_path) if index_path else None
+        self._index = self._load_index()
+        self._dirty = False
+
+    def _load_index(self):
+        empty = {'version': INDEX_VERSION, 'models': {}, 'files': {}}
+        if self.index_path is None or not self.index_path.exists():
+            return empty
+        try:
+            index = json.loads(self.index_path.read_text())
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Ignoring unreadable model index {self.index_path}: {e}")
+            return empty
+        return index if index.get('version') == INDEX_VERSION else empty
+
+    def save(self):
+        """Write the index if anything changed (atomically)"""
+        if self.index_path is None or not self._dirty:
+            return
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = self.index_path.with_suffix(".tmp")
+            temporary.write_text(json.dumps(self._index, indent=2))
+            os.replace(temporary, self.index_path)
+            self._dirty = False
+        except OSError as e:
+            print(f"⚠️  Could not write model index {self.index_path}: {e}")
+
+    def scan(self):
+        """Every .hef under the search roots, most preferred first"""
+        found = []
+        seen = set()
+        for root in self.roots:
+            if not root.is_dir():
+                continue
+            for path in sorted(root.glob("*.hef")):
+                resolved = path.resolve()
+                if resolved not in seen:
+                    seen.add(resolved)
+                    found.append(path)
+        return found
+
+    def find(self, name):
+        """Path of a model given its name (yolov8s, yolov8s.hef) or a path"""
+        candidate = Path(name).expanduser()
+        if candidate.suffix == ".hef" and candidate.exists():
+            return candidate
+        stem = candidate.stem if candidate.suffix == ".hef" else candidate.name
+        for path in self.scan():
+            if path.stem == stem:
+                return path
+        searched = ", ".join(str(r) for r in self.roots)
+        raise FileNotFoundError(f"Model '{name}' not found (searched {searched})")
+
+    def find_first(self, names):
+        """First of several model names that exists, or None"""
+        for name in names:
+            try:
+                return self.find(name)
+            except FileNotFoundError:
+                continue
+        return None
+
+    def file_hash(self, path):
+        """SHA-256 of path, reused while its size and mtime are unchanged"""
+        path = Path(path).resolve()
+        stat = path.stat()
+        entry = self._index['files'].get(str(path))
+        if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+            return entry['sha256']
+        digest = file_hash(path)
+        self._index['files'][str(path)] = {'size': stat.st_size, 'mtime': stat.st_mtime,
+                                           'sha256': digest}
+        self._dirty = True
+        return digest
+
+    def info(self, path, save=True):
+        """Metadata for one HEF: from the index, or parsed and added to it"""
+        path = Path(path)
+        digest = self.file_hash(path)
+        meta = self._index['models'].get(digest)
+        if meta is None:
+            meta = read_hef_metadata(path)
+            self._index['models'][digest] = meta
+            self._dirty = True
+        elif meta.get('classes') is None and read_class_names(path):
+            # A sidecar added since the model was indexed
+            meta['classes'] = read_class_names(path)
+            self._dirty = True
+        if save:
+            self.save()
+        return {**meta, 'name': path.stem, 'path': str(path), 'sha256': digest,
+                'group': path.parent.name}
+
+    def models(self):
+        """(name, path, group) for every model found, without parsing any"""
+        return [(path.stem, path, path.parent.name) for path in self.scan()]
+
+
+def rpicam_config(hef_path, template=RPICAM_CONFIG):
+    """The rpicam-apps post-process JSON with every hef_file* pointing at hef_path"""
+    config = json.loads(Path(template).read_text())
+    for stage in config.values():
+        if isinstance(stage, dict):
+            for key in stage:
+                if key.startswith("hef_file"):
+                    stage[key] = str(Path(hef_path).resolve())
+    return config
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="List and resolve Hailo models")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="List models with their cached metadata")
+    path_parser = commands.add_parser("path", help="Print the path of a model")
+    path_parser.add_argument("name")
+    rpicam_parser = commands.add_parser(
+        "rpicam-config", help="Write the rpicam-apps JSON with this model's path")
+    rpicam_parser.add_argument("name")
+    rpicam_parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    args = parser.parse_args()
+
+    registry = ModelRegistry()
+    if args.command == "path":
+        print(registry.find(args.name))
+    elif args.command == "rpicam-config":
+        config = json.dumps(rpicam_config(registry.find(args.name)), indent=4)
+        if args.output:
+            Path(args.output).write_text(config + "\n")
+        else:
+            print(config)
+    else:
+        if os.environ.get("HAILO_FAKE"):
+            import fake_hailo_platform
+            fake_hailo_platform.install()
+        for name, path, group in registry.models():
+            try:
+                info = registry.info(path, save=False)
+                output = info['outputs'][0]
+                details = (f"in {tuple(info['inputs'][0]['shape'])}  out {tuple(output['shape'])} "
+                           f"{output['layout']}  {info['num_classes']} classes")
+            except ImportError:
+                details = "(install hailo_platform for metadata)"
+            except Exception as e:
+                details = f"(unreadable: {e})"
+            print(f"{name:<16}{group:<20}{details}")
+        registry.save()
+
+
+if __name__ == "__main__":
+    main()
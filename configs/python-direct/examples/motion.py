@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Cheap motion gate in front of Hailo inference
+
+Like Frigate's motion detection, this runs on a heavily downsampled
+grayscale copy of the frame and compares it against a running background
+average. Everything is whole-array NumPy on a frame about 1/64 the size of
+the original, so it costs a fraction of a millisecond on a Pi 5.
+
+    gate = MotionGate()
+    if gate.update(frame):
+        roi = gate.roi()        # (x1, y1, x2, y2) in frame pixels
+        detections = detector.detect(frame)   # or only the roi
+
+When nothing moved, inference can be skipped entirely (the tracker fills
+the frame) or restricted to the changed region.
+"""
+
+import numpy as np
+
+
+class MotionGate:
+    """Running-background frame differencing on a downsampled grayscale frame"""
+
+    def __init__(self, downscale=8, threshold=25, min_area=0.002, alpha=0.05,
+                 cell_size=4, roi_margin=0.1, min_roi_fraction=0.5):
+        self.downscale = max(1, int(downscale))
+        self.threshold = threshold          # gray-level change counted as motion
+        self.min_area = min_area            # fraction of pixels that must change
+        self.alpha = alpha                  # background learning rate
+        self.cell_size = max(1, int(cell_size))  # small pixels per region cell
+        self.roi_margin = roi_margin
+        self.min_roi_fraction = min_roi_fraction
+        self.background = None
+        self.mask = None                    # bool mask at the downsampled size
+        self.motion = False
+        self.frame_shape = None
+
+    def _gray(self, frame):
+        """Strided subsample and integer (R + 2G + B) / 4 grayscale"""
+        small = frame[::self.downscale, ::self.downscale]
+        if small.ndim == 2:
+            return small.astype(np.float32)
+        small = small[..., :3].astype(np.uint16)
+        return ((small[..., 0] + 2 * small[..., 1] + small[..., 2]) >> 2).astype(np.float32)
+
+    def reset(self):
+        self.background = None
+        self.mask = None
+        self.motion = False
+
+    def update(self, frame):
+        """Feed a frame; returns True if enough of it changed"""
+        gray = self._gray(frame)
+        self.frame_shape = frame.shape[:2]
+
+        if self.background is None or self.background.shape != gray.shape:
+            self.background = gray
+            self.mask = np.zeros(gray.shape, dtype=bool)
+            self.motion = False
+            return False
+
+        self.mask = np.abs(gray - self.background) > self.threshold
+        # Learn slowly where nothing moved so moving objects don't get
+        # absorbed into the background
+        rate = np.where(self.mask, self.alpha * 0.1, self.alpha).astype(np.float32)
+        self.background += rate * (gray - self.background)
+
+        self.motion = bool(self.mask.mean() >= self.min_area)
+        return self.motion
+
+    def cells(self):
+        """Coarse [rows, cols] bool grid: which cells contain motion"""
+        if self.mask is None:
+            return np.zeros((0, 0), dtype=bool)
+        c = self.cell_size
+        rows, cols = self.mask.shape[0] // c, self.mask.shape[1] // c
+        trimmed = self.mask[:rows * c, :cols * c]
+        return trimmed.reshape(rows, c, cols, c).any(axis=(1, 3))
+
+    def regions(self):
+        """Bounding boxes (x1, y1, x2, y2) in frame pixels of connected motion cells"""
+        cells = self.cells()
+        if not self.motion or not cells.any():
+            return []
+
+        cell_px = self.cell_size * self.downscale
+        seen = np.zeros_like(cells)
+        boxes = []
+        # The cell grid is tiny (~20x11 for 720p), so a flood fill is cheap
+        for r, c in zip(*np.nonzero(cells)):
+            if seen[r, c]:
+                continue
+            stack = [(r, c)]
+            seen[r, c] = True
+            r1 = r2 = r
+            c1 = c2 = c
+            while stack:
+                y, x = stack.pop()
+                r1, r2, c1, c2 = min(r1, y), max(r2, y), min(c1, x), max(c2, x)
+                for ny, nx in ((y - 1, x), (y + 1, x), (y, x - 1), (y, x + 1)):
+                    if (0 <= ny < cells.shape[0] and 0 <= nx < cells.shape[1]
+                            and cells[ny, nx] and not seen[ny, nx]):
+                        seen[ny, nx] = True
+                        stack.append((ny, nx))
+            boxes.append(self._clip((c1 * cell_px, r1 * cell_px,
+                                     (c2 + 1) * cell_px, (r2 + 1) * cell_px)))
+        return boxes
+
+    def roi(self):
+        """Single region covering all motion, padded and at least
+        min_roi_fraction of the frame on each side; None without motion
+        """
+        cells = self.cells()
+        if not self.motion or not cells.any():
+            return None
+
+        cell_px = self.cell_size * self.downscale
+        rows = np.nonzero(cells.any(axis=1))[0]
+        cols = np.nonzero(cells.any(axis=0))[0]
+        x1, x2 = cols[0] * cell_px, (cols[-1] + 1) * cell_px
+        y1, y2 = rows[0] * cell_px, (rows[-1] + 1) * cell_px
+
+        frame_h, frame_w = self.frame_shape
+        w = max(x2 - x1, frame_w * self.min_roi_fraction) * (1 + self.roi_margin)
+        h = max(y2 - y1, frame_h * self.min_roi_fraction) * (1 + self.roi_margin)
+        cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+        w, h = min(w, frame_w), min(h, frame_h)
+        x1 = min(max(cx - w / 2, 0), frame_w - w)
+        y1 = min(max(cy - h / 2, 0), frame_h - h)
+        return (int(x1), int(y1), int(x1 + w), int(y1 + h))
+
+    def _clip(self, box):
+        frame_h, frame_w = self.frame_shape
+        x1, y1, x2, y2 = box
+        return (int(max(x1, 0)), int(max(y1, 0)), int(min(x2, frame_w)), int(min(y2, frame_h)))
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Cached overlay renderer for detection previews
+
+Text is the expensive part of an overlay: measuring and rasterizing a label
+(cv2.getTextSize/putText, or a PIL font draw on a full-frame Image) costs
+far more than the box around it. OverlayRenderer rasterizes each label once
+into a small sprite and keeps it in an LRU cache keyed by class and
+confidence bucket, so the steady-state per-frame work is a few NumPy slice
+writes per detection drawn straight into the frame buffer:
+
+    renderer = OverlayRenderer()
+    renderer.draw(frame, detections)            # in place
+    renderer.text(frame, "FPS: 29.8", (10, 40))
+
+Free-form text (timestamps, FPS) is composed from cached per-character
+glyph masks. Fonts are loaded once. Rasterizing uses OpenCV when available
+and PIL otherwise; drawing never converts the frame to or from PIL.
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+
+try:
+    import cv2
+    HAS_CV2 = True
+except ImportError:
+    HAS_CV2 = False
+    from PIL import Image, ImageDraw, ImageFont
+
+# Color palette for bounding boxes (BGR for OpenCV, RGB for PIL)
+COLORS = [
+    (255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0), (255, 0, 255),
+    (0, 255, 255), (128, 0, 255), (255, 128, 0), (128, 255, 0), (0, 128, 255)
+]
+
+DEFAULT_FONT = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+
+
+class OverlayRenderer:
+    """Draws boxes and labels into frames from cached sprites"""
+
+    def __init__(self, font_path=DEFAULT_FONT, font_size=16, cache_size=512,
+                 confidence_step=0.05, box_thickness=2, colors=COLORS,
+                 text_color=(255, 255, 255)):
+        self.font_size = font_size
+        self.cache_size = cache_size
+        self.confidence_step = confidence_step
+        self.box_thickness = box_thickness
+        self.colors = colors
+        self.text_color = text_color
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._font = None
+        if HAS_CV2:
+            # Hershey scale that gives roughly font_size pixel tall text
+            self._cv2_scale = font_size / 32.0
+            (_, self._ascent), descent = cv2.getTextSize(
+                "Ag|", cv2.FONT_HERSHEY_SIMPLEX, self._cv2_scale, 1)
+            self._line_height = self._ascent + descent
+        else:
+            try:
+                self._font = ImageFont.truetype(font_path, font_size)
+            except OSError:
+                self._font = ImageFont.load_default()
+            self._line_height = self._font.getbbox("Ag|")[3]
+
+    # Sprite cache
+
+    def _cached(self, key, build):
+        sprite = self._cache.get(key)
+        if sprite is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return sprite
+        self.misses += 1
+        sprite = build()
+        self._cache[key] = sprite
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return sprite
+
+    def _text_mask(self, text):
+        """Rasterize text once into a bool coverage mask
+
+        Every mask is one line tall with the baseline at the same row, so
+        glyphs drawn side by side line up.
+        """
+        if HAS_CV2:
+            (width, _), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, self._cv2_scale, 1)
+            mask = np.zeros((self._line_height + 2, width + 2), dtype=np.uint8)
+            cv2.putText(mask, text, (1, self._ascent + 1), cv2.FONT_HERSHEY_SIMPLEX,
+                        self._cv2_scale, 255, 1, cv2.LINE_AA)
+        else:
+            width = int(np.ceil(self._font.getlength(text)))
+            image = Image.new("L", (width + 2, self._line_height + 2), 0)
+            ImageDraw.Draw(image).text((1, 1), text, fill=255, font=self._font)
+            mask = np.asarray(image)
+        return mask > 127
+
+    def _label_sprite(self, text, color):
+        """Opaque label: text_color text on a color background"""
+        mask = self._text_mask(text)
+        sprite = np.empty(mask.shape + (3,), dtype=np.uint8)
+        sprite[...] = color
+        sprite[mask] = self.text_color
+        return sprite
+
+    def label(self, detection):
+        """Cached sprite for a detection's label, confidence bucketed"""
+        confidence = round(detection['confidence'] / self.confidence_step) * self.confidence_step
+        color = self.colors[detection['class_id'] % len(self.colors)]
+        key = ("label", detection['class_name'], color, round(confidence, 4))
+        text = f"{detection['class_name']}: {confidence:.2f}"
+        return self._cached(key, lambda: self._label_sprite(text, color))
+
+    def glyph(self, char):
+        """Cached coverage mask for one character"""
+        return self._cached(("glyph", char), lambda: self._text_mask(char))
+
+    # Drawing (all in place)
+
+    @staticmethod
+    def _blit(frame, sprite, x, y, mask=None, color=None):
+        """Copy sprite (or color through mask) into frame at (x, y), clipped"""
+        frame_h, frame_w = frame.shape[:2]
+        h, w = sprite.shape[:2]
+        x1, y1 = max(x, 0), max(y, 0)
+        x2, y2 = min(x + w, frame_w), min(y + h, frame_h)
+        if x1 >= x2 or y1 >= y2:
+            return
+        region = frame[y1:y2, x1:x2, :3]
+        sx, sy = x1 - x, y1 - y
+        if mask is None:
+            region[...] = sprite[sy:sy + y2 - y1, sx:sx + x2 - x1]
+        else:
+            region[mask[sy:sy + y2 - y1, sx:sx + x2 - x1]] = color
+
+    def box(self, frame, bbox, color):
+        """Rectangle outline via four slice writes"""
+        frame_h, frame_w = frame.shape[:2]
+        t = self.box_thickness
+        x1, y1, x2, y2 = (int(v) for v in bbox)
+        x1, x2 = max(min(x1, x2), 0), min(max(x1, x2), frame_w - 1)
+        y1, y2 = max(min(y1, y2), 0), min(max(y1, y2), frame_h - 1)
+        if x1 > x2 or y1 > y2:
+            return
+        frame[y1:y1 + t, x1:x2 + 1, :3] = color
+        frame[max(y2 - t + 1, y1):y2 + 1, x1:x2 + 1, :3] = color
+        frame[y1:y2 + 1, x1:x1 + t, :3] = color
+        frame[y1:y2 + 1, max(x2 - t + 1, x1):x2 + 1, :3] = color
+
+    def text(self, frame, text, position, color=(0, 255, 0)):
+        """Draw free-form text from cached glyphs; returns the end x"""
+        x, y = position
+        for char in text:
+            mask = self.glyph(char)
+            if char != " ":
+                self._blit(frame, mask, x, y, mask=mask, color=color)
+            # Glyph masks carry a 1 px margin on each side
+            x += mask.shape[1] - 2
+        return x
+
+    def draw(self, frame, detections, header=True):
+        """Draw every detection (and a detection count) into frame"""
+        for det in detections:
+            color = self.colors[det['class_id'] % len(self.colors)]
+            x1, y1 = int(det['bbox'][0]), int(det['bbox'][1])
+            self.box(frame, det['bbox'], color)
+            sprite = self.label(det)
+            # Above the box, or inside it when the box touches the top edge
+            top = y1 - sprite.shape[0] if y1 >= sprite.shape[0] else y1
+            self._blit(frame, sprite, x1, top)
+        if header:
+            self.text(frame, f"Detections: {len(detections)}", (10, 10))
+        return frame
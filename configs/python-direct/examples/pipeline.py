@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Staged frame pipeline for Hailo detection
+
+Runs capture → preprocess → infer → postprocess in one worker thread per
+stage, connected by small bounded queues, and hands finished frames to a
+sink (render) on the calling thread. Camera I/O, CPU work and accelerator
+time overlap, so throughput approaches the slowest stage instead of the
+sum of all stages.
+
+When a stage falls behind, the queue in front of it applies a drop policy:
+
+    drop_oldest  - discard the stalest queued frame (bounded latency, default)
+    drop_newest  - discard the incoming frame
+    block        - wait for space (no drops, latency grows)
+
+Every frame carries a sequence number assigned at capture, so the sink can
+tell how many frames were dropped in between. With a metrics.Metrics, the
+pipeline also times capture and the sink, and records each frame's age
+(capture until the sink is done) as "latency".
+"""
+
+import queue
+import threading
+import time
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+BLOCK = "block"
+DROP_POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+# Marks the end of the stream on every queue
+_STOP = object()
+
+
+class FramePacket:
+    """One captured frame and everything the stages attach to it"""
+
+    __slots__ = ("seq", "captured_at", "image", "model_image", "run_inference", "model",
+                 "input_data", "meta", "outputs", "detections", "timings")
+
+    def __init__(self, seq, image, model_image=None):
+        self.seq = seq
+        self.captured_at = time.monotonic()
+        self.image = image
+        # Frame fed to the model, e.g. the camera's lores stream
+        self.model_image = image if model_image is None else model_image
+        self.run_inference = True
+        # Detector that preprocessed the frame; infer and postprocess use the same
+        self.model = None
+        self.input_data = None
+        self.meta = None
+        self.outputs = None
+        self.detections = []
+        # Seconds spent in each stage, by stage name
+        self.timings = {}
+
+
+class StageQueue:
+    """Bounded queue between two stages that applies a drop policy"""
+
+    def __init__(self, name, maxsize=2, drop_policy=DROP_OLDEST, on_drop=None):
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+        self.name = name
+        self.drop_policy = drop_policy
+        # Called with every discarded item, e.g. to cancel its future
+        self.on_drop = on_drop
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def put(self, packet):
+        """Queue a packet, dropping one if the queue is full"""
+        if self.drop_policy == BLOCK:
+            self._queue.put(packet)
+            return
+
+        with self._lock:
+            try:
+                self._queue.put_nowait(packet)
+                return
+            except queue.Full:
+                pass
+
+            self.dropped += 1
+            if self.drop_policy == DROP_NEWEST:
+                discarded = packet
+            else:
+                try:
+                    discarded = self._queue.get_nowait()
+                except queue.Empty:
+                    discarded = None
+                self._queue.put_nowait(packet)
+
+        if self.on_drop is not None and discarded not in (None, _STOP):
+            self.on_drop(discarded)
+
+    def put_stop(self):
+        """Queue the end-of-stream marker, never dropping it"""
+        while True:
+            try:
+                self._queue.put(_STOP, timeout=0.1)
+                return
+            except queue.Full:
+                try:
+                    discarded = self._queue.get_nowait()
+                except queue.Empty:
+                    continue
+                self.dropped += 1
+                if self.on_drop is not None and discarded is not _STOP:
+                    self.on_drop(discarded)
+
+    def get(self, timeout=None):
+        return self._queue.get(timeout=timeout)
+
+    def qsize(self):
+        return self._queue.qsize()
+
+
+class FramePipeline:
+    """Capture source plus a chain of stages, each on its own thread
+
+    source is a callable returning the next image (None ends the stream),
+    or a (display_image, model_image) pair such as PicameraSource.read().
+    stages is a list of (name, fn) pairs; fn takes a FramePacket and returns
+    it (or None to discard the frame). on_drop is called with every packet
+    that won't reach the sink (dropped by a queue, discarded or failed in a
+    stage), e.g. to hand its buffers back.
+    """
+
+    def __init__(self, source, stages, queue_size=2, drop_policy=DROP_OLDEST, metrics=None,
+                 on_drop=None):
+        self.source = source
+        self.metrics = metrics
+        self.on_drop = on_drop
+        self.stages = list(stages)
+        self.queues = [StageQueue(name, queue_size, drop_policy, on_drop)
+                       for name, _ in self.stages]
+        self.output = StageQueue("render", queue_size, drop_policy, on_drop)
+        self.captured = 0
+        self.errors = 0
+        self._stop_event = threading.Event()
+        self._threads = []
+
+    @property
+    def dropped(self):
+        """Frames dropped across all queues"""
+        return sum(q.dropped for q in self.queues) + self.output.dropped
+
+    def start(self):
+        """Start the capture and stage worker threads"""
+        self._stop_event.clear()
+        self._threads = [threading.Thread(target=self._capture_loop,
+                                          name="capture", daemon=True)]
+        downstream = self.queues[1:] + [self.output]
+        for (name, fn), inbox, outbox in zip(self.stages, self.queues, downstream):
+            self._threads.append(threading.Thread(
+                target=self._stage_loop, args=(name, fn, inbox, outbox),
+                name=name, daemon=True
+            ))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=2.0):
+        """Ask every worker to finish and wait for them"""
+        self._stop_event.set()
+        for q in self.queues:
+            q.put_stop()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def get(self, timeout=None):
+        """Next finished packet, or None once the stream has ended"""
+        packet = self.output.get(timeout=timeout)
+        return None if packet is _STOP else packet
+
+    def run(self, sink):
+        """Start the pipeline and feed finished packets to sink
+
+        Runs on the calling thread (display APIs such as cv2.imshow must
+        stay on the main thread). sink returns False to stop.
+        """
+        self.start()
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    packet = self.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if packet is None:
+                    break
+                started = time.perf_counter()
+                keep_going = sink(packet)
+                if self.metrics is not None:
+                    self.metrics.stage("render").since(started)
+                    self.metrics.stage("latency").observe(time.monotonic() - packet.captured_at)
+                if keep_going is False:
+                    break
+        finally:
+            self.stop()
+
+    def _capture_loop(self):
+        first = self.queues[0] if self.queues else self.output
+        while not self._stop_event.is_set():
+            started = time.perf_counter()
+            try:
+                image = self.source()
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️  Capture failed: {e}")
+                time.sleep(0.1)
+                continue
+            if image is None:
+                break
+            if self.metrics is not None:
+                self.metrics.stage("capture").since(started)
+            model_image = None
+            if isinstance(image, tuple):
+                image, model_image = image
+            first.put(FramePacket(self.captured, image, model_image))
+            self.captured += 1
+        first.put_stop()
+
+    def _stage_loop(self, name, fn, inbox, outbox):
+        while True:
+            packet = inbox.get()
+            if packet is _STOP:
+                outbox.put_stop()
+                return
+            try:
+                result = fn(packet)
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️  Stage '{name}' failed: {e}")
+                result = None
+            if result is not None:
+                outbox.put(result)
+            elif self.on_drop is not None:
+                self.on_drop(packet)
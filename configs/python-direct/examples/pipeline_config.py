@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+One declarative config file for a detection node
+
+live_detection.py, simulator_mode.py, detector_service.py and
+benchmark_pipeline.py all take --config FILE. The file extends the
+rpicam-apps post-processing JSON (configs/rpicam/hailo_yolov8_inference.json),
+so one file can drive both deployments. rpicam-apps has no stage called
+"python-direct" and skips it. The Python examples read the rpicam keys
+with the same meaning:
+
+    hailo_yolo_inference.hef_file           model (a missing path falls back
+                                            to a registry lookup by name)
+    hailo_yolo_inference.threshold          confidence threshold
+    hailo_yolo_inference.max_detections
+    hailo_yolo_inference.temporal_filter    tracker settings; a non-empty block
+                                            turns tracking on unless it has
+                                            "enabled": false
+    object_detect_draw_cv.line_thickness    overlay box thickness
+
+rpicam-apps.lores is rpicam's square model-input stream and is not applied:
+the Python examples size lores from the main stream's aspect ratio
+(frame_sources.lores_size_for), and python-direct.lores overrides that.
+
+python-direct.model names the model for files without the rpicam section;
+when both are given they must name the same model (yolov8s and
+/usr/share/hailo-models/yolov8s.hef agree).
+
+Everything else lives under "python-direct": source, resolutions, batch
+size, queue depth, drop policy, worker processes, governor, motion gate,
+sinks, metrics, live control and the benchmark's cases. See SCHEMA and
+configs/python-direct/hailo_yolov8_node.json.
+
+Values become the defaults of the matching command-line options, so flags
+still override the file:
+
+    python3 live_detection.py --config node.json --metrics-port 9100
+
+The whole file is validated before anything starts. Unknown keys (typos),
+wrong types, out-of-range numbers and invalid choices are all reported at
+once. Each program applies the keys it has options for.
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+from tracker import DEFAULT_TEMPORAL_FILTER
+
+PORT = (0, 65535)
+FRACTION = (0.0, 1.0)
+POSITIVE = (1, None)
+NON_NEGATIVE = (0, None)
+
+# Config key -> (option dest, type, range). None as dest marks keys only
+# rpicam-apps reads; they are accepted and validated but not applied.
+SCHEMA = {
+    "rpicam-apps": {
+        "lores": {
+            "width": (None, int, POSITIVE),
+            "height": (None, int, POSITIVE),
+            "format": (None, str, None),
+        },
+    },
+    "hailo_yolo_inference": {
+        "hef_file": ("model", str, None),
+        "hef_file_8L": (None, str, None),
+        "hef_file_8": (None, str, None),
+        "max_detections": ("max_detections", int, POSITIVE),
+        "threshold": ("threshold", float, FRACTION),
+        "temporal_filter": ("tracker_config", dict, None),
+    },
+    "object_detect_draw_cv": {
+        "line_thickness": ("line_thickness", int, POSITIVE),
+        "font_size": (None, float, None),
+    },
+    "python-direct": {
+        "model": ("model", str, None),
+        "source": {
+            "spec": ("source", str, None),
+            "fps": ("source_fps", float, (0.0, None)),
+            "loop": ("loop", bool, None),
+        },
+        "main": {
+            "width": ("main_width", int, POSITIVE),
+            "height": ("main_height", int, POSITIVE),
+        },
+        "lores": {
+            "width": ("lores_width", int, POSITIVE),
+            "height": ("lores_height", int, POSITIVE),
+        },
+        "capture": ("capture", str, None),
+        "batch_size": ("batch_size", int, POSITIVE),
+        "pipeline": {
+            "serial": ("serial", bool, None),
+            "queue_size": ("queue_size", int, POSITIVE),
+            "drop_policy": ("drop_policy", str, None),
+            "processes": ("processes", int, NON_NEGATIVE),
+            "preprocess": ("preprocess", str, None),
+            "infer_every": ("infer_every", int, POSITIVE),
+            "warmup": ("warmup", int, NON_NEGATIVE),
+        },
+        "tracker": {
+            "enabled": ("track", bool, None),
+        },
+        "governor": {
+            "enabled": ("governor", bool, None),
+            "active_fps": ("active_fps", float, (0.0, None)),
+            "idle_fps": ("idle_fps", float, (0.0, None)),
+            "budget": ("budget", float, FRACTION),
+        },
+        "motion": {
+            "enabled": ("motion", bool, None),
+            "roi": ("motion_roi", bool, None),
+            "threshold": ("motion_threshold", int, (0, 255)),
+        },
+        "sinks": {
+            "headless": ("headless", bool, None),
+            "stream_port": ("stream_port", int, PORT),
+            "stream_quality": ("stream_quality", int, (1, 100)),
+            "mp4": ("mp4", str, None),
+            "record": ("record", str, None),
+            "record_dir": ("record_dir", str, None),
+            "pre_roll": ("pre_roll", float, (0.0, None)),
+            "post_roll": ("post_roll", float, (0.0, None)),
+            "events_jsonl": ("events_jsonl", str, None),
+            "events_db": ("events_db", str, None),
+            "mqtt": ("mqtt", str, None),
+            "camera_name": ("camera_name", str, None),
+        },
+        "metrics": {
+            "port": ("metrics_port", int, PORT),
+            "json": ("metrics_json", str, None),
+            "interval": ("metrics_interval", float, (0.0, None)),
+        },
+        "control": {
+            "port": ("control_port", int, PORT),
+            "host": ("control_host", str, None),
+            "file": ("control_file", str, None),
+        },
+        "benchmark": {
+            "stages": ("stages", list, None),
+            "resolutions": ("resolutions", list, None),
+            "detections": ("detections", list, None),
+            "iterations": ("iterations", int, POSITIVE),
+            "warmup_calls": ("warmup_calls", int, NON_NEGATIVE),
+            "quality": ("quality", int, (1, 100)),
+        },
+    },
+}
+
+
+# Element type of the list-valued keys
+ITEM_TYPES = {"stages": str, "resolutions": str, "detections": int}
+
+
+def parse_size(text):
+    """'1280x720' -> (1280, 720)"""
+    try:
+        width, height = (int(v) for v in text.lower().split("x"))
+    except ValueError:
+        raise ValueError(f"Expected WIDTHxHEIGHT, got {text!r}")
+    if width <= 0 or height <= 0:
+        raise ValueError(f"Size must be positive, got {text!r}")
+    return width, height
+
+
+def _type_ok(value, kind):
+    if kind is float:
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if kind is int:
+        return isinstance(value, int) and not isinstance(value, bool)
+    return isinstance(value, kind)
+
+
+def _check(key, value, spec, errors):
+    dest, kind, bounds = spec
+    if not _type_ok(value, kind):
+        errors.append(f"{key}: expected {kind.__name__}, got {json.dumps(value)}")
+        return None
+    item = ITEM_TYPES.get(dest)
+    if kind is list and item and not all(_type_ok(v, item) for v in value):
+        errors.append(f"{key}: expected a list of {item.__name__}")
+        return None
+    if bounds is not None:
+        low, high = bounds
+        if (low is not None and value < low) or (high is not None and value > high):
+            errors.append(f"{key}: {value} is outside {low}..{'' if high is None else high}")
+            return None
+    if dest == "tracker_config":
+        unknown = set(value) - set(DEFAULT_TEMPORAL_FILTER) - {"enabled"}
+        if unknown:
+            errors.append(f"{key}: unknown keys {', '.join(sorted(unknown))}")
+            return None
+        if not isinstance(value.get("enabled", True), bool):
+            errors.append(f"{key}.enabled: expected bool, got {json.dumps(value['enabled'])}")
+            return None
+    return value
+
+
+def _walk(config, schema, prefix, options, errors):
+    for name, value in config.items():
+        key = f"{prefix}{name}"
+        spec = schema.get(name)
+        if spec is None:
+            errors.append(f"{key}: unknown key")
+        elif isinstance(spec, dict):
+            if isinstance(value, dict):
+                _walk(value, spec, f"{key}.", options, errors)
+            else:
+                errors.append(f"{key}: expected an object")
+        elif value is not None:
+            checked = _check(key, value, spec, errors)
+            if checked is not None and spec[0] is not None:
+                options[spec[0]] = checked
+
+
+def _pair(options, name, errors):
+    """Fold NAME_width / NAME_height into a NAME_size 'WxH' option"""
+    width, height = options.pop(f"{name}_width", None), options.pop(f"{name}_height", None)
+    if width is None and height is None:
+        return
+    if width is None or height is None:
+        errors.append(f"{name}: needs both width and height")
+        return
+    options[f"{name}_size"] = f"{width}x{height}"
+
+
+def _model_name(value):
+    """'yolov8s', 'yolov8s.hef' and '/path/yolov8s.hef' all name yolov8s"""
+    path = Path(value)
+    return path.stem if path.suffix == ".hef" else path.name
+
+
+def _same_model(config, errors):
+    """hef_file and python-direct.model may not name different models"""
+    sections = [config.get("hailo_yolo_inference"), config.get("python-direct")]
+    if not all(isinstance(section, dict) for section in sections):
+        return
+    hef_file, model = sections[0].get("hef_file"), sections[1].get("model")
+    if not (isinstance(hef_file, str) and isinstance(model, str)):
+        return
+    if _model_name(hef_file) != _model_name(model):
+        errors.append(f"python-direct.model: {model!r} is not the model in "
+                      f"hailo_yolo_inference.hef_file ({hef_file!r})")
+
+
+def _temporal_filter(options):
+    """Split temporal_filter into its tracker settings and the track switch
+
+    An empty block changes nothing; otherwise "enabled" (default true)
+    sets --track, and python-direct.tracker.enabled overrides both.
+    """
+    settings = options.pop("tracker_config", None)
+    if not settings:
+        return
+    settings = dict(settings)
+    enabled = settings.pop("enabled", True)
+    track = options.setdefault("track", enabled)
+    if track and settings:
+        options["tracker_config"] = settings
+
+
+def config_options(config):
+    """Validate a config dict; returns {option dest: value}, raises ValueError"""
+    if not isinstance(config, dict):
+        raise ValueError("Config must be a JSON object")
+    options = {}
+    errors = []
+    # rpicam keys first: python-direct.model, if given, is the value used
+    ordered = sorted(config.items(), key=lambda item: item[0] == "python-direct")
+    _walk(dict(ordered), SCHEMA, "", options, errors)
+    _same_model(config, errors)
+    _pair(options, "main", errors)
+    _pair(options, "lores", errors)
+    _temporal_filter(options)
+    if errors:
+        raise ValueError("\n  ".join(["Invalid config:"] + errors))
+    return options
+
+
+def load_config(path):
+    """Read and validate a config file; returns {option dest: value}"""
+    try:
+        config = json.loads(Path(path).read_text())
+    except OSError as e:
+        raise ValueError(f"Cannot read config {path}: {e}")
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Config {path} is not valid JSON: {e}")
+    return config_options(config)
+
+
+def parse_args(parser, argv=None):
+    """parser.parse_args() with defaults from --config FILE
+
+    Values are also checked with each option's type and choices, so a
+    program rejects what it can't run with (e.g. the simulator's fps must
+    be above 0, while live_detection reads 0 as unpaced). Only keys the
+    parser has options for are applied.
+    """
+    parser.add_argument("--config", type=str, metavar="PATH",
+                       help="Node config JSON, rpicam-apps format plus a python-direct "
+                            "section (see pipeline_config.py); flags override it")
+    known, _ = parser.parse_known_args(argv)
+    if known.config:
+        try:
+            options = load_config(known.config)
+        except ValueError as e:
+            parser.error(str(e))
+        actions = {action.dest: action for action in parser._actions}
+        applied = {}
+        errors = []
+        for dest, value in options.items():
+            action = actions.get(dest)
+            if action is None:
+                continue
+            values = value if isinstance(value, list) else [value]
+            if action.type is not None and not isinstance(value, dict):
+                try:
+                    values = [action.type(v) for v in values]
+                except (ValueError, TypeError, argparse.ArgumentTypeError) as e:
+                    errors.append(f"{action.option_strings[0]}: {e}")
+                    continue
+                value = values if isinstance(value, list) else values[0]
+            invalid = [v for v in values if action.choices and v not in action.choices]
+            if invalid:
+                errors.append(f"{action.option_strings[0]}: {', '.join(map(str, invalid))} "
+                              f"not one of {', '.join(map(str, action.choices))}")
+                continue
+            applied[dest] = value
+        if errors:
+            parser.error("\n  ".join(["Invalid config:"] + errors))
+        parser.set_defaults(**applied)
+        print(f"📄 Config {known.config}: {len(applied)} settings")
+    return parser.parse_args(argv)
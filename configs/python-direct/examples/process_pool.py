@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+CPU stages in worker processes, with frames in shared memory
+
+Threads overlap camera I/O with device time, but preprocess, postprocess
+and overlay drawing all need the GIL, so on a 4-core Pi 5 they end up
+sharing one core. In process mode the main process keeps the camera and
+the Hailo device, and those three stages run in a small pool of worker
+processes:
+
+    pool = ProcessPool(detector, processes=3)
+    source = pool.source(camera.read)       # sizes the ring from the first frame
+    stages = detector_stages(pool, tracker) + [("draw", pool.draw)]
+    FramePipeline(source, stages, on_drop=pool.release).run(sink)
+    ...                                     # sink calls pool.finish(packet),
+    pool.close()                            # then pool.release(packet)
+
+ProcessPool has the detector interface (preprocess, infer, postprocess),
+so detector_stages() and what it supports (tracker, governor, motion gate)
+work unchanged.
+
+Stage threads don't wait for their workers where nothing downstream needs
+the result yet. preprocess() and draw() only submit the task and keep its
+future with the frame's slot; infer() and finish() wait for it. Every frame
+queued between stages can then be preprocessed or drawn in parallel, so
+more workers than stages stay busy. postprocess() waits, since the
+tracker and governor read the detections right away. Releasing a frame
+that was dropped cancels its pending task; a task already running keeps
+its slot until it finishes.
+
+Frames, model inputs and output tensors live in a FrameRing of
+preallocated multiprocessing.shared_memory slots. A capture is copied
+into a free slot once. A worker letterboxes it into the slot's input, the
+device reads that input in place, its output is stored in the same slot
+for postprocess, and the overlays are drawn into the frame in place. Only
+slot numbers, letterbox metadata and detection dicts cross the process
+boundary; no image or tensor is pickled. The slot goes back to the ring
+once the frame is rendered or dropped.
+
+Each camera gets its own pool. Workers are started with "spawn", since
+forking a process that already runs capture and server threads is unsafe.
+"""
+
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from live_detection import HailoDetector, overlay_renderer, pack_nms_output
+
+
+class FrameRing:
+    """Preallocated shared-memory slots, each holding one array per field
+
+    fields maps a name to (shape, dtype). The process that creates the ring
+    owns the memory and hands out free slots; worker processes attach() by
+    spec() and only use views.
+    """
+
+    def __init__(self, slots, fields, blocks=None):
+        self.slots = slots
+        self.fields = {name: (tuple(shape), np.dtype(dtype).str)
+                       for name, (shape, dtype) in fields.items()}
+        self.owner = blocks is None
+        self._blocks = {}
+        self._arrays = {}
+        for name, (shape, dtype) in self.fields.items():
+            size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize * slots, 1)
+            if self.owner:
+                block = shared_memory.SharedMemory(create=True, size=size)
+            else:
+                block = shared_memory.SharedMemory(name=blocks[name])
+            self._blocks[name] = block
+            self._arrays[name] = np.ndarray((slots,) + shape, dtype=dtype, buffer=block.buf)
+        self._free = queue.Queue()
+        if self.owner:
+            for slot in range(slots):
+                self._free.put(slot)
+
+    @classmethod
+    def attach(cls, spec):
+        """Map a ring created in another process"""
+        return cls(spec['slots'], spec['fields'], spec['blocks'])
+
+    def spec(self):
+        """Picklable description for attach()"""
+        return {'slots': self.slots, 'fields': self.fields,
+                'blocks': {name: block.name for name, block in self._blocks.items()}}
+
+    def view(self, name, slot):
+        return self._arrays[name][slot]
+
+    def locate(self, array):
+        """(slot, field) of a view into the ring (or a crop of one), else None"""
+        address = array.__array_interface__['data'][0]
+        for name, arrays in self._arrays.items():
+            start = arrays.__array_interface__['data'][0]
+            if start <= address < start + arrays.nbytes:
+                return (address - start) // arrays[0].nbytes, name
+        return None
+
+    def acquire(self, timeout=None):
+        """A free slot, or None if none frees up within timeout"""
+        try:
+            return self._free.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def release(self, slot):
+        self._free.put(slot)
+
+    @property
+    def free(self):
+        return self._free.qsize()
+
+    def close(self):
+        self._arrays = {}
+        for block in self._blocks.values():
+            try:
+                block.close()
+            except BufferError:
+                # A queued frame still holds a view; the mapping goes with the process
+                pass
+            if self.owner:
+                block.unlink()
+        self._blocks = {}
+
+
+# Per worker process, set up by _init_worker
+_ring = None
+_detector = None
+_filters = None
+
+
+def _init_worker(ring_spec, detector_config, box_thickness):
+    global _ring, _detector, _filters
+    # Ctrl+C reaches the whole process group; the main process handles it
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _ring = FrameRing.attach(ring_spec)
+    _detector = HailoDetector(**detector_config, host_only=True)
+    _filters = _detector.filter_settings()
+    overlay_renderer.box_thickness = box_thickness
+
+
+def _ready():
+    return True
+
+
+def _preprocess_task(slot, field, display_shape, roi):
+    _, meta = _detector.preprocess(_ring.view(field, slot), display_shape=display_shape,
+                                   out=_ring.view('input', slot), roi=roi)
+    return meta
+
+
+def _postprocess_task(slot, meta, filters):
+    global _filters
+    if filters != _filters:
+        # Changed in the main process, e.g. through control.py
+        _detector.set_filter(**filters, all_classes=filters['classes'] is None)
+        _filters = filters
+    return _detector.postprocess(_ring.view('output', slot)[None], meta)
+
+
+def _draw_task(slot, detections):
+    overlay_renderer.draw(_ring.view('image', slot), detections)
+
+
+class ProcessPool:
+    """Runs a detector's CPU stages in worker processes
+
+    Has the HailoDetector interface for detector_stages(). infer() runs in
+    this process, on the detector's device; other attributes (thresholds,
+    input size, ...) are the detector's.
+    """
+
+    def __init__(self, detector, processes=3, slots=16, start_method="spawn"):
+        if detector.batch_size != 1:
+            raise ValueError("Process mode sends one frame per inference (batch_size=1)")
+        self.detector = detector
+        self.processes = max(1, processes)
+        self.slots = slots
+        self.start_method = start_method
+        self.metrics = detector.metrics
+        self.ring = None
+        self._executor = None
+        self._in_use = set()
+        # Slot -> future of the task still working on it (preprocess or draw)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._infer_lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.detector, name)
+
+    def start(self, image_shape, model_image_shape=None, dtype=np.uint8):
+        """Create the ring for frames of these shapes and start the workers"""
+        detector = self.detector
+        height, width = detector.input_height, detector.input_width
+        if detector.preprocess_mode == "letterbox":
+            input_field = ((1, height, width, 3), np.uint8)
+        else:
+            input_field = ((1, 3, height, width), np.float32)
+        output_shape = detector.output_shape
+        if detector.nms_output and detector.nms_output.get('max_boxes'):
+            # Stored in the fixed TF NMS layout, whichever form HailoRT returns
+            output_shape = (detector.nms_output['classes'], 5, detector.nms_output['max_boxes'])
+        fields = {'image': (image_shape, dtype), 'input': input_field,
+                  'output': (output_shape, np.float32)}
+        if model_image_shape is not None:
+            fields['model_image'] = (model_image_shape, dtype)
+        self.ring = FrameRing(self.slots, fields)
+
+        started = time.perf_counter()
+        self._executor = ProcessPoolExecutor(
+            self.processes, mp_context=multiprocessing.get_context(self.start_method),
+            initializer=_init_worker,
+            initargs=(self.ring.spec(), detector.host_config(), overlay_renderer.box_thickness))
+        # Start the workers now rather than on the first frames
+        for future in [self._executor.submit(_ready) for _ in range(self.processes)]:
+            future.result()
+        print(f"⚙️  {self.processes} worker processes ready "
+              f"({time.perf_counter() - started:.1f}s, {self.slots} shared frame slots)")
+
+    def source(self, read):
+        """Wrap a camera read() so every capture is copied into a free slot
+
+        Reads the first frame right away to size the ring, then starts the
+        workers.
+        """
+        first = read()
+        if first is None:
+            return lambda: None
+        image, model_image = self._split(first)
+        self.start(image.shape, None if model_image is None else model_image.shape, image.dtype)
+        pending = [first]
+
+        def read_into_ring():
+            captured = pending.pop() if pending else read()
+            if captured is None:
+                return None
+            return self._store(captured)
+        return read_into_ring
+
+    @staticmethod
+    def _split(captured):
+        image, model_image = captured if isinstance(captured, tuple) else (captured, None)
+        if model_image is image:
+            model_image = None
+        return image, model_image
+
+    def _store(self, captured):
+        image, model_image = self._split(captured)
+        slot = self.ring.acquire(timeout=1.0)
+        if slot is None:
+            raise RuntimeError("No free frame slot (are rendered frames released?)")
+        try:
+            target = self.ring.view('image', slot)
+            target[...] = image
+            if 'model_image' not in self.ring.fields:
+                result = target
+            else:
+                model_target = self.ring.view('model_image', slot)
+                model_target[...] = model_image
+                result = (target, model_target)
+        except Exception:
+            self.ring.release(slot)
+            raise
+        with self._lock:
+            self._in_use.add(slot)
+        return result
+
+    def _locate(self, array):
+        located = self.ring.locate(array) if self.ring is not None else None
+        if located is None:
+            raise ValueError("Frame is not in the shared ring; "
+                             "read it through ProcessPool.source()")
+        return located
+
+    def _submit(self, slot, stage, task, *args):
+        """Run task in a worker without waiting; the future is kept with the slot"""
+        started = time.perf_counter()
+        future = self._executor.submit(task, *args)
+        if self.metrics is not None:
+            # Time until done, including the wait for a free worker
+            future.add_done_callback(lambda _: self.metrics.stage(stage).since(started))
+        with self._lock:
+            self._pending[slot] = future
+        return future
+
+    def _wait(self, slot):
+        """Result of the slot's pending task, if any"""
+        with self._lock:
+            future = self._pending.pop(slot, None)
+        return None if future is None else future.result()
+
+    def preprocess(self, image, display_shape=None, roi=None):
+        """Submit the letterbox; infer() waits for it"""
+        slot, field = self._locate(image)
+        future = self._submit(slot, "preprocess", _preprocess_task, slot, field,
+                              display_shape, roi)
+        return self.ring.view('input', slot), {'slot': slot, 'pending': future}
+
+    def infer(self, input_data):
+        """Run the device on a slot's input and store the output in the same slot"""
+        slot, _ = self._locate(input_data)
+        # The frame's preprocess task must have filled the input
+        self._wait(slot)
+        with self._infer_lock:
+            outputs = self.detector.infer(input_data)
+        output = outputs[self.detector.output_name]
+        target = self.ring.view('output', slot)
+        if isinstance(output, (list, tuple)):
+            # NMS by class: ragged per-class lists for each frame
+            target[...] = pack_nms_output(output[0], target.shape[-1])
+        else:
+            target[...] = np.asarray(output).reshape(target.shape)
+        return {self.detector.output_name: target}
+
+    def postprocess(self, outputs, meta):
+        started = time.perf_counter()
+        slot = meta['slot']
+        # Done by now: infer() waited for it
+        meta = dict(meta['pending'].result(), slot=slot)
+        detections = self._executor.submit(
+            _postprocess_task, slot, meta, self.detector.filter_settings()).result()
+        if self.metrics is not None:
+            self.metrics.stage("postprocess").since(started)
+        return detections
+
+    def draw(self, packet):
+        """Pipeline stage submitting the overlays for the frame's slot; see finish()"""
+        slot, _ = self._locate(packet.image)
+        self._submit(slot, "draw", _draw_task, slot, packet.detections)
+        return packet
+
+    def finish(self, packet):
+        """Wait until the frame's overlays are drawn; False if drawing failed"""
+        slot, _ = self._locate(packet.image)
+        try:
+            self._wait(slot)
+        except Exception as e:
+            print(f"⚠️  Stage 'draw' failed: {e}")
+            return False
+        return True
+
+    def release(self, packet):
+        """Give a frame's slot back once it is rendered (or dropped)
+
+        A task still pending on the slot is cancelled; one already running
+        keeps the slot until it is done.
+        """
+        located = self.ring.locate(packet.image) if self.ring is not None else None
+        if located is None:
+            return
+        slot = located[0]
+        with self._lock:
+            if slot not in self._in_use:
+                return
+            self._in_use.discard(slot)
+            future = self._pending.pop(slot, None)
+        if future is None or future.done() or future.cancel():
+            self.ring.release(slot)
+        else:
+            ring = self.ring
+            future.add_done_callback(lambda _: ring.release(slot))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Event-triggered recording with pre-roll
+
+Instead of recording around the clock (configs/rpicam/examples/
+record_with_detection.sh), EventRecorder keeps the last pre_roll seconds of
+encoded JPEG frames in a fixed-size, preallocated ring buffer and only
+touches the disk when a configured class is detected. The clip then holds
+the lead-up to the event, the event itself, and post_roll seconds after the
+last matching detection. A new detection inside the post-roll extends the
+same clip instead of starting another.
+
+    stream = JpegStream().start()
+    recorder = EventRecorder(classes=["person"], pre_roll=5, post_roll=5)
+    recorder.start(stream)                  # frames arrive as they're encoded
+    ...
+    recorder.update(detections)             # once per rendered frame
+
+Clips are written as MJPEG (one JPEG after another) by a writer thread,
+with a JSON sidecar holding the timing and what triggered them:
+
+    ffmpeg -framerate 30 -i event.mjpeg -c:v libx264 event.mp4
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from pipeline import StageQueue, DROP_OLDEST, _STOP
+
+
+class FrameRing:
+    """Preallocated circular store of variable-size encoded frames"""
+
+    def __init__(self, capacity_bytes, max_frames):
+        self.capacity = int(capacity_bytes)
+        self.max_frames = int(max_frames)
+        self._data = np.empty(self.capacity, dtype=np.uint8)
+        self._offsets = np.zeros(self.max_frames, dtype=np.int64)
+        self._lengths = np.zeros(self.max_frames, dtype=np.int64)
+        self._times = np.zeros(self.max_frames, dtype=np.float64)
+        self._start = 0       # slot of the oldest frame
+        self._count = 0
+        self._write_pos = 0   # next byte to write
+        self.oversize = 0
+
+    def __len__(self):
+        return self._count
+
+    def clear(self):
+        self._start = self._count = self._write_pos = 0
+
+    def _evict_oldest(self):
+        self._start = (self._start + 1) % self.max_frames
+        self._count -= 1
+
+    def _oldest_overlaps(self, begin, end):
+        offset = self._offsets[self._start]
+        return offset < end and begin < offset + self._lengths[self._start]
+
+    def append(self, frame, timestamp, max_age=None):
+        """Store one encoded frame, evicting the oldest to make room"""
+        size = len(frame)
+        if size > self.capacity:
+            self.oversize += 1
+            return False
+        if max_age is not None:
+            while self._count and self._times[self._start] < timestamp - max_age:
+                self._evict_oldest()
+
+        begin = self._write_pos
+        if begin + size > self.capacity:
+            # Wrap: frames left in the tail are the oldest and go first
+            while self._count and self._offsets[self._start] >= begin:
+                self._evict_oldest()
+            begin = 0
+        end = begin + size
+        # Frames are laid out oldest-first from the write position onwards,
+        # so only the oldest can be in the way
+        while self._count and (self._count == self.max_frames or
+                               self._oldest_overlaps(begin, end)):
+            self._evict_oldest()
+
+        self._data[begin:end] = np.frombuffer(frame, dtype=np.uint8)
+        slot = (self._start + self._count) % self.max_frames
+        self._offsets[slot] = begin
+        self._lengths[slot] = size
+        self._times[slot] = timestamp
+        self._count += 1
+        self._write_pos = end
+        return True
+
+    def frames(self):
+        """Copy out every stored frame, oldest first: [(timestamp, bytes)]"""
+        out = []
+        for i in range(self._count):
+            slot = (self._start + i) % self.max_frames
+            offset, length = self._offsets[slot], self._lengths[slot]
+            out.append((float(self._times[slot]), self._data[offset:offset + length].tobytes()))
+        return out
+
+
+class EventRecorder:
+    """Writes pre-roll + event + post-roll clips when chosen classes appear"""
+
+    def __init__(self, classes=("person",), pre_roll=5.0, post_roll=5.0,
+                 output_dir="recordings", min_confidence=0.5, max_clip_seconds=300.0,
+                 buffer_mb=48, max_fps=60):
+        self.classes = set(classes)
+        self.pre_roll = pre_roll
+        self.post_roll = post_roll
+        self.output_dir = Path(output_dir)
+        self.min_confidence = min_confidence
+        self.max_clip_seconds = max_clip_seconds
+        self.ring = FrameRing(buffer_mb * 1024 * 1024, int(pre_roll * max_fps) + 1)
+        # A stalled disk drops the oldest queued frames rather than blocking
+        # the encoder thread that feeds add_frame
+        self.writer_queue = StageQueue("recorder", 1024, DROP_OLDEST, on_drop=self._dropped)
+        self.clips = 0
+        self.dropped = 0           # frames lost to a writer that fell behind
+        self._lock = threading.Lock()
+        # Writer work is decided under _lock but queued outside it, in order,
+        # so a slow disk never blocks add_frame/update while holding the lock
+        self._outbox = deque()
+        self._flush_lock = threading.Lock()
+        self._clip = None          # metadata of the clip being recorded
+        self._last_trigger = None
+        self._stream = None
+        self._thread = None
+
+    @property
+    def recording(self):
+        return self._clip is not None
+
+    def start(self, stream=None):
+        """Start the writer thread and, given a JpegStream, subscribe to it"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._writer, name="recorder", daemon=True)
+        self._thread.start()
+        if stream is not None:
+            self._stream = stream
+            stream.add_listener(self.add_frame)
+        return self
+
+    def stop(self, timeout=5.0):
+        """Finish any open clip and flush it to disk"""
+        if self._stream is not None:
+            self._stream.remove_listener(self.add_frame)
+            self._stream = None
+        with self._lock:
+            self._close_clip(time.time())
+        self._flush(wait=True)
+        self.writer_queue.put_stop()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def add_frame(self, jpeg, timestamp=None):
+        """Feed one encoded frame (e.g. as a JpegStream listener)"""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            self.ring.append(jpeg, timestamp, max_age=self.pre_roll)
+            if self._clip is not None:
+                self._clip['frames'] += 1
+                self._clip['end'] = timestamp
+                self._outbox.append(("frames", (self._clip['path'], [jpeg])))
+        self._flush()
+
+    def update(self, detections, now=None):
+        """Check one frame's detections; opens, extends or closes clips"""
+        now = time.time() if now is None else now
+        labels = sorted({d['class_name'] for d in detections
+                         if d['class_name'] in self.classes
+                         and d['confidence'] >= self.min_confidence})
+        with self._lock:
+            if labels:
+                self._last_trigger = now
+                if self._clip is not None and now - self._clip['start'] > self.max_clip_seconds:
+                    # Split very long events; the next clip starts from live frames
+                    self._close_clip(now)
+                    self._open_clip(now, labels, pre_roll=False)
+                elif self._clip is None:
+                    self._open_clip(now, labels)
+                else:
+                    self._clip['labels'] = sorted(set(self._clip['labels']) | set(labels))
+            elif self._clip is not None and now - self._last_trigger > self.post_roll:
+                self._close_clip(now)
+        self._flush()
+
+    def _flush(self, wait=False):
+        """Hand queued work to the writer; one thread at a time keeps it in order"""
+        while self._outbox:
+            if not self._flush_lock.acquire(blocking=wait):
+                return    # the thread holding it drains what we added
+            try:
+                while self._outbox:
+                    self.writer_queue.put(self._outbox.popleft())
+            finally:
+                self._flush_lock.release()
+
+    def _open_clip(self, now, labels, pre_roll=True):
+        name = f"event_{datetime.fromtimestamp(now).strftime('%Y%m%d_%H%M%S')}_{'-'.join(labels)}"
+        path = self.output_dir / f"{name}.mjpeg"
+        buffered = self.ring.frames() if pre_roll else []
+        start = buffered[0][0] if buffered else now
+        self._clip = {'path': str(path), 'labels': list(labels), 'triggered': now,
+                      'start': start, 'end': start, 'frames': len(buffered),
+                      'pre_roll_frames': len(buffered)}
+        if buffered:
+            self._outbox.append(("frames", (str(path), [jpeg for _, jpeg in buffered])))
+        print(f"🔴 Recording {path.name} ({len(buffered)} pre-roll frames)")
+
+    def _close_clip(self, now):
+        clip, self._clip = self._clip, None
+        if clip is None:
+            return
+        duration = clip['end'] - clip['start']
+        clip['duration'] = duration
+        clip['fps'] = (clip['frames'] - 1) / duration if duration > 0 else 0.0
+        self._outbox.append(("close", clip))
+        self.clips += 1
+        print(f"⏹️  Saved {Path(clip['path']).name} ({clip['frames']} frames, {duration:.1f}s)")
+
+    def _dropped(self, item):
+        kind, payload = item
+        if kind == "frames":
+            self.dropped += len(payload[1])
+
+    def _writer(self):
+        """Disk I/O happens here, never on the encoder or render thread"""
+        output = current = None
+        while True:
+            item = self.writer_queue.get()
+            if item is _STOP:
+                if output:
+                    output.close()
+                return
+            kind, payload = item
+            try:
+                if kind == "frames":
+                    path, frames = payload
+                    if path != current:
+                        # Clips open on their first frames, so a dropped close
+                        # can't make the next clip append to the previous file
+                        if output:
+                            output.close()
+                            output = None
+                        output, current = open(path, "wb"), path
+                    for jpeg in frames:
+                        output.write(jpeg)
+                elif kind == "close":
+                    if output and current == payload['path']:
+                        output.close()
+                        output = current = None
+                    sidecar = Path(payload['path']).with_suffix(".json")
+                    sidecar.write_text(json.dumps(payload, indent=2))
+            except OSError as e:
+                print(f"⚠️  Recording write failed: {e}")
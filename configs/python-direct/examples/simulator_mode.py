@@ -10,14 +10,20 @@ This script demonstrates camera capture and image processing without
 requiring HailoRT Python bindings. Useful for testing camera functionality.
 """
 
-import sys
+import argparse
 import time
-import numpy as np
 from pathlib import Path
-from picamera2 import Picamera2
-from PIL import Image, ImageDraw, ImageFont
-from threading import Thread, Lock
-import queue
+from threading import Thread
+
+from frame_sources import open_source, SOURCE_HELP
+from governor import InferenceGovernor
+from overlay import OverlayRenderer
+import pipeline_config
+from pipeline_config import parse_size
+from streaming import JpegStream, MjpegServer
+
+BOLD_FONT = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+
 
 # SIMULATOR: No actual Hailo detection
 class HailoYOLOv8Simulator:
@@ -46,53 +52,56 @@ class HailoYOLOv8Simulator:
         """
         return []  # No detections in simulator mode
 
+
 class CameraPreviewNoCv:
     """Camera preview without OpenCV dependency"""
     
-    def __init__(self, model_path=None, save_interval=30):
+    def __init__(self, model_path=None, save_interval=30, max_fps=30.0, governor=None,
+                 stream_port=0, source="picamera", main_size=(1920, 1080)):
         self.model_path = model_path
+        self.source = source
+        self.main_size = main_size
         self.save_interval = save_interval  # Save frame every N frames
+        self.max_fps = max_fps
+        self.governor = governor  # Decides which frames run detection
         self.detector = HailoYOLOv8Simulator(model_path) if model_path else None
         self.frame_count = 0
         self.running = False
+        # Font loaded once; glyphs cached across frames
+        self.renderer = OverlayRenderer(font_path=BOLD_FONT, font_size=20)
+        # JPEG encoding and file writes happen on the stream's worker thread
+        self.stream = JpegStream(quality=85)
+        self.stream_port = stream_port
+        self.server = None
         
-    def draw_text_pil(self, img, text, position, color=(0, 255, 0)):
-        """Draw text on PIL image"""
-        draw = ImageDraw.Draw(img)
-        # Try to use a better font if available
-        try:
-            font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 20)
-        except:
-            font = ImageFont.load_default()
-        draw.text(position, text, fill=color, font=font)
-        return img
+    def draw_text(self, frame, text, position, color=(0, 255, 0)):
+        """Draw text into the frame from cached glyphs"""
+        self.renderer.text(frame, text, position, color)
+        return frame
     
-    def draw_box_pil(self, img, bbox, label, color=(0, 255, 0)):
-        """Draw bounding box on PIL image"""
-        draw = ImageDraw.Draw(img)
+    def draw_box(self, frame, bbox, label, color=(0, 255, 0)):
+        """Draw bounding box into the frame"""
         x1, y1, x2, y2 = bbox
-        draw.rectangle([x1, y1, x2, y2], outline=color, width=2)
-        self.draw_text_pil(img, label, (x1, y1-25), color)
-        return img
+        self.renderer.box(frame, bbox, color)
+        self.draw_text(frame, label, (x1, y1-25), color)
+        return frame
     
     def process_frame(self, frame_array):
-        """Process a frame and add overlays"""
-        # Convert to PIL
-        img = Image.fromarray(frame_array)
-        
+        """Process a frame and add overlays (in place)"""
         # Add timestamp and info
         timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
         info_text = f"Hailo-8 Preview | Frame: {self.frame_count} | {timestamp}"
-        img = self.draw_text_pil(img, info_text, (10, 10))
+        self.draw_text(frame_array, info_text, (10, 10))
         
-        # Run detection if available
-        if self.detector:
+        # Run detection if available (and the governor wants this frame)
+        if self.detector and (self.governor is None or self.governor.should_infer()):
+            started = time.monotonic()
             detections = self.detector.detect(frame_array)
-            for det in detections:
-                # Draw detection boxes
-                pass  # Implementation would draw boxes here
+            if self.governor:
+                self.governor.record(time.monotonic() - started, len(detections))
+            self.renderer.draw(frame_array, detections, header=False)
         
-        return img
+        return frame_array
     
     def run(self):
         """Main preview loop"""
@@ -102,20 +111,18 @@ class CameraPreviewNoCv:
         print("═" * 60)
         
         try:
-            # Initialize camera
-            picam2 = Picamera2()
-            
-            # Configure
-            config = picam2.create_preview_configuration(
-                main={"size": (1920, 1080), "format": "RGB888"},
-                lores={"size": (640, 640), "format": "RGB888"}
-            )
-            picam2.configure(config)
+            # Initialize camera (or a recording / synthetic source)
+            camera = open_source(self.source, main_size=self.main_size,
+                                 use_lores=False)
             
             # Start camera
-            picam2.start()
+            camera.start()
             print("✓ Camera started")
-            print(f"✓ Resolution: 1920x1080")
+            self.stream.start()
+            if self.stream_port:
+                self.server = MjpegServer(self.stream, port=self.stream_port).start()
+                print(f"✓ Streaming MJPEG at http://0.0.0.0:{self.server.port}/")
+            print(f"✓ Resolution: {self.main_size[0]}x{self.main_size[1]}")
             if self.model_path:
                 print(f"✓ Hailo model: {self.model_path.name}")
             print("\nCapturing frames... (Ctrl+C to stop)")
@@ -127,8 +134,13 @@ class CameraPreviewNoCv:
             
             while self.running:
                 try:
+                    frame_started = time.monotonic()
+                    
                     # Capture frame
-                    frame = picam2.capture_array("main")
+                    captured = camera.read()
+                    if captured is None:
+                        break
+                    frame = captured[0]
                     self.frame_count += 1
                     
                     # Process frame
@@ -139,21 +151,29 @@ class CameraPreviewNoCv:
                     fps = self.frame_count / elapsed if elapsed > 0 else 0
                     
                     # Add FPS to image
-                    img = self.draw_text_pil(img, f"FPS: {fps:.1f}", (10, 40), (255, 255, 0))
+                    self.draw_text(img, f"FPS: {fps:.1f}", (10, 40), (255, 255, 0))
                     
                     # Save periodically or on specific frames
+                    save_as = []
+                    message = None
                     if self.frame_count % self.save_interval == 0:
                         filename = f"preview_frame_{self.frame_count:06d}.jpg"
-                        img.save(filename, quality=85)
-                        print(f"Saved: {filename} (FPS: {fps:.1f})")
+                        save_as.append(filename)
+                        message = f"Saved: {filename} (FPS: {fps:.1f})"
                     
                     # Also save latest frame
                     if time.time() - last_save_time > 2:  # Every 2 seconds
-                        img.save("latest_preview.jpg", quality=85)
+                        save_as.append("latest_preview.jpg")
                         last_save_time = time.time()
                     
-                    # Small delay to control frame rate
-                    time.sleep(0.03)  # ~30 FPS max
+                    # Encoded and written off this thread (message printed once
+                    # written); also feeds the MJPEG stream
+                    self.stream.submit(img, save_as=save_as, message=message)
+                    
+                    # Pace to max_fps, accounting for time already spent on this frame
+                    remaining = 1.0 / self.max_fps - (time.monotonic() - frame_started)
+                    if remaining > 0:
+                        time.sleep(remaining)
                     
                 except KeyboardInterrupt:
                     break
@@ -177,15 +197,24 @@ class CameraPreviewNoCv:
             print(f"Error: {e}")
             
         finally:
-            if 'picam2' in locals():
-                picam2.stop()
-                picam2.close()
+            if 'camera' in locals():
+                camera.stop()
+            if self.server:
+                self.server.stop()
+            self.stream.stop()
             print("\n✓ Preview stopped")
 
+
+def positive_float(text):
+    """argparse type for rates: a float above 0"""
+    value = float(text)
+    if not value > 0:
+        raise argparse.ArgumentTypeError(f"must be greater than 0, got {text}")
+    return value
+
+
 def main():
     """Main entry point"""
-    import argparse
-    
     parser = argparse.ArgumentParser(description="Hailo Camera Preview without OpenCV")
     parser.add_argument("--model", type=str, 
                        help="Path to HEF model (optional)")
@@ -193,8 +222,18 @@ def main():
                        help="Save frame every N frames (default: 30)")
     parser.add_argument("--duration", type=int, default=0,
                        help="Run for N seconds (0=infinite)")
+    parser.add_argument("--fps", dest="source_fps", type=positive_float, default=30.0,
+                       help="Maximum capture rate (default: 30)")
+    parser.add_argument("--idle-fps", type=positive_float, default=2.0,
+                       help="Detection rate when the scene is empty (default: 2)")
+    parser.add_argument("--stream-port", type=int, default=0,
+                       help="Serve an MJPEG stream on this port, e.g. 8080 (default: off)")
+    parser.add_argument("--source", type=str, default="picamera",
+                       help=f"Frame source: {SOURCE_HELP} (default: picamera)")
+    parser.add_argument("--main-size", type=parse_size, default="1920x1080", metavar="WxH",
+                       help="Capture size (default: 1920x1080)")
     
-    args = parser.parse_args()
+    args = pipeline_config.parse_args(parser)
     
     # Check model if provided
     if args.model:
@@ -216,7 +255,13 @@ def main():
     # Run preview
     preview = CameraPreviewNoCv(
         model_path=model_path,
-        save_interval=args.save_interval
+        save_interval=args.save_interval,
+        max_fps=args.source_fps,
+        governor=InferenceGovernor(active_fps=args.source_fps,
+                                   idle_fps=min(args.idle_fps, args.source_fps)),
+        stream_port=args.stream_port,
+        source=args.source,
+        main_size=args.main_size
     )
     
     if args.duration > 0:
@@ -226,5 +271,6 @@ def main():
     
     preview.run()
 
+
 if __name__ == "__main__":
     main()
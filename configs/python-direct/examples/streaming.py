@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Streaming output for headless nodes: MJPEG over HTTP and fragmented MP4
+
+JpegStream encodes rendered frames on its own worker thread. The render
+loop only hands over a reference, and a one-slot queue keeps just the
+newest frame, so a slow encoder drops frames instead of stalling capture or
+inference. Frames to be saved as snapshots are never dropped: they move to
+a separate queue that the worker empties first. Consumers pick up the
+latest encoded frame:
+
+    stream = JpegStream(quality=80)
+    stream.start()
+    MjpegServer(stream, port=8080).start()     # http://<pi>:8080/
+    Mp4Writer("out.mp4").start(stream)         # optional, needs ffmpeg
+    ...
+    stream.submit(frame_with_overlays)
+    stream.submit(frame, save_as="snapshot.jpg",   # written on the worker,
+                  message="📸 Saved snapshot.jpg")  # printed once it is
+
+Every HTTP client gets its own thread and always receives the newest frame.
+A client that cannot keep up skips frames, and one whose socket stays
+blocked past write_timeout is disconnected, so no client can slow the
+pipeline down. Nothing is encoded while nobody is watching.
+
+The Raspberry Pi 5 has no hardware H.264 encoder, so Mp4Writer defaults to
+libx264 (ultrafast, zerolatency) in an ffmpeg subprocess. On a Pi 4,
+codec="h264_v4l2m2m" uses the hardware encoder instead.
+"""
+
+import io
+import shutil
+import socket
+import subprocess
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from pipeline import StageQueue, DROP_OLDEST, BLOCK, _STOP
+
+try:
+    import cv2
+    HAS_CV2 = True
+except ImportError:
+    HAS_CV2 = False
+    from PIL import Image
+
+BOUNDARY = "frame"
+
+# Snapshots waiting for the encoder before submit() blocks
+SNAPSHOT_BACKLOG = 8
+
+INDEX_PAGE = b"""<!DOCTYPE html>
+<html><head><title>Hailo-8 Detection</title></head>
+<body style="margin:0;background:#000">
+<img src="/stream.mjpg" style="width:100%;height:auto">
+</body></html>
+"""
+
+
+class JpegStream:
+    """Encodes the newest submitted frame to JPEG on a worker thread"""
+
+    def __init__(self, quality=80, size=None):
+        self.quality = quality
+        self.size = size            # (w, h) to downscale to before encoding
+        self.queue = StageQueue("encoder", 1, DROP_OLDEST, on_drop=self._keep_snapshot)
+        self._snapshots = StageQueue("snapshots", SNAPSHOT_BACKLOG, BLOCK)
+        self.jpeg = None
+        self.seq = 0
+        self.encoded = 0
+        self.errors = 0
+        self._condition = threading.Condition()
+        self._listeners = []
+        self._waiters = 0
+        self.clients = 0            # streaming HTTP clients (see MjpegServer)
+        self._scaled = None         # reused resize target
+        self._buffer = io.BytesIO()  # reused PIL output buffer
+        self._thread = None
+        self.running = False
+
+    @property
+    def dropped(self):
+        return self.queue.dropped
+
+    @property
+    def has_consumers(self):
+        return bool(self._listeners or self._waiters or self.clients)
+
+    def start(self):
+        self.running = True
+        self._thread = threading.Thread(target=self._worker, name="jpeg-encoder", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        self.running = False
+        self.queue.put_stop()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def add_listener(self, callback):
+        """Call callback(jpeg_bytes) on the encoder thread for every frame
+
+        The callback must not block (queue the bytes, as Mp4Writer does).
+        """
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def submit(self, frame, save_as=None, message=None):
+        """Hand a rendered frame to the encoder
+
+        The frame is not copied, so it must not be drawn on afterwards.
+        With save_as (a path or a list of paths), the encoded frame is also
+        written there, and message is printed once every write succeeded.
+        Only blocks when SNAPSHOT_BACKLOG snapshots are still unwritten.
+        """
+        if not save_as and not self.has_consumers:
+            return
+        self.queue.put((frame, save_as, message))
+
+    def _keep_snapshot(self, item):
+        """A newer frame displaced this one; keep it if it is to be saved"""
+        if item[1]:
+            self._snapshots.put(item)
+
+    def wait(self, last_seq=0, timeout=1.0):
+        """Block until a frame newer than last_seq exists; (seq, jpeg) or None"""
+        with self._condition:
+            self._waiters += 1
+            try:
+                if self.seq <= last_seq:
+                    self._condition.wait(timeout)
+                if self.seq <= last_seq or self.jpeg is None:
+                    return None
+                return self.seq, self.jpeg
+            finally:
+                self._waiters -= 1
+
+    def _scale(self, frame):
+        """Downscale into a reused buffer when size is set"""
+        width, height = self.size
+        if (frame.shape[1], frame.shape[0]) == (width, height):
+            return frame
+        shape = (height, width) + frame.shape[2:]
+        if self._scaled is None or self._scaled.shape != shape:
+            self._scaled = np.empty(shape, dtype=frame.dtype)
+        cv2.resize(frame, (width, height), dst=self._scaled, interpolation=cv2.INTER_AREA)
+        return self._scaled
+
+    def encode(self, frame):
+        """JPEG-encode one frame, downscaling first if size is set"""
+        if HAS_CV2:
+            if self.size is not None:
+                frame = self._scale(frame)
+            ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            if not ok:
+                raise RuntimeError("JPEG encoding failed")
+            return encoded.tobytes()
+
+        image = Image.fromarray(frame[..., :3])
+        if self.size is not None and image.size != tuple(self.size):
+            image = image.resize(tuple(self.size))
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        image.save(self._buffer, format="JPEG", quality=self.quality)
+        return self._buffer.getvalue()
+
+    def _worker(self):
+        while True:
+            item = self.queue.get()
+            # Older frames displaced from the queue still owe their snapshots
+            self._save_displaced()
+            if item is _STOP:
+                return
+            frame, save_as, message = item
+            jpeg = self._encode_or_log(frame)
+            if jpeg is None:
+                continue
+
+            with self._condition:
+                self.jpeg = jpeg
+                self.seq += 1
+                self.encoded += 1
+                self._condition.notify_all()
+            for callback in list(self._listeners):
+                callback(jpeg)
+            self._save(jpeg, save_as, message)
+
+    def _encode_or_log(self, frame):
+        try:
+            return self.encode(frame)
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️  Stream encoding failed: {e}")
+            return None
+
+    def _save_displaced(self):
+        while self._snapshots.qsize():
+            frame, save_as, message = self._snapshots.get()
+            jpeg = self._encode_or_log(frame)
+            if jpeg is not None:
+                self._save(jpeg, save_as, message)
+
+    @staticmethod
+    def _save(jpeg, save_as, message):
+        saved = True
+        for path in [save_as] if isinstance(save_as, str) else save_as or ():
+            try:
+                with open(path, "wb") as f:
+                    f.write(jpeg)
+            except OSError as e:
+                saved = False
+                print(f"⚠️  Could not save {path}: {e}")
+        if save_as and saved and message:
+            print(message)
+
+
+class _MjpegHandler(BaseHTTPRequestHandler):
+    """Serves /, /stream.mjpg and /snapshot.jpg from the server's JpegStream"""
+
+    def do_GET(self):
+        mjpeg = self.server.mjpeg
+        path = self.path.split("?", 1)[0]
+        if path in ("/", "/index.html"):
+            self._send(200, "text/html", INDEX_PAGE)
+        elif path == "/snapshot.jpg":
+            # Prefer a fresh frame; fall back to the last one encoded
+            stream = mjpeg.stream
+            latest = stream.wait(stream.seq, timeout=2.0)
+            jpeg = latest[1] if latest else stream.jpeg
+            if jpeg is None:
+                self._send(503, "text/plain", b"No frame yet\n")
+            else:
+                self._send(200, "image/jpeg", jpeg)
+        elif path == "/stream.mjpg":
+            self._stream(mjpeg)
+        else:
+            self._send(404, "text/plain", b"Not found\n")
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, mjpeg):
+        if not mjpeg.add_client():
+            self._send(503, "text/plain", b"Too many clients\n")
+            return
+        try:
+            # A client that stops reading blocks its own writes; give up on it
+            self.connection.settimeout(mjpeg.write_timeout)
+            self.send_response(200)
+            self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            seq = 0
+            while mjpeg.running:
+                latest = mjpeg.stream.wait(seq, timeout=1.0)
+                if latest is None:
+                    continue
+                # Always the newest frame: a slow client skips, never queues
+                seq, jpeg = latest
+                self.wfile.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                                 f"Content-Length: {len(jpeg)}\r\n\r\n".encode())
+                self.wfile.write(jpeg)
+                self.wfile.write(b"\r\n")
+        except socket.timeout:
+            # Stalled client: drop it rather than hold a frame for it
+            mjpeg.dropped_clients += 1
+        except (ConnectionError, OSError):
+            pass  # Client went away
+        finally:
+            mjpeg.remove_client()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MjpegServer:
+    """Local HTTP server streaming a JpegStream as MJPEG"""
+
+    def __init__(self, stream, host="0.0.0.0", port=8080, max_clients=4,
+                 write_timeout=2.0):
+        self.stream = stream
+        self.host = host
+        self.port = port
+        self.max_clients = max_clients
+        self.write_timeout = write_timeout
+        self.clients = 0
+        self.dropped_clients = 0
+        self.running = False
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    def add_client(self):
+        with self._lock:
+            if self.clients >= self.max_clients:
+                return False
+            self.clients += 1
+            self.stream.clients += 1
+            return True
+
+    def remove_client(self):
+        with self._lock:
+            self.clients -= 1
+            self.stream.clients -= 1
+
+    def start(self):
+        self._httpd = ThreadingHTTPServer((self.host, self.port), _MjpegHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.mjpeg = self
+        self.port = self._httpd.server_address[1]
+        self.running = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever,
+                                        name="mjpeg-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+        if self._thread:
+            self._thread.join(2.0)
+            self._thread = None
+
+
+class Mp4Writer:
+    """Writes a JpegStream to a fragmented MP4 through ffmpeg
+
+    Fragmented MP4 stays playable if the process is killed mid-recording.
+    Frames queue (bounded) in front of ffmpeg; if it falls behind, the
+    oldest are dropped. Timestamps come from the wall clock, so dropped
+    frames don't speed up playback.
+    """
+
+    def __init__(self, path, codec="libx264", queue_size=30, ffmpeg="ffmpeg"):
+        self.path = str(path)
+        self.codec = codec
+        self.ffmpeg = shutil.which(ffmpeg)
+        if self.ffmpeg is None:
+            raise RuntimeError(f"{ffmpeg} not found; install it for MP4 output")
+        self.queue = StageQueue("mp4", queue_size, DROP_OLDEST)
+        self.written = 0
+        self._stream = None
+        self._process = None
+        self._thread = None
+
+    def command(self):
+        command = [self.ffmpeg, "-loglevel", "error", "-y",
+                   "-use_wallclock_as_timestamps", "1",
+                   "-f", "image2pipe", "-c:v", "mjpeg", "-i", "-",
+                   "-c:v", self.codec, "-pix_fmt", "yuv420p"]
+        if self.codec == "libx264":
+            command += ["-preset", "ultrafast", "-tune", "zerolatency"]
+        command += ["-movflags", "frag_keyframe+empty_moov+default_base_moof",
+                    "-f", "mp4", self.path]
+        return command
+
+    def start(self, stream):
+        self._process = subprocess.Popen(self.command(), stdin=subprocess.PIPE)
+        self._stream = stream
+        self._thread = threading.Thread(target=self._feed, name="mp4-writer", daemon=True)
+        self._thread.start()
+        stream.add_listener(self.queue.put)
+        return self
+
+    def _feed(self):
+        while True:
+            jpeg = self.queue.get()
+            if jpeg is _STOP:
+                return
+            try:
+                self._process.stdin.write(jpeg)
+                self.written += 1
+            except (BrokenPipeError, OSError) as e:
+                print(f"⚠️  ffmpeg stopped accepting frames: {e}")
+                return
+
+    def stop(self, timeout=5.0):
+        if self._stream is not None:
+            self._stream.remove_listener(self.queue.put)
+            self._stream = None
+        self.queue.put_stop()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._process is not None:
+            try:
+                self._process.stdin.close()
+                self._process.wait(timeout)
+            except (OSError, subprocess.TimeoutExpired):
+                self._process.kill()
+            self._process = None
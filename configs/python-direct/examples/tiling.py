@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Tiled / region-of-interest inference for high-resolution frames
+
+Letterboxing a whole 1280x720 or 1920x1080 frame into 640x640 shrinks small
+objects below what the model can find. TiledDetector instead cuts the
+full-resolution frame into overlapping tiles the size of the model input
+(or into configured ROIs), letterboxes each one into a row of a single
+[N, H, W, 3] batch, runs one inference call and merges the per-tile
+detections back into frame coordinates with a cross-tile NMS.
+
+    detector = HailoDetector(model_path, batch_size=4)
+    tiled = TiledDetector(detector, overlap=0.2)
+    detections = tiled.detect(frame)          # frame at full resolution
+
+A downscaled pass over the whole frame is included by default so objects
+larger than a tile are still found in one piece. TiledDetector has the same
+preprocess / infer / postprocess interface as HailoDetector, so it drops into
+detector_stages() unchanged. See benchmark_tiling.py for tile count versus
+latency and recall.
+"""
+
+import numpy as np
+
+from live_detection import nms_boxes
+
+
+def _tile_starts(length, tile, overlap):
+    """Evenly spaced tile origins covering length with at least overlap"""
+    if length <= tile:
+        return [0], length
+    step = tile * (1.0 - overlap)
+    count = int(np.ceil((length - tile) / step)) + 1
+    return np.linspace(0, length - tile, count).round().astype(int).tolist(), tile
+
+
+def tile_grid(frame_shape, tile_size=(640, 640), overlap=0.2):
+    """Overlapping (x1, y1, x2, y2) tiles covering a frame of shape (h, w, ...)
+
+    tile_size is (width, height) in frame pixels; adjacent tiles share at
+    least overlap (a fraction of the tile) so an object cut by one tile edge
+    is whole in its neighbour.
+    """
+    if not 0.0 <= overlap < 1.0:
+        raise ValueError(f"overlap must be in [0, 1), got {overlap}")
+    frame_h, frame_w = frame_shape[:2]
+    xs, tile_w = _tile_starts(frame_w, tile_size[0], overlap)
+    ys, tile_h = _tile_starts(frame_h, tile_size[1], overlap)
+    return [(x, y, x + tile_w, y + tile_h) for y in ys for x in xs]
+
+
+def _intersects(a, b):
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+class TiledDetector:
+    """Runs a HailoDetector over tiles or ROIs of a frame as one batch"""
+
+    def __init__(self, detector, tile_size=None, overlap=0.2, rois=None,
+                 full_frame=True, merge_threshold=0.5, merge_metric="ios",
+                 input_buffers=None):
+        if detector.preprocess_mode != "letterbox":
+            raise ValueError("Tiling needs the detector in letterbox mode")
+        self.detector = detector
+        self.tile_size = tile_size or (detector.input_width, detector.input_height)
+        self.overlap = overlap
+        self.rois = [tuple(int(v) for v in roi) for roi in rois] if rois else None
+        self.full_frame = full_frame
+        self.merge_threshold = merge_threshold
+        self.merge_metric = merge_metric
+        self.num_input_buffers = input_buffers or detector.num_input_buffers
+        self._regions = {}   # frame shape -> regions
+        self._buffers = []
+        self._buffer_index = 0
+
+    # The pieces of the HailoDetector interface detector_stages() uses
+    @property
+    def output_name(self):
+        return self.detector.output_name
+
+    @property
+    def input_width(self):
+        return self.detector.input_width
+
+    @property
+    def input_height(self):
+        return self.detector.input_height
+
+    def regions(self, frame_shape, roi=None):
+        """Regions (display pixels) sent to the device for one frame
+
+        With roi (e.g. from the motion gate), only the tiles touching it are
+        used and the coarse pass covers roi instead of the whole frame.
+        """
+        key = tuple(frame_shape[:2])
+        if key not in self._regions:
+            self._regions[key] = self.rois or tile_grid(key, self.tile_size, self.overlap)
+        regions = self._regions[key]
+        frame_h, frame_w = key
+        coarse = (0, 0, frame_w, frame_h)
+        if roi is not None:
+            regions = [region for region in regions if _intersects(region, roi)]
+            coarse = tuple(roi)
+        if self.full_frame and coarse not in regions:
+            regions = regions + [coarse]
+        return regions
+
+    def _batch_buffer(self, count):
+        """Next [count, H, W, 3] slice from a ring of reused batch buffers"""
+        if not self._buffers or self._buffers[0].shape[0] < count:
+            shape = (count, self.input_height, self.input_width, 3)
+            self._buffers = [np.empty(shape, dtype=np.uint8)
+                             for _ in range(self.num_input_buffers)]
+        index = self._buffer_index
+        self._buffer_index = (index + 1) % len(self._buffers)
+        return self._buffers[index][:count]
+
+    def preprocess(self, image, display_shape=None, out=None, roi=None):
+        """Letterbox every region of image into one batch
+
+        Returns (batch, metas) with one HailoDetector meta per batch row.
+        image should be the full-resolution frame; regions are in
+        display_shape pixels when given.
+        """
+        shape = display_shape or image.shape
+        regions = self.regions(shape, roi)
+        batch = out if out is not None else self._batch_buffer(len(regions))
+        metas = []
+        for slot, region in enumerate(regions):
+            _, meta = self.detector.preprocess(image, shape, out=batch[slot:slot + 1],
+                                               roi=region)
+            metas.append(meta)
+        return batch, metas
+
+    def infer(self, input_data):
+        return self.detector.infer(input_data)
+
+    def postprocess(self, outputs, metas):
+        """Decode each batch row and merge them into one set of detections"""
+        detections = []
+        for slot, meta in enumerate(metas):
+            detections.extend(self.detector.postprocess(outputs[slot:slot + 1], meta))
+        return self.merge(detections)
+
+    def merge(self, detections):
+        """Cross-tile NMS over detections already in frame coordinates"""
+        if len(detections) < 2:
+            return detections
+        boxes = np.array([d['bbox'] for d in detections], dtype=np.float32)
+        scores = np.array([d['confidence'] for d in detections], dtype=np.float32)
+        class_ids = np.array([d['class_id'] for d in detections])
+        kept = nms_boxes(boxes, scores, class_ids,
+                         iou_threshold=self.merge_threshold,
+                         max_detections=self.detector.max_detections,
+                         metric=self.merge_metric)
+        return [detections[i] for i in kept]
+
+    def detect(self, image, display_shape=None):
+        """Run tiled detection on a full-resolution frame"""
+        input_data, metas = self.preprocess(image, display_shape)
+        outputs = self.infer(input_data)
+        return self.postprocess(outputs[self.output_name], metas)
+
+    def cleanup(self):
+        self.detector.cleanup()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Multi-object tracker for Hailo detections
+
+Implements the `temporal_filter` block of
+configs/rpicam/hailo_yolov8_inference.json for the Python path:
+
+    tolerance       - how far (fraction of the frame) a box may move between
+                      updates and still be the same object
+    factor          - box smoothing; new = factor * old + (1 - factor) * detected
+    visible_frames  - consecutive hits before a track is shown
+    hidden_frames   - missed updates before a shown track is dropped
+
+Association is greedy on a vectorized IoU / center-distance cost matrix,
+per class. Every shown detection carries a stable 'track_id'.
+
+Tracks also keep a per-frame velocity, so frames that skip inference can be
+filled from the tracker (predict) instead of the device. Extrapolated boxes
+are clipped to the frame, a track whose box leaves the frame is dropped,
+and extrapolation stops after max_predict_frames frames without an update.
+"""
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+# Defaults match configs/rpicam/hailo_yolov8_inference.json
+DEFAULT_TEMPORAL_FILTER = {
+    "tolerance": 0.1,
+    "factor": 0.75,
+    "visible_frames": 6,
+    "hidden_frames": 3,
+}
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """Pairwise IoU of [N, 4] and [M, 4] (x1, y1, x2, y2) arrays -> [N, M]"""
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-9)
+
+
+class Track:
+    """One tracked object"""
+
+    __slots__ = ("track_id", "box", "velocity", "class_id", "class_name",
+                 "confidence", "hits", "misses", "confirmed", "age")
+
+    def __init__(self, track_id, box, detection):
+        self.track_id = track_id
+        self.box = box
+        self.velocity = np.zeros(4)
+        self.class_id = detection['class_id']
+        self.class_name = detection['class_name']
+        self.confidence = detection['confidence']
+        self.hits = 1
+        self.misses = 0
+        self.confirmed = False
+        self.age = 0  # updates since the last matched detection
+
+    def as_detection(self, box=None):
+        box = self.box if box is None else box
+        return {
+            'bbox': tuple(int(v) for v in box),
+            'class_id': self.class_id,
+            'class_name': self.class_name,
+            'confidence': self.confidence,
+            'track_id': self.track_id
+        }
+
+
+class Tracker:
+    """IoU tracker with exponential box smoothing and birth/death rules"""
+
+    def __init__(self, tolerance=0.1, factor=0.75, visible_frames=6, hidden_frames=3,
+                 max_predict_frames=30):
+        if not 0.0 <= factor < 1.0:
+            raise ValueError(f"factor must be in [0, 1), got {factor}")
+        self.tolerance = tolerance
+        self.factor = factor
+        self.visible_frames = max(1, int(visible_frames))
+        self.hidden_frames = max(0, int(hidden_frames))
+        self.max_predict_frames = max(0, int(max_predict_frames))
+        self.tracks = []
+        self._next_id = 1
+        self._frames_since_update = 0
+        self._frame_shape = None
+
+    @classmethod
+    def from_config(cls, config):
+        """Build from a temporal_filter dict, an rpicam JSON dict, or its path"""
+        if isinstance(config, (str, Path)):
+            with open(config) as f:
+                config = json.load(f)
+        if "hailo_yolo_inference" in config:
+            config = config["hailo_yolo_inference"]
+        config = config.get("temporal_filter", config)
+        params = dict(DEFAULT_TEMPORAL_FILTER)
+        params.update({k: config[k] for k in DEFAULT_TEMPORAL_FILTER if k in config})
+        return cls(**params)
+
+    def reset(self):
+        self.tracks = []
+        self._frames_since_update = 0
+
+    def _extrapolate(self, track, frames):
+        """Track box moved by its velocity, clipped to the frame; None once outside"""
+        box = track.box + track.velocity * min(frames, self.max_predict_frames)
+        if self._frame_shape is None:
+            return box
+        frame_h, frame_w = self._frame_shape
+        box = np.clip(box, 0, (frame_w, frame_h, frame_w, frame_h))
+        if box[2] - box[0] < 1 or box[3] - box[1] < 1:
+            return None
+        return box
+
+    def _match(self, track_boxes, det_boxes, track_classes, det_classes, frame_shape):
+        """Greedy one-to-one matching; returns [(track_index, det_index)]"""
+        frame_h, frame_w = frame_shape[:2]
+        iou = iou_matrix(track_boxes, det_boxes)
+
+        # Normalized center displacement, per axis
+        track_centers = (track_boxes[:, :2] + track_boxes[:, 2:]) / 2
+        det_centers = (det_boxes[:, :2] + det_boxes[:, 2:]) / 2
+        shift = np.abs(track_centers[:, None, :] - det_centers[None, :, :])
+        shift /= (frame_w, frame_h)
+        distance = shift.max(axis=2)
+
+        valid = (track_classes[:, None] == det_classes[None, :])
+        valid &= (iou > 0) | (distance <= self.tolerance)
+        cost = np.where(valid, (1.0 - iou) + distance, np.inf)
+
+        matches = []
+        used_tracks = np.zeros(len(track_boxes), dtype=bool)
+        used_dets = np.zeros(len(det_boxes), dtype=bool)
+        for flat in np.argsort(cost, axis=None):
+            t, d = divmod(int(flat), cost.shape[1])
+            if not np.isfinite(cost[t, d]):
+                break
+            if used_tracks[t] or used_dets[d]:
+                continue
+            used_tracks[t] = used_dets[d] = True
+            matches.append((t, d))
+        return matches
+
+    def update(self, detections, frame_shape):
+        """Associate a new set of detections; returns the visible tracks
+
+        frame_shape is the (h, w) the boxes live in. Frames filled with
+        predict() since the last update count towards each track's velocity.
+        """
+        frames_elapsed = self._frames_since_update + 1
+        self._frames_since_update = 0
+        self._frame_shape = tuple(frame_shape[:2])
+
+        det_boxes = np.array([d['bbox'] for d in detections], dtype=np.float64).reshape(-1, 4)
+        matched_dets = set()
+
+        if self.tracks and detections:
+            track_boxes = np.stack([t.box for t in self.tracks])
+            track_classes = np.array([t.class_id for t in self.tracks])
+            det_classes = np.array([d['class_id'] for d in detections])
+            for t, d in self._match(track_boxes, det_boxes, track_classes,
+                                    det_classes, frame_shape):
+                self._apply(self.tracks[t], det_boxes[d], detections[d], frames_elapsed)
+                matched_dets.add(d)
+
+        survivors = []
+        for track in self.tracks:
+            if track.age == 0:
+                survivors.append(track)
+                continue
+            track.misses += 1
+            track.hits = 0
+            # Unconfirmed tracks die on their first miss
+            if track.confirmed and track.misses <= self.hidden_frames:
+                box = self._extrapolate(track, frames_elapsed)
+                if box is not None:
+                    track.box = box
+                    survivors.append(track)
+        self.tracks = survivors
+
+        for d, detection in enumerate(detections):
+            if d not in matched_dets:
+                self._birth(det_boxes[d], detection)
+
+        for track in self.tracks:
+            track.age += 1
+        return self.visible()
+
+    def _apply(self, track, box, detection, frames_elapsed):
+        smoothed = self.factor * track.box + (1.0 - self.factor) * box
+        velocity = (smoothed - track.box) / frames_elapsed
+        track.velocity = self.factor * track.velocity + (1.0 - self.factor) * velocity
+        track.box = smoothed
+        track.confidence = detection['confidence']
+        track.class_name = detection['class_name']
+        track.hits += 1
+        track.misses = 0
+        track.age = 0
+        if track.hits >= self.visible_frames:
+            track.confirmed = True
+
+    def _birth(self, box, detection):
+        track = Track(self._next_id, box, detection)
+        self._next_id += 1
+        track.confirmed = self.visible_frames <= 1
+        self.tracks.append(track)
+
+    def visible(self):
+        """Detections for confirmed tracks, as of the last update"""
+        return [t.as_detection() for t in self.tracks if t.confirmed]
+
+    def predict(self):
+        """Advance one frame without inference; returns extrapolated tracks"""
+        self._frames_since_update += 1
+        boxes = [(t, self._extrapolate(t, self._frames_since_update))
+                 for t in self.tracks if t.confirmed]
+        return [t.as_detection(box) for t, box in boxes if box is not None]
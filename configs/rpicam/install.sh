@@ -61,7 +61,16 @@ echo ""
 echo "Step 3: Installing inference configuration..."
 echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
 sudo mkdir -p /usr/share/pi-camera-assets
-sudo cp "$PROJECT_ROOT/configs/rpicam/hailo_yolov8_inference.json" /usr/share/pi-camera-assets/
+# Point hef_file at this checkout's model rather than the path in the template
+RENDERED_CONFIG="$(mktemp)"
+if python3 "$PROJECT_ROOT/configs/python-direct/examples/model_registry.py" \
+        rpicam-config yolov8s -o "$RENDERED_CONFIG" 2>/dev/null; then
+    sudo cp "$RENDERED_CONFIG" /usr/share/pi-camera-assets/hailo_yolov8_inference.json
+else
+    echo "⚠️  yolov8s.hef not found; installing the template's hef_file paths"
+    sudo cp "$PROJECT_ROOT/configs/rpicam/hailo_yolov8_inference.json" /usr/share/pi-camera-assets/
+fi
+rm -f "$RENDERED_CONFIG"
 echo "✅ Configuration installed to /usr/share/pi-camera-assets/"
 echo ""
 
@@ -0,0 +1,43 @@
+"""
+Shared fixtures: the python-direct examples on the fake Hailo backend
+
+Run from the repository root:
+
+    python -m pytest -q test
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+EXAMPLES = Path(__file__).resolve().parent.parent / "configs" / "python-direct" / "examples"
+sys.path.insert(0, str(EXAMPLES))
+
+# Registered before anything imports hailo_platform (see fake_hailo_platform.py)
+import fake_hailo_platform  # noqa: E402
+
+fake_hailo_platform.install()
+
+
+def _reset_fake():
+    fake_hailo_platform.reset()
+    fake_hailo_platform.replay(None)
+    fake_hailo_platform.use_nms_output(False)
+    fake_hailo_platform.set_latency(0.0, 0.0)
+
+
+@pytest.fixture(autouse=True)
+def fake_hailo():
+    """A clean fake device for every test: raw YOLOv8 head, no latency"""
+    _reset_fake()
+    yield fake_hailo_platform
+    _reset_fake()
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    """A placeholder .hef; the fake HEF only needs the file to exist"""
+    path = tmp_path / "yolov8s.hef"
+    path.write_bytes(b"fake hef")
+    return path
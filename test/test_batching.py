@@ -0,0 +1,30 @@
+"""MicroBatcher on the fake backend"""
+
+import numpy as np
+import pytest
+
+from batching import MicroBatcher
+from live_detection import HailoDetector
+
+
+def test_rejects_resize_mode(model_path):
+    detector = HailoDetector(model_path, preprocess_mode="resize")
+    try:
+        with pytest.raises(ValueError, match="letterbox"):
+            MicroBatcher(detector)
+    finally:
+        detector.cleanup()
+
+
+def test_batches_frames_from_several_callers(model_path):
+    detector = HailoDetector(model_path, batch_size=4)
+    batcher = MicroBatcher(detector, max_batch_size=4, max_wait_ms=50)
+    batcher.start()
+    try:
+        frames = [np.zeros((720, 1280, 3), np.uint8) for _ in range(4)]
+        futures = [batcher.submit(frame) for frame in frames]
+        assert [future.result(timeout=5) for future in futures] == [[]] * 4
+        assert batcher.frames == 4 and batcher.errors == 0
+    finally:
+        batcher.stop()
+        detector.cleanup()
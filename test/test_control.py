@@ -0,0 +1,89 @@
+"""Controller input validation: bad settings are rejected with ValueError"""
+
+import json
+
+import pytest
+
+from control import ConfigWatcher, Controller, ModelSwitcher
+from live_detection import HailoDetector
+
+BAD_SETTINGS = [
+    {"threshold": "x"},
+    {"threshold": [0.5]},
+    {"threshold": True},
+    {"class_thresholds": {"person": "x"}},
+    {"class_thresholds": {"person": None}},
+    {"class_thresholds": [1]},
+    {"classes": [1]},
+    {"classes": [["person"]]},
+    {"classes": "person"},
+    {"model": 5},
+    {"fps": 30},
+    [1],
+]
+
+
+@pytest.fixture
+def controller(model_path):
+    detector = HailoDetector(model_path, threshold=0.5)
+    yield Controller(ModelSwitcher(detector))
+    detector.cleanup()
+
+
+@pytest.mark.parametrize("changes", BAD_SETTINGS)
+def test_apply_rejects_bad_settings(controller, changes):
+    before = controller.status()
+    with pytest.raises(ValueError):
+        controller.apply(changes)
+    assert controller.status() == before
+
+
+def test_apply_changes_filter(controller):
+    status = controller.apply({"threshold": 0.4, "class_thresholds": {"person": 0.3},
+                               "classes": ["person", "car"]})
+    assert status['threshold'] == pytest.approx(0.4)
+    assert status['class_thresholds'] == {"person": pytest.approx(0.3)}
+    assert sorted(status['classes']) == ["car", "person"]
+
+    assert controller.apply({"classes": None})['classes'] is None
+
+
+def test_watcher_ignores_bad_file(controller, tmp_path):
+    path = tmp_path / "site.json"
+    path.write_text(json.dumps({"class_thresholds": {"person": "x"}}))
+    assert ConfigWatcher(controller, path).check() is False
+
+
+def test_apply_is_atomic_on_unknown_model(controller):
+    before = controller.status()
+    with pytest.raises(ValueError, match="not found"):
+        controller.apply({"threshold": 0.2, "model": "/no/such/model.hef"})
+    assert controller.status() == before
+
+
+def test_apply_is_atomic_while_loading(controller, model_path, tmp_path):
+    other = tmp_path / "other.hef"
+    other.write_bytes(b"fake hef")
+    controller.switcher.loading = str(other)
+    controller.switcher.build = lambda path: None
+    before = controller.status()
+    with pytest.raises(ValueError, match="Still loading"):
+        controller.apply({"threshold": 0.2, "model": str(other)})
+    assert controller.status() == before
+
+
+def test_dropped_frames_release_their_model(model_path):
+    from live_detection import release_model
+    from pipeline import FramePacket
+
+    detector = HailoDetector(model_path)
+    switcher = ModelSwitcher(detector)
+    try:
+        packet = FramePacket(0, None)
+        packet.model = switcher.select()
+        assert switcher._in_flight[detector] == 1
+        release_model(switcher, packet)
+        release_model(switcher, packet)
+        assert switcher._in_flight[detector] == 0
+    finally:
+        detector.cleanup()
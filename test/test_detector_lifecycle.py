@@ -0,0 +1,61 @@
+"""HailoDetector lifecycle on the fake backend: persistent pipeline and reconnect"""
+
+import numpy as np
+import pytest
+
+from live_detection import HailoDetector
+
+
+def blank_input(detector):
+    frame = np.zeros((detector.input_height, detector.input_width, 3), np.uint8)
+    return detector.preprocess(frame)[0]
+
+
+def test_pipeline_is_opened_once(fake_hailo, model_path):
+    detector = HailoDetector(model_path)
+    try:
+        for _ in range(5):
+            detector.infer(blank_input(detector))
+        assert fake_hailo.STATS["vstreams_created"] == 1
+        assert fake_hailo.STATS["activations"] == 1
+        assert fake_hailo.STATS["infers"] == 5
+    finally:
+        detector.cleanup()
+    assert fake_hailo.STATS["vstreams_closed"] == 1
+    assert fake_hailo.STATS["deactivations"] == 1
+    assert fake_hailo.STATS["vdevices_released"] == 1
+
+
+def test_infer_reconnects_after_device_error(fake_hailo, model_path):
+    detector = HailoDetector(model_path)
+    try:
+        first_device = detector.device
+        fake_hailo.fail_next()
+        outputs = detector.infer(blank_input(detector))
+
+        assert outputs[detector.output_name].shape == (1,) + detector.output_shape
+        # The failed pipeline and device were torn down and set up again
+        assert detector.device is not first_device and first_device.released
+        assert fake_hailo.STATS["vdevices_created"] == 2
+        assert fake_hailo.STATS["vdevices_released"] == 1
+        assert fake_hailo.STATS["vstreams_created"] == 2
+        assert fake_hailo.STATS["vstreams_closed"] == 1
+        assert fake_hailo.STATS["infers"] == 1
+
+        # The new pipeline keeps working
+        detector.infer(blank_input(detector))
+        assert fake_hailo.STATS["infers"] == 2
+        assert fake_hailo.STATS["vdevices_created"] == 2
+    finally:
+        detector.cleanup()
+
+
+def test_infer_gives_up_after_one_retry(fake_hailo, model_path):
+    detector = HailoDetector(model_path)
+    try:
+        fake_hailo.fail_next(2)
+        with pytest.raises(fake_hailo.HailoRTException):
+            detector.infer(blank_input(detector))
+        assert fake_hailo.STATS["vdevices_created"] == 2
+    finally:
+        detector.cleanup()
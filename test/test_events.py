@@ -0,0 +1,111 @@
+"""Event sinks: JSONL batching, the SQLite schema, MQTT via fake_mqtt"""
+
+import json
+import sqlite3
+
+import pytest
+
+from events import EventBus, JsonlSink, MqttSink, SqliteSink, frame_events
+from fake_mqtt import LocalBroker, topic_matches
+
+PERSON = {'bbox': (10, 20, 110, 220), 'class_id': 0, 'class_name': "person",
+          'confidence': 0.912345, 'track_id': 7}
+CAR = {'bbox': (300, 40, 500, 160), 'class_id': 2, 'class_name': "car",
+       'confidence': 0.8}
+
+
+def test_frame_events_flatten_detections():
+    events = frame_events("front", 42, 1000.5, [PERSON, CAR])
+    assert events[0] == {'timestamp': 1000.5, 'camera': "front", 'frame_id': 42,
+                         'class_id': 0, 'class_name': "person", 'confidence': 0.9123,
+                         'track_id': 7, 'bbox': [10, 20, 110, 220]}
+    assert events[1]['track_id'] is None
+
+
+def test_jsonl_batches_writes_and_flushes(tmp_path, monkeypatch):
+    syncs = []
+    monkeypatch.setattr("events.os.fsync", syncs.append)
+    path = tmp_path / "events.jsonl"
+    sink = JsonlSink(path, fsync_interval=3600)
+    sink.open()
+    sink.write(frame_events("front", 1, 1.0, [PERSON, CAR]))
+    sink.write(frame_events("front", 2, 2.0, [PERSON]))
+    # The first write syncs; the rest wait for the interval or close()
+    assert len(syncs) == 1
+    sink.close()
+    assert len(syncs) == 2
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(e['frame_id'], e['class_name']) for e in lines] == [
+        (1, "person"), (1, "car"), (2, "person")]
+
+
+def test_sqlite_schema_and_index(tmp_path):
+    path = tmp_path / "events.db"
+    sink = SqliteSink(path)
+    sink.open()
+    sink.write(frame_events("front", 1, 1.0, [PERSON, CAR]))
+    sink.close()
+
+    db = sqlite3.connect(path)
+    try:
+        assert db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        columns = [row[1] for row in db.execute("PRAGMA table_info(detections)")]
+        assert columns == ["id", "timestamp", "camera", "frame_id", "class_id", "class_name",
+                           "confidence", "track_id", "x1", "y1", "x2", "y2"]
+        index = db.execute("PRAGMA index_info(idx_detections_camera_class_time)").fetchall()
+        assert [row[2] for row in index] == ["camera", "class_name", "timestamp"]
+        plan = " ".join(row[-1] for row in db.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM detections "
+            "WHERE camera = 'front' AND class_name = 'person' AND timestamp > 0"))
+        assert "idx_detections_camera_class_time" in plan
+        rows = db.execute("SELECT camera, frame_id, class_name, track_id, x1, y1, x2, y2 "
+                          "FROM detections ORDER BY id").fetchall()
+        assert rows == [("front", 1, "person", 7, 10, 20, 110, 220),
+                        ("front", 1, "car", None, 300, 40, 500, 160)]
+    finally:
+        db.close()
+
+
+def test_mqtt_publishes_one_message_per_frame():
+    broker = LocalBroker()
+    received = []
+    broker.subscribe("hailo/+/detections", lambda topic, payload: received.append(topic))
+    sink = MqttSink(client=broker.client())
+    sink.open()
+    sink.write(frame_events("front", 1, 1.0, [PERSON, CAR]) +
+               frame_events("back", 1, 1.0, [CAR]))
+    sink.close()
+
+    assert [m.topic for m in broker.messages] == ["hailo/front/detections",
+                                                  "hailo/back/detections"]
+    assert [e['class_name'] for e in json.loads(broker.messages[0].payload)] == ["person", "car"]
+    assert received == ["hailo/front/detections", "hailo/back/detections"]
+
+
+@pytest.mark.parametrize("topic_filter, topic, expected", [
+    ("hailo/+/detections", "hailo/front/detections", True),
+    ("hailo/#", "hailo/front/detections", True),
+    ("hailo/+", "hailo/front/detections", False),
+    ("hailo/back/detections", "hailo/front/detections", False),
+])
+def test_topic_matches(topic_filter, topic, expected):
+    assert topic_matches(topic_filter, topic) is expected
+
+
+def test_event_bus_fans_out_to_every_sink(tmp_path):
+    broker = LocalBroker()
+    bus = EventBus([JsonlSink(tmp_path / "events.jsonl"), SqliteSink(tmp_path / "events.db"),
+                    MqttSink(client=broker.client())], camera="front").start()
+    for frame_id in range(5):
+        bus.publish(frame_id, [PERSON], timestamp=float(frame_id))
+    bus.publish(5, [])   # empty frames are skipped
+    bus.close()
+
+    assert {name: s['written'] for name, s in bus.stats().items()} == {
+        'jsonl': 5, 'sqlite': 5, 'mqtt': 5}
+    assert len((tmp_path / "events.jsonl").read_text().splitlines()) == 5
+    db = sqlite3.connect(tmp_path / "events.db")
+    assert db.execute("SELECT COUNT(*) FROM detections").fetchone()[0] == 5
+    db.close()
+    assert len(broker.messages) == 5
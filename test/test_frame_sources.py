@@ -0,0 +1,73 @@
+"""Paired main/lores capture and coordinate mapping with FakeCamera"""
+
+import numpy as np
+import pytest
+
+from fake_hailo_platform import make_output
+from frame_sources import FakeCamera, PicameraSource
+from live_detection import HailoDetector
+
+MAIN_SIZE = (1280, 720)
+
+
+def white_box(image):
+    """(x1, y1, x2, y2) around the bright pixels of an image"""
+    ys, xs = np.nonzero(image.max(axis=-1) > 127)
+    return xs.min(), ys.min(), xs.max() + 1, ys.max() + 1
+
+
+@pytest.mark.parametrize("lores_size, use_lores", [
+    ((640, 360), True),
+    ((640, 640), True),
+    ((640, 360), False),
+])
+def test_detection_maps_onto_main_frame(model_path, lores_size, use_lores):
+    camera = FakeCamera(fps=0)
+    source = PicameraSource(camera, MAIN_SIZE, lores_size, use_lores=use_lores)
+    detector = HailoDetector(model_path, threshold=0.5)
+    source.start(warmup=0)
+    try:
+        for frame in range(3):
+            main, lores = source.read()
+            index = camera.frame_index - 1
+            # Every capture request goes back to the camera straight away
+            assert camera.requests_released == (frame + 1 if use_lores else 0)
+
+            # Both streams come from the same request, so they show the same instant
+            assert main.shape == (MAIN_SIZE[1], MAIN_SIZE[0], 3)
+            np.testing.assert_allclose(white_box(main), camera.object_box(index, "main"))
+            if use_lores:
+                assert lores.shape == (lores_size[1], lores_size[0], 3)
+                np.testing.assert_allclose(white_box(lores), camera.object_box(index, "lores"),
+                                           atol=1)
+            else:
+                assert lores is None
+
+            input_data, meta = detector.preprocess(
+                main if lores is None else lores, display_shape=main.shape)
+            box = white_box(input_data[0])
+            output = make_output([box], [0], [0.9])
+            detections = detector.postprocess(output[None], meta)
+
+            assert len(detections) == 1
+            np.testing.assert_allclose(detections[0]['bbox'], camera.object_box(index, "main"),
+                                       atol=3)
+    finally:
+        source.stop()
+        detector.cleanup()
+
+
+def test_default_lores_keeps_main_aspect_ratio(model_path):
+    camera = FakeCamera(fps=0)
+    source = PicameraSource(camera, MAIN_SIZE)
+    assert source.lores_size == (640, 360)
+
+    detector = HailoDetector(model_path)
+    try:
+        main, lores = source.read()
+        _, meta = detector.preprocess(lores, display_shape=main.shape)
+    finally:
+        detector.cleanup()
+    # Uniform scale onto main, the 16:9 frame padded top and bottom
+    assert meta['scale'] == (0.5, 0.5)
+    assert meta['pad'] == (0, 140)
@@ -0,0 +1,88 @@
+"""ModelRegistry lookup and the size/mtime-checked hash cache"""
+
+import os
+
+import pytest
+
+import model_registry
+from model_registry import ModelRegistry
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Counts real hashing and HEF parsing done by the registry"""
+    counts = {'hash': 0, 'parse': 0}
+    real_hash, real_parse = model_registry.file_hash, model_registry.read_hef_metadata
+
+    def counting_hash(path, *args):
+        counts['hash'] += 1
+        return real_hash(path, *args)
+
+    def counting_parse(path):
+        counts['parse'] += 1
+        return real_parse(path)
+
+    monkeypatch.setattr(model_registry, "file_hash", counting_hash)
+    monkeypatch.setattr(model_registry, "read_hef_metadata", counting_parse)
+    return counts
+
+
+def write_hef(path, content=b"fake hef"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return path
+
+
+def test_unchanged_file_is_not_rehashed(tmp_path, calls):
+    model = write_hef(tmp_path / "models" / "yolov8s.hef")
+    index = tmp_path / "index.json"
+    registry = ModelRegistry(roots=[model.parent], index_path=index)
+    first = registry.info(model)
+    assert registry.info(model) == first
+    assert calls == {'hash': 1, 'parse': 1}
+
+    # A new process reads the saved index instead of hashing again
+    assert ModelRegistry(roots=[model.parent], index_path=index).info(model) == first
+    assert calls == {'hash': 1, 'parse': 1}
+
+
+def test_touched_file_is_rehashed_but_not_reparsed(tmp_path, calls):
+    model = write_hef(tmp_path / "yolov8s.hef")
+    registry = ModelRegistry(roots=[tmp_path], index_path=tmp_path / "index.json")
+    registry.info(model)
+    stat = model.stat()
+    os.utime(model, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    registry.info(model)
+    assert calls == {'hash': 2, 'parse': 1}
+
+
+def test_replaced_file_is_reparsed(tmp_path, calls):
+    model = write_hef(tmp_path / "yolov8s.hef")
+    registry = ModelRegistry(roots=[tmp_path], index_path=tmp_path / "index.json")
+    first = registry.info(model)
+    write_hef(model, b"another fake hef")
+    second = registry.info(model)
+    assert calls == {'hash': 2, 'parse': 2}
+    assert second['sha256'] != first['sha256']
+
+
+def test_copied_file_keeps_its_entry(tmp_path, calls):
+    model = write_hef(tmp_path / "yolov8s.hef")
+    copy = write_hef(tmp_path / "copy" / "renamed.hef")
+    registry = ModelRegistry(roots=[tmp_path], index_path=tmp_path / "index.json")
+    registry.info(model)
+    info = registry.info(copy)
+    assert calls == {'hash': 2, 'parse': 1}
+    assert info['name'] == "renamed"
+
+
+def test_find_by_name_prefers_earlier_roots(tmp_path):
+    preferred = write_hef(tmp_path / "pi5" / "yolov8s.hef")
+    write_hef(tmp_path / "x86" / "yolov8s.hef")
+    registry = ModelRegistry(roots=[tmp_path / "pi5", tmp_path / "x86"], index_path=None)
+    assert registry.find("yolov8s") == preferred
+    assert registry.find("yolov8s.hef") == preferred
+    fallback = tmp_path / "x86" / "yolov8s.hef"
+    assert registry.find(str(fallback)) == fallback
+    with pytest.raises(FileNotFoundError):
+        registry.find("yolov8m")
@@ -0,0 +1,80 @@
+"""Class-aware NMS on the host and the max_detections cap"""
+
+import numpy as np
+import pytest
+
+from fake_hailo_platform import make_nms_output, make_output
+from live_detection import NMS_TOP_K, HailoDetector, nms_boxes
+
+
+def run_nms(boxes, scores, class_ids, **kwargs):
+    return list(nms_boxes(np.array(boxes, np.float32), np.array(scores, np.float32),
+                          np.array(class_ids), **kwargs))
+
+
+def grid_boxes(count, size=20, step=30):
+    """count non-overlapping boxes in rows of 20"""
+    return [((i % 20) * step, (i // 20) * step, (i % 20) * step + size, (i // 20) * step + size)
+            for i in range(count)]
+
+
+def test_overlapping_same_class_boxes_are_suppressed():
+    boxes = [(100, 100, 200, 200), (105, 105, 205, 205), (400, 400, 500, 500)]
+    assert run_nms(boxes, [0.8, 0.9, 0.7], [0, 0, 0]) == [1, 2]
+
+
+def test_overlapping_boxes_of_different_classes_are_kept():
+    boxes = [(100, 100, 200, 200), (105, 105, 205, 205)]
+    assert run_nms(boxes, [0.8, 0.9], [0, 1]) == [1, 0]
+
+
+def test_classes_stay_apart_with_negative_coordinates():
+    # Boxes slightly outside the input, as the raw head can produce
+    boxes = [(-100, -100, 10, 10), (-98, -98, 12, 12)]
+    assert run_nms(boxes, [0.9, 0.8], [1, 2]) == [0, 1]
+
+
+def test_overlap_below_threshold_is_kept():
+    boxes = [(0, 0, 100, 100), (60, 0, 160, 100)]   # IoU 0.25
+    assert run_nms(boxes, [0.9, 0.8], [0, 0], iou_threshold=0.45) == [0, 1]
+    assert run_nms(boxes, [0.9, 0.8], [0, 0], iou_threshold=0.2) == [0]
+
+
+def test_ios_suppresses_a_box_cut_by_a_tile_edge():
+    boxes = [(0, 0, 200, 100), (150, 0, 200, 100)]   # IoU 0.25, IoS 1.0
+    assert run_nms(boxes, [0.9, 0.8], [0, 0]) == [0, 1]
+    assert run_nms(boxes, [0.9, 0.8], [0, 0], metric="ios") == [0]
+
+
+def test_output_is_capped_at_max_detections():
+    boxes = grid_boxes(50)
+    scores = np.linspace(0.9, 0.5, 50)
+    keep = run_nms(boxes, scores, [0] * 50, max_detections=7)
+    assert keep == list(range(7))
+
+
+def test_only_top_k_candidates_are_considered():
+    count = NMS_TOP_K + 20
+    boxes = grid_boxes(count, size=10, step=12)
+    scores = np.linspace(0.9, 0.5, count)
+    keep = run_nms(boxes, scores, [0] * count, max_detections=count)
+    assert keep == list(range(NMS_TOP_K))
+
+
+def test_empty_input():
+    assert nms_boxes(np.empty((0, 4)), np.empty(0), np.empty(0, int)).size == 0
+
+
+@pytest.mark.parametrize("nms_output", [False, True])
+def test_postprocess_truncates_to_max_detections(fake_hailo, model_path, nms_output):
+    fake_hailo.use_nms_output(nms_output)
+    detector = HailoDetector(model_path, threshold=0.5, max_detections=5)
+    try:
+        boxes = grid_boxes(12)
+        scores = list(np.linspace(0.95, 0.6, 12))
+        build = make_nms_output if nms_output else make_output
+        detections = detector.postprocess(build(boxes, [0] * 12, scores)[None], (640, 640))
+    finally:
+        detector.cleanup()
+    assert len(detections) == 5
+    np.testing.assert_allclose([d['confidence'] for d in detections], scores[:5], rtol=1e-5)
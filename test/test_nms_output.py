@@ -0,0 +1,149 @@
+"""On-device NMS outputs: decoding, packing and box mapping (fake backend)"""
+
+import numpy as np
+import pytest
+
+from fake_hailo_platform import make_nms_output, make_output
+from live_detection import HailoDetector, decode_nms_output, pack_nms_output
+
+# (x1, y1, x2, y2) in model input pixels
+INPUT_BOXES = [(100, 200, 300, 400), (320, 100, 480, 260), (10, 20, 60, 90)]
+CLASS_IDS = [0, 2, 0]
+SCORES = [0.9, 0.8, 0.7]
+
+# (x1, y1, x2, y2) in display pixels of a 1280x720 frame, inside the right half
+DISPLAY_BOXES = [(700, 100, 900, 400), (1000, 300, 1200, 650)]
+DISPLAY_CLASS_IDS = [0, 2]
+DISPLAY_SCORES = [0.9, 0.8]
+
+# Frame handed to preprocess and the preprocess arguments, per geometry
+GEOMETRIES = {
+    "frame": ((720, 1280), {}),
+    "lores": ((360, 640), {"display_shape": (720, 1280)}),
+    "roi": ((720, 1280), {"roi": (640, 0, 1280, 720)}),
+}
+
+
+def sorted_rows(boxes, scores, class_ids):
+    rows = np.column_stack([boxes, scores, class_ids])
+    return rows[np.lexsort(rows.T[::-1])]
+
+
+def flat_nms_buffer(packed):
+    """TF NMS array as HailoRT's flat HAILO_NMS buffer: count, then slots, per class"""
+    chunks = []
+    for per_class in packed:
+        slots = per_class.T
+        chunks.append([np.count_nonzero(slots[:, 4] > 0)])
+        chunks.append(slots.ravel())
+    return np.concatenate(chunks).astype(np.float32)
+
+
+def to_input(box, meta):
+    """Display box -> model input pixels, the inverse of HailoDetector._map_boxes"""
+    (scale_x, scale_y), (pad_x, pad_y) = meta['scale'], meta['pad']
+    off_x, off_y = meta.get('offset', (0, 0))
+    x1, y1, x2, y2 = box
+    return ((x1 - off_x) * scale_x + pad_x, (y1 - off_y) * scale_y + pad_y,
+            (x2 - off_x) * scale_x + pad_x, (y2 - off_y) * scale_y + pad_y)
+
+
+def test_make_nms_output_decodes_to_normalized_boxes():
+    output = make_nms_output(INPUT_BOXES, CLASS_IDS, SCORES)
+    assert output.shape == (80, 5, 100)
+    boxes, scores, class_ids = decode_nms_output(output[None])
+
+    expected = np.array([(y1 / 640, x1 / 640, y2 / 640, x2 / 640)
+                         for x1, y1, x2, y2 in INPUT_BOXES])
+    np.testing.assert_allclose(sorted_rows(boxes, scores, class_ids),
+                               sorted_rows(expected, SCORES, CLASS_IDS), atol=1e-6)
+
+
+def test_pack_round_trips_per_class_lists():
+    per_class = [np.empty((0, 5), np.float32) for _ in range(80)]
+    for (x1, y1, x2, y2), class_id, score in zip(INPUT_BOXES, CLASS_IDS, SCORES):
+        row = np.array([[y1 / 640, x1 / 640, y2 / 640, x2 / 640, score]], np.float32)
+        per_class[class_id] = np.vstack([per_class[class_id], row])
+
+    packed = pack_nms_output(per_class, 100)
+    np.testing.assert_array_equal(packed, make_nms_output(INPUT_BOXES, CLASS_IDS, SCORES))
+
+    from_list = decode_nms_output([per_class])
+    from_packed = decode_nms_output(packed)
+    np.testing.assert_allclose(sorted_rows(*from_list), sorted_rows(*from_packed))
+
+
+def test_pack_truncates_to_max_boxes():
+    rows = np.tile(np.array([[0.1, 0.1, 0.2, 0.2, 0.9]], np.float32), (7, 1))
+    packed = pack_nms_output([rows], 4)
+    assert packed.shape == (1, 5, 4)
+    _, scores, _ = decode_nms_output(packed)
+    assert len(scores) == 4
+
+
+@pytest.mark.parametrize("layout", ["tf", "transposed", "flat", "list"])
+def test_decode_layouts_agree(layout):
+    packed = make_nms_output(INPUT_BOXES, CLASS_IDS, SCORES)
+    if layout == "tf":
+        output = packed[None]
+    elif layout == "transposed":
+        output = packed.transpose(0, 2, 1)[None]
+    elif layout == "flat":
+        output = flat_nms_buffer(packed)[None]
+    else:
+        output = [[per_class.T[per_class[4] > 0] for per_class in packed]]
+
+    decoded = decode_nms_output(output, num_classes=80)
+    expected = decode_nms_output(packed)
+    np.testing.assert_allclose(sorted_rows(*decoded), sorted_rows(*expected))
+
+
+def test_decode_empty_list_output():
+    boxes, scores, class_ids = decode_nms_output([[np.empty((0, 5))] * 80])
+    assert boxes.shape == (0, 4) and len(scores) == 0 and len(class_ids) == 0
+
+
+@pytest.mark.parametrize("geometry", sorted(GEOMETRIES))
+@pytest.mark.parametrize("layout", ["raw", "transposed", "nms", "nms_transposed"])
+def test_postprocess_maps_boxes_to_display(fake_hailo, model_path, layout, geometry):
+    fake_hailo.use_nms_output(layout.startswith("nms"))
+    detector = HailoDetector(model_path, threshold=0.5)
+    try:
+        assert bool(detector.nms_output) == layout.startswith("nms")
+        frame_shape, kwargs = GEOMETRIES[geometry]
+        _, meta = detector.preprocess(np.zeros(frame_shape + (3,), np.uint8), **kwargs)
+        boxes = [to_input(box, meta) for box in DISPLAY_BOXES]
+
+        if layout == "raw":
+            output = make_output(boxes, DISPLAY_CLASS_IDS, DISPLAY_SCORES)
+        elif layout == "transposed":
+            output = make_output(boxes, DISPLAY_CLASS_IDS, DISPLAY_SCORES, shape=(8400, 84))
+        else:
+            output = make_nms_output(boxes, DISPLAY_CLASS_IDS, DISPLAY_SCORES)
+            if layout == "nms_transposed":
+                output = output.transpose(0, 2, 1)
+        detections = detector.postprocess(output[None], meta)
+    finally:
+        detector.cleanup()
+
+    assert [d['class_id'] for d in detections] == DISPLAY_CLASS_IDS
+    assert [d['class_name'] for d in detections] == ["person", "car"]
+    np.testing.assert_allclose([d['confidence'] for d in detections], DISPLAY_SCORES,
+                               rtol=1e-6)
+    np.testing.assert_allclose([d['bbox'] for d in detections], DISPLAY_BOXES, atol=1)
+
+
+def test_postprocess_nms_applies_class_filter(fake_hailo, model_path):
+    fake_hailo.use_nms_output()
+    detector = HailoDetector(model_path, threshold=0.5, class_thresholds={"person": 0.85})
+    try:
+        output = make_nms_output(INPUT_BOXES, CLASS_IDS, SCORES)
+        detections = detector.postprocess(output[None], (640, 640))
+        assert [(d['class_name'], d['confidence']) for d in detections] == [
+            ("person", pytest.approx(0.9)), ("car", pytest.approx(0.8))]
+
+        detector.set_filter(classes=["car"])
+        detections = detector.postprocess(output[None], (640, 640))
+        assert [d['class_name'] for d in detections] == ["car"]
+    finally:
+        detector.cleanup()
@@ -0,0 +1,87 @@
+"""StageQueue drop policies and FramePipeline ordering"""
+
+import queue
+import threading
+
+import pytest
+
+from pipeline import BLOCK, DROP_NEWEST, DROP_OLDEST, FramePipeline, StageQueue, _STOP
+
+
+def drain(stage_queue):
+    items = []
+    while True:
+        try:
+            items.append(stage_queue.get(timeout=0))
+        except queue.Empty:
+            return items
+
+
+def test_drop_oldest_keeps_the_newest():
+    dropped = []
+    q = StageQueue("test", 2, DROP_OLDEST, on_drop=dropped.append)
+    for item in range(5):
+        q.put(item)
+    assert drain(q) == [3, 4]
+    assert dropped == [0, 1, 2] and q.dropped == 3
+
+
+def test_drop_newest_keeps_the_oldest():
+    dropped = []
+    q = StageQueue("test", 2, DROP_NEWEST, on_drop=dropped.append)
+    for item in range(5):
+        q.put(item)
+    assert drain(q) == [0, 1]
+    assert dropped == [2, 3, 4] and q.dropped == 3
+
+
+def test_block_waits_for_room():
+    dropped = []
+    q = StageQueue("test", 1, BLOCK, on_drop=dropped.append)
+    q.put(0)
+    producer = threading.Thread(target=q.put, args=(1,))
+    producer.start()
+    producer.join(0.1)
+    assert producer.is_alive()
+    assert q.get() == 0
+    producer.join(1.0)
+    assert not producer.is_alive()
+    assert q.get(timeout=0) == 1
+    assert dropped == [] and q.dropped == 0
+
+
+@pytest.mark.parametrize("policy", [DROP_OLDEST, DROP_NEWEST, BLOCK])
+def test_put_stop_always_gets_through(policy):
+    dropped = []
+    q = StageQueue("test", 2, policy, on_drop=dropped.append)
+    q.put(0)
+    q.put(1)
+    q.put_stop()
+    items = drain(q)
+    assert items[-1] is _STOP
+    # Whatever made room for the marker went to on_drop
+    assert sorted(dropped + items[:-1]) == [0, 1]
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError, match="drop policy"):
+        StageQueue("test", 2, "drop_random")
+
+
+def test_pipeline_runs_stages_in_order():
+    frames = iter(range(20))
+    seen = []
+
+    def double(packet):
+        packet.detections = [packet.image * 2]
+        return packet
+
+    def odd_only(packet):
+        return packet if packet.image % 2 else None
+
+    dropped = []
+    pipeline = FramePipeline(lambda: next(frames, None), [("double", double), ("odd", odd_only)],
+                             queue_size=2, drop_policy=BLOCK, on_drop=dropped.append)
+    pipeline.run(lambda packet: seen.append((packet.seq, packet.detections[0])) or True)
+    assert seen == [(i, i * 2) for i in range(1, 20, 2)]
+    assert sorted(packet.image for packet in dropped) == list(range(0, 20, 2))
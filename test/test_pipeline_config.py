@@ -0,0 +1,78 @@
+"""Node config validation and how temporal_filter maps onto tracking"""
+
+from pathlib import Path
+
+import pytest
+
+from pipeline_config import config_options, load_config
+from tracker import DEFAULT_TEMPORAL_FILTER
+
+NODE_CONFIG = (Path(__file__).resolve().parent.parent
+               / "configs" / "python-direct" / "hailo_yolov8_node.json")
+
+
+def temporal_filter(block, **python_direct):
+    config = {"hailo_yolo_inference": {"temporal_filter": block}}
+    if python_direct:
+        config["python-direct"] = python_direct
+    return config_options(config)
+
+
+def test_shipped_node_config_is_valid():
+    options = load_config(NODE_CONFIG)
+    assert options['track'] is True
+    assert set(options['tracker_config']) <= set(DEFAULT_TEMPORAL_FILTER)
+
+
+def test_empty_temporal_filter_changes_nothing():
+    assert temporal_filter({}) == {}
+
+
+def test_temporal_filter_turns_tracking_on():
+    options = temporal_filter({"hidden_frames": 5})
+    assert options == {'track': True, 'tracker_config': {"hidden_frames": 5}}
+    assert temporal_filter({"enabled": True}) == {'track': True}
+
+
+def test_temporal_filter_can_be_disabled():
+    assert temporal_filter({"enabled": False, "hidden_frames": 5}) == {'track': False}
+
+
+def test_python_direct_tracker_switch_wins():
+    options = temporal_filter({"enabled": False, "factor": 0.5},
+                              tracker={"enabled": True})
+    assert options == {'track': True, 'tracker_config': {"factor": 0.5}}
+    assert temporal_filter({"factor": 0.5}, tracker={"enabled": False}) == {'track': False}
+
+
+@pytest.mark.parametrize("block", [{"enabled": "no"}, {"hidden": 3}])
+def test_bad_temporal_filter_is_rejected(block):
+    with pytest.raises(ValueError, match="temporal_filter"):
+        temporal_filter(block)
+
+
+@pytest.mark.parametrize("model", ["yolov8s", "yolov8s.hef", "models/yolov8s.hef"])
+def test_model_keys_may_agree(model):
+    options = config_options({"hailo_yolo_inference": {"hef_file": "/usr/share/yolov8s.hef"},
+                              "python-direct": {"model": model}})
+    assert options['model'] == model
+
+
+def test_model_keys_must_agree():
+    with pytest.raises(ValueError, match="python-direct.model"):
+        config_options({"hailo_yolo_inference": {"hef_file": "/usr/share/yolov8s_h8.hef"},
+                        "python-direct": {"model": "yolov8m"}})
+
+
+def test_node_config_keeps_lores_aspect_ratio():
+    options = load_config(NODE_CONFIG)
+    main = tuple(int(v) for v in options['main_size'].split("x"))
+    assert main[0] != main[1]
+    # rpicam's square lores block is not applied; lores_size_for picks the size
+    assert 'lores_size' not in options
+
+
+def test_python_direct_lores_overrides():
+    options = config_options({"rpicam-apps": {"lores": {"width": 640, "height": 640}},
+                              "python-direct": {"lores": {"width": 640, "height": 360}}})
+    assert options == {'lores_size': "640x360"}
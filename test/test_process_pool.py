@@ -0,0 +1,110 @@
+"""Shared-memory FrameRing and ProcessPool round trip on the fake backend"""
+
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from fake_hailo_platform import make_output
+from live_detection import HailoDetector
+from pipeline import FramePacket
+from process_pool import FrameRing, ProcessPool
+
+FRAME_SHAPE = (360, 640, 3)
+# White box in display pixels; letterboxed 640x360 -> 640x640 adds 140 px on top
+BOX = (200, 100, 300, 200)
+
+
+def block_exists(name):
+    try:
+        shared_memory.SharedMemory(name=name).close()
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def test_ring_is_shared_between_owner_and_attached_views():
+    ring = FrameRing(3, {'image': ((4, 6, 3), np.uint8), 'output': ((2, 5), np.float32)})
+    other = FrameRing.attach(ring.spec())
+    try:
+        slot = ring.acquire()
+        ring.view('image', slot)[...] = 7
+        other.view('output', slot)[...] = 1.5
+        assert (other.view('image', slot) == 7).all()
+        assert (ring.view('output', slot) == 1.5).all()
+        assert ring.locate(ring.view('image', slot)[1:, 2:]) == (slot, 'image')
+        assert ring.locate(np.zeros(3)) is None
+        assert ring.free == 2
+        ring.release(slot)
+        assert ring.free == 3
+    finally:
+        other.close()
+        names = list(ring.spec()['blocks'].values())
+        ring.close()
+    assert not any(block_exists(name) for name in names)
+
+
+@pytest.fixture
+def pool(fake_hailo, model_path, monkeypatch):
+    # Spawned workers import live_detection and need the fake backend too
+    monkeypatch.setenv("HAILO_FAKE", "1")
+    x1, y1, x2, y2 = BOX
+    fake_hailo.replay([make_output([(x1, y1 + 140, x2, y2 + 140)], [0], [0.9])])
+    detector = HailoDetector(model_path, threshold=0.5)
+    pool = ProcessPool(detector, processes=2, slots=4)
+    yield pool
+    pool.close()
+    detector.cleanup()
+
+
+def test_frames_round_trip_through_workers(pool):
+    frames = []
+    for i in range(6):
+        frame = np.full(FRAME_SHAPE, i, np.uint8)
+        frame[BOX[1]:BOX[3], BOX[0]:BOX[2]] = 255
+        frames.append(frame)
+    source = pool.source(iter(frames).__next__)
+    blocks = list(pool.ring.spec()['blocks'].values())
+
+    # More frames than slots: every slot must come back after rendering
+    for i in range(6):
+        packet = FramePacket(i, source())
+        assert pool.ring.locate(packet.image) is not None
+        input_data, meta = pool.preprocess(packet.image, display_shape=packet.image.shape)
+        outputs = pool.infer(input_data)
+        packet.detections = pool.postprocess(outputs[pool.output_name], meta)
+        pool.draw(packet)
+        assert pool.finish(packet)
+
+        assert [d['class_name'] for d in packet.detections] == ["person"]
+        np.testing.assert_allclose(packet.detections[0]['bbox'], BOX, atol=1)
+        # Overlays were drawn into the shared frame by a worker
+        assert not np.array_equal(packet.image, frames[i])
+        pool.release(packet)
+        assert pool.ring.free == pool.slots
+
+    pool.close()
+    assert pool.ring is None
+    assert not any(block_exists(name) for name in blocks)
+
+
+def test_dropped_frames_give_their_slot_back(pool):
+    source = pool.source(lambda: np.zeros(FRAME_SHAPE, np.uint8))
+    packets = [FramePacket(i, source()) for i in range(pool.slots)]
+    assert pool.ring.free == 0
+    pool.preprocess(packets[0].image)
+    for packet in packets:
+        pool.release(packet)
+        pool.release(packet)   # a second release is ignored
+    # A preprocess task already running hands its slot back when it finishes
+    deadline = time.monotonic() + 5
+    while pool.ring.free < pool.slots and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pool.ring.free == pool.slots
+
+
+def test_rejects_frames_outside_the_ring(pool):
+    pool.source(lambda: np.zeros(FRAME_SHAPE, np.uint8))
+    with pytest.raises(ValueError, match="shared ring"):
+        pool.preprocess(np.zeros(FRAME_SHAPE, np.uint8))
@@ -0,0 +1,92 @@
+"""FrameRing wrap-around and pre-roll bounds, EventRecorder clips"""
+
+import json
+
+from recorder import EventRecorder, FrameRing
+
+
+def frame(index, size=10):
+    return bytes([index % 256]) * size
+
+
+def stored(ring):
+    return [(t, data) for t, data in ring.frames()]
+
+
+def test_wraps_around_and_keeps_the_newest():
+    ring = FrameRing(capacity_bytes=35, max_frames=10)
+    for i in range(7):
+        assert ring.append(frame(i), float(i))
+    # 35 bytes hold three 10-byte frames once the write position wraps
+    assert [data[0] for _, data in stored(ring)] == [4, 5, 6]
+    assert all(data == frame(data[0]) for _, data in stored(ring))
+
+
+def test_variable_sizes_across_the_wrap():
+    ring = FrameRing(capacity_bytes=64, max_frames=16)
+    sizes = [30, 20, 25, 5, 40, 12, 7]
+    for i, size in enumerate(sizes):
+        ring.append(frame(i, size), float(i))
+    frames = stored(ring)
+    assert [len(data) for _, data in frames] == [40, 12, 7]
+    assert [data for _, data in frames] == [frame(i, sizes[i]) for i in (4, 5, 6)]
+
+
+def test_max_frames_bounds_the_count():
+    ring = FrameRing(capacity_bytes=1000, max_frames=3)
+    for i in range(5):
+        ring.append(frame(i), float(i))
+    assert len(ring) == 3
+    assert [t for t, _ in stored(ring)] == [2.0, 3.0, 4.0]
+
+
+def test_max_age_bounds_the_pre_roll():
+    ring = FrameRing(capacity_bytes=1000, max_frames=50)
+    for i in range(20):
+        ring.append(frame(i), i * 0.5, max_age=2.0)
+    times = [t for t, _ in stored(ring)]
+    assert times[0] >= times[-1] - 2.0
+    assert times == [7.5, 8.0, 8.5, 9.0, 9.5]
+
+
+def test_oversize_frames_are_skipped():
+    ring = FrameRing(capacity_bytes=16, max_frames=4)
+    ring.append(frame(1), 1.0)
+    assert not ring.append(frame(2, 20), 2.0)
+    assert ring.oversize == 1
+    assert [t for t, _ in stored(ring)] == [1.0]
+
+
+def test_clip_holds_pre_roll_event_and_post_roll(tmp_path):
+    recorder = EventRecorder(classes=["person"], pre_roll=1.0, post_roll=0.5,
+                             output_dir=tmp_path).start()
+    person = [{'class_name': "person", 'confidence': 0.9}]
+    for i in range(30):
+        now = i * 0.1
+        recorder.add_frame(frame(i), now)
+        recorder.update(person if 15 <= i < 20 else [], now=now)
+    recorder.stop()
+
+    clips = sorted(tmp_path.glob("*.mjpeg"))
+    assert len(clips) == 1 and recorder.clips == 1
+    meta = json.loads(clips[0].with_suffix(".json").read_text())
+    assert meta['labels'] == ["person"]
+    assert meta['pre_roll_frames'] == 11
+    assert clips[0].read_bytes() == b"".join(frame(i) for i in range(5, 5 + meta['frames']))
+
+
+def test_stalled_writer_drops_oldest_frames(tmp_path):
+    recorder = EventRecorder(classes=["person"], pre_roll=0.1, post_roll=10.0,
+                             output_dir=tmp_path)
+    recorder.update([{'class_name': "person", 'confidence': 0.9}], now=0.0)
+    # No writer thread yet, so nothing drains the queue; add_frame must not block
+    for i in range(1100):
+        recorder.add_frame(frame(i), i * 0.01)
+    assert recorder.dropped == 1100 - 1024
+
+    recorder.start()
+    recorder.stop()
+    kept = 1100 - recorder.dropped
+    clip = next(tmp_path.glob("*.mjpeg"))
+    assert clip.read_bytes() == b"".join(frame(i) for i in range(1100 - kept, 1100))
+    assert clip.with_suffix(".json").exists()
@@ -0,0 +1,137 @@
+"""Off-device regression inputs: replayed outputs, simulated latency, file sources"""
+
+import time
+
+import numpy as np
+import pytest
+
+from fake_hailo_platform import make_output
+from frame_sources import HAS_CV2, ImageDirectorySource, VideoFileSource, open_source
+from live_detection import HailoDetector
+
+# One recorded frame per entry: (x1, y1, x2, y2) in model input pixels
+RECORDED_BOXES = [(100, 100, 200, 300), (300, 200, 500, 400), (50, 60, 150, 160)]
+
+if HAS_CV2:
+    import cv2
+
+
+def blank_frame():
+    return np.zeros((640, 640, 3), np.uint8)
+
+
+def recorded_outputs():
+    return np.stack([make_output([box], [0], [0.9]) for box in RECORDED_BOXES])
+
+
+def test_replay_cycles_through_recorded_outputs(fake_hailo, model_path):
+    fake_hailo.replay(recorded_outputs())
+    detector = HailoDetector(model_path, threshold=0.5)
+    try:
+        boxes = [detector.detect(blank_frame())[0]['bbox'] for _ in range(4)]
+    finally:
+        detector.cleanup()
+    np.testing.assert_allclose(boxes, RECORDED_BOXES + RECORDED_BOXES[:1], atol=1)
+
+
+def test_recorded_outputs_round_trip_through_npz(fake_hailo, model_path, tmp_path):
+    fake_hailo.replay(recorded_outputs())
+    detector = HailoDetector(model_path, threshold=0.5)
+    try:
+        detector.record_outputs(limit=2)
+        expected = [detector.detect(blank_frame()) for _ in range(3)]
+        assert detector.save_recorded_outputs(tmp_path / "outputs.npz") == 2
+    finally:
+        detector.cleanup()
+
+    fake_hailo.replay(tmp_path / "outputs.npz")
+    detector = HailoDetector(model_path, threshold=0.5)
+    try:
+        replayed = [detector.detect(blank_frame()) for _ in range(2)]
+    finally:
+        detector.cleanup()
+    assert replayed == expected[:2]
+
+
+def test_simulated_latency(fake_hailo, model_path):
+    fake_hailo.set_latency(per_call_ms=20, per_frame_ms=10)
+    detector = HailoDetector(model_path, batch_size=2)
+    try:
+        batch = np.zeros((2, 640, 640, 3), np.uint8)
+        started = time.perf_counter()
+        detector.infer(batch)
+        assert time.perf_counter() - started >= 0.04
+    finally:
+        detector.cleanup()
+
+    fake_hailo.replay(recorded_outputs(), latency_ms=5)
+    assert fake_hailo.LATENCY == {"per_call_ms": 5.0, "per_frame_ms": 0.0}
+
+
+def write_images(directory, count=3):
+    for i in range(count):
+        image = np.full((48, 64, 3), 40 * (i + 1), np.uint8)
+        if HAS_CV2:
+            cv2.imwrite(str(directory / f"frame_{i}.png"), image)
+        else:
+            from PIL import Image
+            Image.fromarray(image).save(directory / f"frame_{i}.png")
+    (directory / "notes.txt").write_text("not an image")
+
+
+def levels(source, reads):
+    out = []
+    for _ in range(reads):
+        frame = source.read()
+        out.append(None if frame is None else int(frame[0][0, 0, 0]))
+    return out
+
+
+@pytest.mark.parametrize("preload", [True, False])
+def test_image_directory_reads_in_name_order(tmp_path, preload):
+    write_images(tmp_path)
+    source = ImageDirectorySource(tmp_path, preload=preload)
+    assert levels(source, 4) == [40, 80, 120, None]
+
+
+def test_image_directory_loops(tmp_path):
+    write_images(tmp_path)
+    source = open_source(str(tmp_path), loop=True)
+    assert isinstance(source, ImageDirectorySource)
+    assert levels(source, 7) == [40, 80, 120, 40, 80, 120, 40]
+
+
+def test_image_directory_returns_copies(tmp_path):
+    write_images(tmp_path, count=1)
+    source = ImageDirectorySource(tmp_path, loop=True)
+    source.read()[0][:] = 255   # an overlay drawn into the frame
+    assert levels(source, 1) == [40]
+
+
+def test_empty_image_directory(tmp_path):
+    with pytest.raises(RuntimeError, match="No images"):
+        ImageDirectorySource(tmp_path)
+
+
+@pytest.mark.skipif(not HAS_CV2, reason="needs OpenCV")
+@pytest.mark.parametrize("loop", [False, True])
+def test_video_file_source(tmp_path, loop):
+    path = tmp_path / "clip.avi"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+    if not writer.isOpened():
+        pytest.skip("OpenCV cannot write MJPG video here")
+    for i in range(3):
+        writer.write(np.full((48, 64, 3), 60 * (i + 1), np.uint8))
+    writer.release()
+
+    source = open_source(str(path), loop=loop)
+    assert isinstance(source, VideoFileSource)
+    source.start()
+    try:
+        frames = [source.read() for _ in range(5)]
+    finally:
+        source.stop()
+    read = [f for f in frames if f is not None]
+    assert len(read) == (5 if loop else 3)
+    assert all(lores is None and image.shape == (48, 64, 3) for image, lores in read)
+    np.testing.assert_allclose([image.mean() for image, _ in read[:3]], [60, 120, 180], atol=3)
@@ -0,0 +1,44 @@
+"""JpegStream: snapshots survive the one-slot encoder queue"""
+
+import numpy as np
+
+from streaming import JpegStream
+
+
+def frame(value):
+    return np.full((48, 64, 3), value, np.uint8)
+
+
+def test_displaced_snapshots_are_still_written(tmp_path, capsys):
+    stream = JpegStream()
+    stream.add_listener(lambda jpeg: None)
+    paths = [tmp_path / f"snapshot_{i}.jpg" for i in range(3)]
+    # Queued before the worker runs: each one displaces the previous frame
+    stream.submit(frame(10), save_as=str(paths[0]), message="saved 0")
+    stream.submit(frame(20), save_as=[str(paths[1]), str(paths[2])], message="saved 1+2")
+    stream.submit(frame(30))
+    assert stream.dropped == 2
+
+    stream.start()
+    stream.stop()
+
+    assert all(path.stat().st_size > 0 for path in paths)
+    assert capsys.readouterr().out.splitlines() == ["saved 0", "saved 1+2"]
+    assert stream.encoded == 1
+
+
+def test_snapshot_pending_at_stop_is_written(tmp_path):
+    stream = JpegStream()
+    path = tmp_path / "last.jpg"
+    stream.submit(frame(50), save_as=str(path))
+    stream.start()
+    stream.stop()
+    assert path.exists()
+
+
+def test_failed_write_prints_no_message(tmp_path, capsys):
+    stream = JpegStream().start()
+    stream.submit(frame(10), save_as=str(tmp_path / "missing" / "x.jpg"), message="saved")
+    stream.stop()
+    out = capsys.readouterr().out
+    assert "Could not save" in out and "saved\n" not in out
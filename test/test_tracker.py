@@ -0,0 +1,43 @@
+"""Tracker coasting: extrapolation stays inside the frame and stops"""
+
+from tracker import Tracker
+
+FRAME_SHAPE = (720, 1280)
+
+
+def detection(x, y=300, size=100):
+    return {'bbox': (x, y, x + size, y + size), 'class_id': 0,
+            'class_name': "person", 'confidence': 0.9}
+
+
+def moving_tracker(step, start=1000, **kwargs):
+    """A confirmed track moving step pixels per frame to the right"""
+    tracker = Tracker(factor=0.0, visible_frames=1, **kwargs)
+    for i in range(3):
+        tracker.update([detection(start + i * step)], FRAME_SHAPE)
+    return tracker
+
+
+def test_predict_clips_to_frame():
+    tracker = moving_tracker(50)
+    x1, y1, x2, y2 = tracker.predict()[0]['bbox']
+    assert (x1, x2) == (1150, 1250)
+    x1, y1, x2, y2 = tracker.predict()[0]['bbox']
+    assert (x1, x2) == (1200, 1280)
+    # Entirely outside the frame: no longer shown
+    for _ in range(2):
+        tracker.predict()
+    assert tracker.predict() == []
+
+
+def test_predict_stops_after_max_predict_frames():
+    tracker = moving_tracker(10, start=100, max_predict_frames=4)
+    positions = [tracker.predict()[0]['bbox'][0] for _ in range(8)]
+    assert positions == [130, 140, 150, 160, 160, 160, 160, 160]
+
+
+def test_coasting_track_leaving_frame_is_dropped():
+    tracker = moving_tracker(100, start=900, hidden_frames=10)
+    assert [t['bbox'] for t in tracker.update([], FRAME_SHAPE)] == [(1280 - 80, 300, 1280, 400)]
+    tracker.update([], FRAME_SHAPE)
+    assert tracker.tracks == []